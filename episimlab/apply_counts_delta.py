@@ -6,6 +6,12 @@ import pandas as pd
 
 @xs.process
 class ApplyCountsDelta:
+    """Adds the sum of the `counts_delta` group to `counts` each step, where
+    NaN in a delta counts as zero. Deltas with the same dims and shape as
+    `counts` are assumed to have the same coords, and are summed on their
+    arrays in a buffer that is reused across steps. Others are aligned on
+    `counts`. Set `validate_coords` to check that coords match.
+    """
 
     COUNTS_DIMS = ('vertex', 'age_group', 'risk_group', 'compartment')
 
@@ -16,24 +22,71 @@ class ApplyCountsDelta:
     #     static=True,
     #     intent='out',
     # )
+    # counts may have a leading `replicate` dimension when replicates are run
+    # as a batch
     counts = xs.variable(
-        dims=COUNTS_DIMS,
+        dims=[COUNTS_DIMS, ('replicate',) + COUNTS_DIMS],
         static=False,
         intent='inout',
     )
     counts_delta = xs.group(name='counts_delta')
+    validate_coords = xs.variable(
+        default=False, static=True, intent='in',
+        description="raise if a delta has different coords than counts")
 
     # def initialize(self):
     #     self.counts_dims = self.COUNTS_DIMS
 
+    def get_delta_values(self, delta) -> np.ndarray:
+        """Array of DataArray `delta`, aligned on `counts` only if its dims
+        or shape differ.
+        """
+        if delta.dims == self.counts.dims and delta.shape == self.counts.shape:
+            if self.validate_coords:
+                self.check_coords(delta)
+            return delta.values
+        delta = xr.align(self.counts, delta, join='left', fill_value=0.)[1]
+        return delta.broadcast_like(self.counts).transpose(
+            *self.counts.dims).values
+
+    def check_coords(self, delta):
+        for dim in self.counts.dims:
+            if not self.counts.indexes[dim].equals(delta.indexes[dim]):
+                raise ValueError(f"coords of {dim} in delta " +
+                                 f"{list(delta.indexes[dim])} are not the " +
+                                 f"same as in counts " +
+                                 f"{list(self.counts.indexes[dim])}")
+
+    def get_buffer(self) -> np.ndarray:
+        buf = getattr(self, '_delta_buf', None)
+        if buf is None or buf.shape != self.counts.shape or \
+                buf.dtype != self.counts.dtype:
+            buf = self._delta_buf = np.empty(self.counts.shape,
+                                             dtype=self.counts.dtype)
+        return buf
+
     def aggregate_delta(self, delta_gen):
-        try:
-            return xr.concat(delta_gen, dim='_delta').sum(dim='_delta')
-        except ValueError:
-            if len(tuple(delta_gen)) == 0:
-                return 0
-            else:
-                raise
+        """Sum of the deltas in `delta_gen` as an array, or 0 if there are
+        none. The array is overwritten by the next call.
+        """
+        arrs = [self.get_delta_values(delta) for delta in delta_gen]
+        if not arrs:
+            return 0
+        buf = self.get_buffer()
+        np.copyto(buf, arrs[0], casting='same_kind')
+        for arr in arrs[1:]:
+            np.add(buf, arr, out=buf, casting='same_kind')
+
+        # sum again where any delta is NaN, skipping NaN
+        isnan = np.isnan(buf)
+        if isnan.any():
+            buf[isnan] = 0.
+            for arr in arrs:
+                vals = arr[isnan]
+                buf[isnan] += np.where(np.isnan(vals), 0., vals)
+        return buf
 
     def finalize_step(self):
-        self.counts += self.aggregate_delta(self.counts_delta)
+        delta = self.aggregate_delta(self.counts_delta)
+        np.add(self.counts.values, delta, out=self.counts.values,
+               casting='same_kind')
@@ -1,8 +1,15 @@
 cdef extern from "gsl/gsl_rng.h" nogil:
     ctypedef struct gsl_rng_type:
-        pass
+        const char *name
+        unsigned long int max
+        unsigned long int min
+        size_t size
+        void (*set)(void *state, unsigned long int seed) nogil
+        unsigned long int (*get)(void *state) nogil
+        double (*get_double)(void *state) nogil
     ctypedef struct gsl_rng:
-        pass
+        const gsl_rng_type *type
+        void *state
     gsl_rng_type *gsl_rng_mt19937
     gsl_rng *gsl_rng_alloc(gsl_rng_type * T)
     void gsl_rng_set(gsl_rng * r, unsigned long int)
@@ -14,4 +21,18 @@ cdef extern from "gsl/gsl_randist.h" nogil:
 
 cdef gsl_rng *get_seeded_rng(int int_seed) nogil
 
+cdef unsigned long long splitmix64(unsigned long long x) nogil
+
+cdef gsl_rng **get_rng_streams(unsigned long long seed, Py_ssize_t n) nogil
+
+cdef void seed_rng_streams(gsl_rng **rngs, Py_ssize_t n,
+                           unsigned long long seed) nogil
+
+cdef void free_rng_streams(gsl_rng **rngs, Py_ssize_t n) nogil
+
+cdef class RNGStreams:
+    cdef gsl_rng **rngs
+    cdef readonly Py_ssize_t n
+    cpdef void seed(self, unsigned long long seed)
+
 cdef double discrete_time_approx(double rate, double timestep) nogil
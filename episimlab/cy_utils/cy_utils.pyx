@@ -14,6 +14,7 @@ import numpy as np
 cimport numpy as np
 cimport cython
 from cython.parallel import prange
+from libc.stdlib cimport malloc, free
 
 # Abbreviate numpy dtypes
 DTYPE_FLOAT = np.float64
@@ -29,6 +30,149 @@ cdef gsl_rng *get_seeded_rng(int int_seed) nogil:
     gsl_rng_set(rng, int_seed)
     return rng
 
+cdef unsigned long long splitmix64(unsigned long long x) nogil:
+    """SplitMix64 finalizer (https://prng.di.unimi.it/splitmix64.c), used to
+    derive well separated seeds from consecutive integers.
+    """
+    x = x + 0x9E3779B97F4A7C15ULL
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL
+    return x ^ (x >> 31)
+
+
+# GSL generator type whose state is a single SplitMix64 counter, so that a
+# stream costs 8 bytes of state and seeding it is a hash of (seed, index)
+# rather than the 624-word initialization of MT-19937
+cdef void _splitmix_set(void *state, unsigned long int seed) nogil:
+    (<unsigned long long *>state)[0] = seed
+
+
+cdef inline unsigned long long _splitmix_next(void *state) nogil:
+    cdef unsigned long long *x = <unsigned long long *>state
+    x[0] = x[0] + 0x9E3779B97F4A7C15ULL
+    return splitmix64(x[0])
+
+
+cdef unsigned long int _splitmix_get(void *state) nogil:
+    # upper 32 bits, so that max fits in an unsigned long on any platform
+    return <unsigned long int>(_splitmix_next(state) >> 32)
+
+
+cdef double _splitmix_get_double(void *state) nogil:
+    # 53 random bits in [0, 1)
+    return (_splitmix_next(state) >> 11) * (1. / 9007199254740992.)
+
+
+cdef gsl_rng_type splitmix64_type
+splitmix64_type.name = "splitmix64"
+splitmix64_type.max = 0xFFFFFFFFUL
+splitmix64_type.min = 0
+splitmix64_type.size = sizeof(unsigned long long)
+splitmix64_type.set = _splitmix_set
+splitmix64_type.get = _splitmix_get
+splitmix64_type.get_double = _splitmix_get_double
+
+
+cdef gsl_rng **get_rng_streams(unsigned long long seed, Py_ssize_t n) nogil:
+    """Returns a C array of `n` counter-based SplitMix64 generators, one
+    stream for each index of a parallel loop. Stream `i` is seeded with a
+    hash of (`seed`, `i`), so the draws made at each index do not depend on
+    how many threads run the loop. The array, generators and their states
+    are a single allocation. Free with `free_rng_streams`. Returns NULL if
+    the allocation fails, which callers must check.
+    """
+    cdef:
+        # allocate at least one stream, so that NULL always means failure
+        void *block = malloc((n if n > 0 else 1) *
+                             (sizeof(gsl_rng *) + sizeof(gsl_rng) +
+                              sizeof(unsigned long long)))
+        gsl_rng **rngs = <gsl_rng **>block
+        gsl_rng *gens
+        unsigned long long *states
+        Py_ssize_t i
+    if block == NULL:
+        return NULL
+    gens = <gsl_rng *>(rngs + n)
+    states = <unsigned long long *>(gens + n)
+    for i in range(n):
+        gens[i].type = &splitmix64_type
+        gens[i].state = &states[i]
+        rngs[i] = &gens[i]
+    seed_rng_streams(rngs, n, seed)
+    return rngs
+
+
+cdef void seed_rng_streams(gsl_rng **rngs, Py_ssize_t n,
+                           unsigned long long seed) nogil:
+    cdef Py_ssize_t i
+    for i in range(n):
+        gsl_rng_set(rngs[i], splitmix64(splitmix64(seed) + <unsigned long long>i))
+
+
+cdef void free_rng_streams(gsl_rng **rngs, Py_ssize_t n) nogil:
+    free(rngs)
+
+
+cdef class RNGStreams:
+    """Holds `n` streams like those returned by `get_rng_streams`, so that
+    they can be reseeded at every step instead of reallocated.
+    """
+
+    def __cinit__(self, Py_ssize_t n):
+        self.n = n
+        self.rngs = get_rng_streams(0, n)
+        if self.rngs == NULL:
+            raise MemoryError(f"could not allocate {n} RNG streams")
+
+    def __dealloc__(self):
+        if self.rngs != NULL:
+            free_rng_streams(self.rngs, self.n)
+
+    cpdef void seed(self, unsigned long long seed):
+        seed_rng_streams(self.rngs, self.n, seed)
+
+    def seed_blocks(self, seeds):
+        """Splits the streams into `len(seeds)` equal blocks, and seeds block
+        `k` as if it were its own RNGStreams seeded with `seeds[k]`.
+        """
+        cdef:
+            unsigned long long [:] seed_view = np.asarray(
+                seeds, dtype=np.uint64)
+            Py_ssize_t k, block_len
+        if seed_view.shape[0] == 0 or self.n % seed_view.shape[0] != 0:
+            raise ValueError(f"cannot split {self.n} streams into " +
+                             f"{seed_view.shape[0]} blocks")
+        block_len = self.n // seed_view.shape[0]
+        for k in range(seed_view.shape[0]):
+            seed_rng_streams(self.rngs + k * block_len, block_len,
+                             seed_view[k])
+
+
+def poisson_streams(double mu, unsigned long long seed, int n_streams,
+                    int draws, int enable_omp):
+    """Draws `draws` Poisson variates from each of `n_streams` streams
+    seeded by `seed`. For testing purposes only.
+    """
+    cdef:
+        gsl_rng **rngs = get_rng_streams(seed, n_streams)
+        Py_ssize_t i, j
+        np.ndarray result_arr = np.zeros((n_streams, draws), dtype=DTYPE_INT)
+        int [:, :] rv = result_arr
+
+    if rngs == NULL:
+        raise MemoryError(f"could not allocate {n_streams} RNG streams")
+    if enable_omp == 0:
+        for i in range(n_streams):
+            for j in range(draws):
+                rv[i, j] = gsl_ran_poisson(rngs[i], mu)
+    else:
+        for i in prange(n_streams, nogil=True):
+            for j in range(draws):
+                rv[i, j] = gsl_ran_poisson(rngs[i], mu)
+    free_rng_streams(rngs, n_streams)
+    return result_arr
+
+
 def discrete_time_approx_wrapper(float rate, float timestep):
     """Thin Python wrapper around the below C function
     """
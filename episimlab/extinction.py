@@ -0,0 +1,46 @@
+import xsimlab as xs
+import xarray as xr
+import numpy as np
+
+from .apply_counts_delta import ApplyCountsDelta
+
+
+@xs.process
+class DetectExtinction:
+    """Flags the epidemic as extinct once the total count in the infected
+    compartments is at most `threshold` in every replicate. Pass the
+    `fast_forward_extinct` hook to `xsimlab.run` to skip the remaining steps
+    of an extinct simulation.
+    """
+    INFECTED = ('E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih')
+
+    counts = xs.foreign(ApplyCountsDelta, 'counts', intent='in')
+    threshold = xs.variable(
+        default=0., static=True, intent='in',
+        description="largest total infected count at which the epidemic is " +
+        "considered extinct")
+    extinct = xs.variable(intent='out', description="epidemic is extinct")
+
+    def is_extinct(self) -> bool:
+        infected = self.counts.loc[dict(compartment=list(self.INFECTED))]
+        total = infected.sum([dim for dim in infected.dims
+                              if dim != 'replicate'])
+        return bool((total <= self.threshold).all())
+
+    def initialize(self):
+        self.extinct = self.is_extinct()
+
+    def run_step(self):
+        self.extinct = self.is_extinct()
+
+
+@xs.runtime_hook('run_step', 'model', 'pre')
+def fast_forward_extinct(model, context, state):
+    """Skips every stage of the current step if a DetectExtinction process in
+    `model` finds the epidemic extinct. The state is carried forward
+    unchanged, so output variables keep their shape.
+    """
+    for p_name in model:
+        p_obj = model[p_name]
+        if isinstance(p_obj, DetectExtinction) and p_obj.is_extinct():
+            return xs.RuntimeSignal.CONTINUE
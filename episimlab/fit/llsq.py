@@ -12,6 +12,7 @@ from scipy.optimize import least_squares
 from episimlab import EPISIMLAB_HOME
 from episimlab.setup.coords import InitCoordsExpectVertex
 from episimlab.models import basic as basic_models
+from episimlab.extinction import fast_forward_extinct
 import xsimlab as xs
 from xsimlab.model import Model
 
@@ -88,11 +89,14 @@ class FitBetaFromHospHeads:
         )
     
     def get_out_ds(self) -> xr.Dataset:
-        """Run model, returning output Dataset"""
+        """Run model, returning output Dataset. Steps after the epidemic
+        goes extinct are skipped.
+        """
         return (self 
                 .get_in_ds() 
                 .xsimlab 
-                .run(model=self.model, decoding=dict(mask_and_scale=False)))
+                .run(model=self.model, hooks=[fast_forward_extinct],
+                     decoding=dict(mask_and_scale=False)))
 
     def calc_residual(self, xvars) -> float:
         # Store current x variable values in attr
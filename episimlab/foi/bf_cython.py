@@ -1,12 +1,18 @@
 import xsimlab as xs
 import xarray as xr
+import numpy as np
 import logging
 from itertools import product
 from numbers import Number
 
 from ..apply_counts_delta import ApplyCountsDelta
 from .base import BaseFOI
-from .bf_cython_engine import brute_force_FOI
+from ..utils.build import import_engine
+
+_engine = import_engine('.bf_cython_engine', package=__package__)
+brute_force_FOI = _engine.brute_force_FOI
+factored_FOI = _engine.factored_FOI
+batched_FOI = _engine.batched_FOI
 
 
 @xs.process
@@ -34,3 +40,76 @@ class BruteForceCythonFOI(BaseFOI):
             dims=self.FOI_DIMS,
             coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
         )
+
+
+@xs.process
+class FactoredCythonFOI(BruteForceCythonFOI):
+    """Like BruteForceCythonFOI, but consumes `phi_t` in the factored form
+    produced by FactoredContact2Phi: a (vertex1, vertex2, age_group1,
+    age_group2) contact array, and a (risk_group1, risk_group2) multiplier
+    `phi_risk`.
+    """
+    phi_risk = xs.global_ref('phi_risk')
+
+    def get_phi_risk(self) -> np.ndarray:
+        """Returns `phi_risk` as a (risk_group1, risk_group2) array ordered
+        like coordinate `risk_group`.
+        """
+        risk = np.asarray(self.risk_group)
+        return self.phi_risk.loc[dict(risk_group1=risk,
+                                      risk_group2=risk)].values
+
+    def run_step(self):
+        """
+        """
+        # Run in cython, returning a numpy array
+        kwargs = dict(
+            counts=self.counts.values,
+            phi_t=self.phi_t.values,
+            phi_risk=self.get_phi_risk(),
+            omega=self.omega.values,
+            beta=self.beta
+        )
+        foi_arr = factored_FOI(**kwargs)
+
+        # Convert the numpy arrray to a DataArray
+        self.foi = xr.DataArray(
+            data=foi_arr,
+            dims=self.FOI_DIMS,
+            coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
+        )
+
+
+@xs.process
+class BatchedCythonFOI(BruteForceCythonFOI):
+    """Like BruteForceCythonFOI, but `counts` has a leading `replicate`
+    dimension, and FOI is calculated for all replicates in one call. `beta`
+    is either a scalar, or has one value per replicate.
+    """
+    FOI_DIMS = ('replicate',) + BaseFOI.FOI_DIMS
+
+    replicate = xs.global_ref('replicate')
+    beta = xs.variable(dims=[(), 'replicate'], intent='in')
+    foi = xs.variable(dims=FOI_DIMS, intent='out')
+
+    def get_beta(self) -> np.ndarray:
+        """Returns an array with the value of `beta` in each replicate."""
+        beta = np.broadcast_to(self.beta, (len(self.replicate),))
+        return beta.astype('float64')
+
+    def run_step(self):
+        """
+        """
+        foi_arr = batched_FOI(
+            counts=self.counts.values,
+            phi_t=self.phi_t.values,
+            omega=self.omega.values,
+            beta=self.get_beta()
+        )
+
+        # Convert the numpy arrray to a DataArray
+        self.foi = xr.DataArray(
+            data=foi_arr,
+            dims=self.FOI_DIMS,
+            coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
+        )
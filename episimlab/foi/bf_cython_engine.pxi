@@ -0,0 +1,321 @@
+import logging
+import numpy as np
+cimport numpy as np
+cimport cython
+from cython cimport floating
+from cython.parallel import prange
+
+# Abbreviate numpy dtypes
+DTYPE_FLOAT = np.float64
+DTYPE_INT = np.intc
+
+def brute_force_FOI(np.ndarray counts,
+                    np.ndarray phi_t,
+                    # np.ndarray rho,
+                    # np.ndarray gamma,
+                    # np.ndarray pi,
+                    # np.ndarray nu,
+                    np.ndarray omega,
+                    # float mu,
+                    # float sigma,
+                    # float eta,
+                    # float tau,
+                    float beta):
+    """`counts` may be single or double precision. `phi_t` is cast to the
+    same precision if needed, and FOI is returned in it.
+    """
+    if counts.dtype == np.float32:
+        return _brute_force_FOI[float](
+            counts, phi_t.astype(np.float32, copy=False), omega, beta)
+    return _brute_force_FOI[double](
+        counts, phi_t.astype(DTYPE_FLOAT, copy=False), omega, beta)
+
+
+cdef np.ndarray _brute_force_FOI(floating [:, :, :, :] counts_view,
+                                floating [:, :, :, :, :, :] phi_view,
+                                # double [:, :] rho_view,
+                                # double [:] gamma_view,
+                                # double [:, :] pi_view,
+                                # double [:] nu_view,
+                                # age, compt
+                                double [:, :] omega_view,
+                                # double mu,
+                                # double sigma,
+                                # double eta,
+                                # double tau,
+                                double beta):
+                                # double int_per_day):
+                                # gsl_rng *rng):
+    """
+    """
+    cdef:
+        # DEBUG
+        double int_per_day = 1.
+        # indexers and lengths of each dimension in state space
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t age_len = counts_view.shape[1]
+        Py_ssize_t risk_len = counts_view.shape[2]
+        Py_ssize_t compt_len = counts_view.shape[3]
+        Py_ssize_t n, a, r, n_2, a_2, r_2, i, j
+
+        # same precision as counts
+        np.ndarray foi = np.nan * np.empty(
+            (node_len, age_len, risk_len),
+            dtype=np.asarray(counts_view).dtype)
+        floating [:, :, :] foi_view = foi
+        # node population is the sum of all compartments for a given
+        # node, age, risk, compartment
+        np.ndarray total_pop_arr = np.sum(
+            counts_view[:, :, :, :], axis=(-1), dtype=DTYPE_FLOAT)
+        double [:, :, :] total_pop = total_pop_arr
+        # flat indices of source cells with any infectious counts
+        Py_ssize_t [:] src_view = np.flatnonzero(
+            (total_pop_arr > 0) &
+            np.any(np.asarray(counts_view)[:, :, :, 2:6] != 0, axis=-1))
+        Py_ssize_t n_src = src_view.shape[0]
+        # epi params
+        double gamma_a, gamma_y, gamma_h, nu, pi, \
+            kappa, report_rate, rho_a, rho_y
+        # epi params for force of infection calculation
+        double phi_1_2, omega_e_2, omega_pa_2, omega_py_2, omega_a_2, \
+            omega_y_2, common_term, deterministic
+        # compartment counts
+        double S, E, Pa, Py, Ia, Iy, Ih, R, D, E2P, E2Py, P2I, Pa2Ia, Py2Iy, \
+            Iy2Ih, H2D
+        # compartment counts for force of infection calculation
+        double E_2, Ia_2, Iy_2, Pa_2, Py_2
+        # delta compartment values
+        double d_S, d_E, d_Pa, d_Py, d_Ia, d_Iy, d_Ih, d_R, d_D
+        # new compartment values, after deltas applied
+        double new_S, new_E, new_Pa, new_Py, new_Ia, new_Iy, new_Ih, new_R, \
+            new_D, new_E2P, new_E2Py, new_P2I, new_Pa2Ia, new_Py2Iy, \
+            new_Iy2Ih, new_H2D
+        # rates between compartments
+        double rate_S2E
+
+    # Iterate over node, age, and risk
+    for n in prange(node_len, nogil=True):
+    # for n in range(node_len):
+        for a in range(age_len):
+            for r in range(risk_len):
+                rate_S2E = 0.
+                S = counts_view[n, a, r, 0]
+                if S == 0:
+                    foi_view[n, a, r] = 0.
+                    continue
+                # only sources with infectious counts contribute
+                for i in range(n_src):
+                    j = src_view[i]
+                    n_2 = j // (age_len * risk_len)
+                    a_2 = (j // risk_len) % age_len
+                    r_2 = j % risk_len
+
+                    # Get phi
+                    phi_1_2 = phi_view[n, n_2, a, a_2, r, r_2]
+
+                    # Enumerate omega
+                    omega_a_2 = omega_view[a_2, 4]
+                    omega_y_2 = omega_view[a_2, 5]
+                    omega_pa_2 = omega_view[a_2, 2]
+                    omega_py_2 = omega_view[a_2, 3]
+
+                    # Get compartments for a_2, r_2
+                    Pa_2 = counts_view[n_2, a_2, r_2, 2]
+                    Py_2 = counts_view[n_2, a_2, r_2, 3]
+                    Ia_2 = counts_view[n_2, a_2, r_2, 4]
+                    Iy_2 = counts_view[n_2, a_2, r_2, 5]
+
+                    # calculate force of infection
+                    common_term = beta * phi_1_2 * S / total_pop[n_2, a_2, r_2]
+                    rate_S2E = rate_S2E + (common_term * (
+                        (omega_a_2 * Ia_2) + \
+                        (omega_y_2 * Iy_2) + \
+                        (omega_pa_2 * Pa_2) + \
+                        (omega_py_2 * Py_2)))
+                foi_view[n, a, r] = rate_S2E
+    return foi
+
+
+def factored_FOI(np.ndarray counts,
+                 np.ndarray phi_t,
+                 np.ndarray phi_risk,
+                 np.ndarray omega,
+                 float beta):
+    """Like `brute_force_FOI`, but `phi_t` is passed in factored form: a
+    (vertex1, vertex2, age1, age2) contact array `phi_t`, and a (risk1, risk2)
+    multiplier `phi_risk`.
+    """
+    cdef:
+        double [:, :, :, :] counts_view = counts
+        double [:, :, :, :] phi_view = phi_t
+        double [:, :] phi_risk_view = phi_risk
+        double [:, :] omega_view = omega
+
+    return _factored_FOI(
+        counts_view,
+        phi_view,
+        phi_risk_view,
+        omega_view,
+        beta,
+    )
+
+
+cdef np.ndarray _factored_FOI(double [:, :, :, :] counts_view,
+                              double [:, :, :, :] phi_view,
+                              double [:, :] phi_risk_view,
+                              double [:, :] omega_view,
+                              double beta):
+    """
+    """
+    cdef:
+        # indexers and lengths of each dimension in state space
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t age_len = counts_view.shape[1]
+        Py_ssize_t risk_len = counts_view.shape[2]
+        Py_ssize_t n, a, r, n_2, a_2, r_2, i, j, n_src
+
+        np.ndarray foi = np.nan * np.empty(
+            (node_len, age_len, risk_len), dtype=DTYPE_FLOAT)
+        double [:, :, :] foi_view = foi
+        Py_ssize_t [:] src_view
+        np.ndarray total_pop_arr = np.sum(counts_view[:, :, :, :], axis=(-1))
+        double [:, :, :] total_pop = total_pop_arr
+        # infectious pressure exerted by each node, age, and risk group
+        np.ndarray pressure_arr = np.zeros(
+            (node_len, age_len, risk_len), dtype=DTYPE_FLOAT)
+        double [:, :, :] pressure = pressure_arr
+        double phi_1_2, S, rate_S2E
+
+    for n_2 in prange(node_len, nogil=True):
+        for a_2 in range(age_len):
+            for r_2 in range(risk_len):
+                # Ignore case where node population is zero or negative
+                if total_pop[n_2, a_2, r_2] <= 0:
+                    continue
+                pressure[n_2, a_2, r_2] = (
+                    (omega_view[a_2, 4] * counts_view[n_2, a_2, r_2, 4]) + \
+                    (omega_view[a_2, 5] * counts_view[n_2, a_2, r_2, 5]) + \
+                    (omega_view[a_2, 2] * counts_view[n_2, a_2, r_2, 2]) + \
+                    (omega_view[a_2, 3] * counts_view[n_2, a_2, r_2, 3])
+                ) / total_pop[n_2, a_2, r_2]
+
+    # only sources that exert pressure contribute
+    src_view = np.flatnonzero(pressure_arr)
+    n_src = src_view.shape[0]
+
+    # Iterate over node, age, and risk
+    for n in prange(node_len, nogil=True):
+        for a in range(age_len):
+            for r in range(risk_len):
+                rate_S2E = 0.
+                S = counts_view[n, a, r, 0]
+                if S == 0:
+                    foi_view[n, a, r] = 0.
+                    continue
+                for i in range(n_src):
+                    j = src_view[i]
+                    n_2 = j // (age_len * risk_len)
+                    a_2 = (j // risk_len) % age_len
+                    r_2 = j % risk_len
+                    phi_1_2 = phi_view[n, n_2, a, a_2]
+                    if phi_1_2 == 0.:
+                        continue
+                    rate_S2E = rate_S2E + (phi_1_2 * \
+                        phi_risk_view[r, r_2] * pressure[n_2, a_2, r_2])
+                foi_view[n, a, r] = beta * S * rate_S2E
+    return foi
+
+
+def batched_FOI(np.ndarray counts,
+                np.ndarray phi_t,
+                np.ndarray omega,
+                np.ndarray beta):
+    """Like `brute_force_FOI`, but `counts` has a leading replicate dimension,
+    and `beta` is an array with one value per replicate. All replicates share
+    `phi_t` and `omega`.
+    """
+    cdef:
+        double [:, :, :, :, :] counts_view = counts
+        double [:, :, :, :, :, :] phi_view = phi_t
+        double [:, :] omega_view = omega
+        double [:] beta_view = beta
+
+    if beta_view.shape[0] != counts_view.shape[0]:
+        raise ValueError(f"expected {counts_view.shape[0]} values of beta, " +
+                         f"received {beta_view.shape[0]}")
+    return _batched_FOI(counts_view, phi_view, omega_view, beta_view)
+
+
+cdef np.ndarray _batched_FOI(double [:, :, :, :, :] counts_view,
+                             double [:, :, :, :, :, :] phi_view,
+                             double [:, :] omega_view,
+                             double [:] beta_view):
+    """
+    """
+    cdef:
+        # indexers and lengths of each dimension in state space
+        Py_ssize_t rep_len = counts_view.shape[0]
+        Py_ssize_t node_len = counts_view.shape[1]
+        Py_ssize_t age_len = counts_view.shape[2]
+        Py_ssize_t risk_len = counts_view.shape[3]
+        Py_ssize_t compt_len = counts_view.shape[4]
+        # index over every pair of replicate and node
+        Py_ssize_t i, k, n, a, r, c, n_2, a_2, r_2, s, j
+        Py_ssize_t cell_len = node_len * age_len * risk_len
+
+        np.ndarray foi = np.nan * np.empty(
+            (rep_len, node_len, age_len, risk_len), dtype=DTYPE_FLOAT)
+        double [:, :, :, :] foi_view = foi
+        # infectious pressure exerted by each node, age, and risk group
+        np.ndarray pressure_arr = np.zeros(
+            (rep_len, node_len, age_len, risk_len), dtype=DTYPE_FLOAT)
+        double [:, :, :, :] pressure = pressure_arr
+        # flat indices of the sources that exert pressure in each replicate
+        np.ndarray src_arr = np.empty((rep_len, cell_len), dtype=np.intp)
+        Py_ssize_t [:, :] src_view = src_arr
+        Py_ssize_t [:] n_src = np.empty(rep_len, dtype=np.intp)
+        double total_pop, rate_S2E
+
+    for i in prange(rep_len * node_len, nogil=True):
+        k = i // node_len
+        n_2 = i % node_len
+        for a_2 in range(age_len):
+            for r_2 in range(risk_len):
+                total_pop = 0.
+                for c in range(compt_len):
+                    total_pop = total_pop + counts_view[k, n_2, a_2, r_2, c]
+                # Ignore case where node population is zero or negative
+                if total_pop <= 0:
+                    continue
+                pressure[k, n_2, a_2, r_2] = (
+                    (omega_view[a_2, 4] * counts_view[k, n_2, a_2, r_2, 4]) + \
+                    (omega_view[a_2, 5] * counts_view[k, n_2, a_2, r_2, 5]) + \
+                    (omega_view[a_2, 2] * counts_view[k, n_2, a_2, r_2, 2]) + \
+                    (omega_view[a_2, 3] * counts_view[k, n_2, a_2, r_2, 3])
+                ) / total_pop
+
+    for k in range(rep_len):
+        src = np.flatnonzero(pressure_arr[k])
+        n_src[k] = src.shape[0]
+        src_arr[k, :src.shape[0]] = src
+
+    for i in prange(rep_len * node_len, nogil=True):
+        k = i // node_len
+        n = i % node_len
+        for a in range(age_len):
+            for r in range(risk_len):
+                rate_S2E = 0.
+                if counts_view[k, n, a, r, 0] == 0:
+                    foi_view[k, n, a, r] = 0.
+                    continue
+                for s in range(n_src[k]):
+                    j = src_view[k, s]
+                    n_2 = j // (age_len * risk_len)
+                    a_2 = (j // risk_len) % age_len
+                    r_2 = j % risk_len
+                    rate_S2E = rate_S2E + (
+                        phi_view[n, n_2, a, a_2, r, r_2] * \
+                        pressure[k, n_2, a_2, r_2])
+                foi_view[k, n, a, r] = beta_view[k] * \
+                    counts_view[k, n, a, r, 0] * rate_S2E
+    return foi
@@ -0,0 +1,14 @@
+#!python
+#cython: boundscheck=False
+#cython: cdivision=True
+#cython: infertypes=False
+#cython: initializedcheck=False
+#cython: nonecheck=False
+#cython: wraparound=False
+#distutils: language = c
+#distutils: extra_link_args = ['-lgsl', '-lgslcblas', '-fopenmp']
+#distutils: extra_compile_args = -Wno-unused-function -Wno-unneeded-internal-declaration -Wno-nonnull -Wno-nullability-completeness
+
+# Optimized build of bf_cython_engine.pxi, without bounds or None
+# checks. The checked build is bf_cython_engine.pyx.
+include "bf_cython_engine.pxi"
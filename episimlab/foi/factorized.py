@@ -0,0 +1,142 @@
+import xsimlab as xs
+import xarray as xr
+import numpy as np
+import logging
+
+from ..apply_counts_delta import ApplyCountsDelta
+from .base import BaseFOI
+
+
+def get_pressure(counts_I, omega_I, total_pop) -> np.ndarray:
+    """Reduces infectious counts `counts_I` (vertex, age, risk, compartment)
+    to a per-(vertex, age, risk) infectious pressure: the omega-weighted sum
+    of infectious compartments divided by the total population. Groups with
+    zero or negative population exert no pressure.
+    """
+    weighted = np.einsum('varc,ac->var', counts_I, omega_I)
+    pressure = np.zeros_like(weighted)
+    np.divide(weighted, total_pop, out=pressure, where=(total_pop > 0))
+    return pressure
+
+
+# order of phi dims in which each (vertex, age, risk) group is contiguous, so
+# that phi is a matrix without copying
+GROUPED_PHI_DIMS = ('vertex1', 'age_group1', 'risk_group1',
+                    'vertex2', 'age_group2', 'risk_group2')
+
+
+def group_phi(phi_t) -> np.ndarray:
+    """Returns DataArray `phi_t` as a matrix, with a row for each (vertex1,
+    age1, risk1) group and a column for each (vertex2, age2, risk2) group.
+    This is a view if `phi_t` is already C-contiguous in GROUPED_PHI_DIMS
+    order, and a copy otherwise.
+    """
+    phi = np.ascontiguousarray(phi_t.transpose(*GROUPED_PHI_DIMS).values)
+    n_group = int(np.prod(phi.shape[:3]))
+    return phi.reshape(n_group, n_group)
+
+
+def factorized_FOI(counts_S, pressure, phi_2d, beta) -> np.ndarray:
+    """Calculates force of infection as a single matrix-vector product of
+    `phi_2d`, phi as returned by `group_phi`, and the infectious `pressure`
+    vector (vertex2, age2, risk2). The product is dispatched to BLAS without
+    copying `phi_2d`. Returns array with dims (vertex, age, risk).
+    """
+    contact = (phi_2d @ pressure.ravel()).reshape(pressure.shape)
+    return beta * counts_S * contact
+
+
+def factored_FOI(counts_S, pressure, phi_t, phi_risk, beta) -> np.ndarray:
+    """Like `factorized_FOI`, but `phi_t` is passed in factored form: a
+    (vertex1, vertex2, age1, age2) contact array `phi_t`, and a (risk1, risk2)
+    multiplier `phi_risk`. The multiplier is first applied to the much
+    smaller `pressure` vector, so the full phi array is never built.
+    """
+    pressure_r = np.tensordot(pressure, phi_risk, axes=([2], [1]))
+    contact = np.tensordot(phi_t, pressure_r, axes=([1, 3], [0, 1]))
+    return beta * counts_S * contact
+
+
+@xs.process
+class FactorizedFOI(BaseFOI):
+    """Calculates force of infection (FOI) by first reducing `counts` to an
+    infectious pressure per vertex, age and risk group, then contracting
+    `phi_t` against this pressure vector. Equivalent to BruteForceFOI, but
+    the costly inner loop runs as a single matrix-vector product.
+
+    `phi_t` is contracted in GROUPED_PHI_DIMS order. If it is in another
+    order, it is copied into that order once, and the copy is reused until
+    `phi_t` is replaced by a new array. `phi_t` must therefore not be
+    modified in place.
+    """
+    INFECTIOUS_COMPTS = ['Ia', 'Iy', 'Pa', 'Py']
+
+    phi_t = xs.global_ref('phi_t')
+    counts = xs.foreign(ApplyCountsDelta, 'counts', intent='in')
+
+    def get_pressure(self) -> np.ndarray:
+        compt_I = dict(compartment=self.INFECTIOUS_COMPTS)
+        return get_pressure(
+            counts_I=self.counts.loc[compt_I].values,
+            omega_I=self.omega.loc[compt_I].values,
+            total_pop=self.counts.sum(dim='compartment').values
+        )
+
+    def get_phi_2d(self) -> np.ndarray:
+        """Returns `phi_t` as a matrix from `group_phi`."""
+        if getattr(self, '_phi_src', None) is not self.phi_t:
+            self._phi_2d = group_phi(self.phi_t)
+            self._phi_src = self.phi_t
+        return self._phi_2d
+
+    def run_step(self):
+        """
+        """
+        foi_arr = factorized_FOI(
+            counts_S=self.counts.loc[dict(compartment='S')].values,
+            pressure=self.get_pressure(),
+            phi_2d=self.get_phi_2d(),
+            beta=self.beta
+        )
+
+        # Convert the numpy arrray to a DataArray
+        self.foi = xr.DataArray(
+            data=foi_arr,
+            dims=self.FOI_DIMS,
+            coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
+        )
+
+
+@xs.process
+class FactoredFOI(FactorizedFOI):
+    """Like FactorizedFOI, but consumes `phi_t` in the factored form produced
+    by FactoredContact2Phi: a (vertex1, vertex2, age_group1, age_group2)
+    contact array, and a (risk_group1, risk_group2) multiplier `phi_risk`.
+    """
+    phi_risk = xs.global_ref('phi_risk')
+
+    def get_phi_risk(self) -> np.ndarray:
+        """Returns `phi_risk` as a (risk_group1, risk_group2) array ordered
+        like coordinate `risk_group`.
+        """
+        risk = np.asarray(self.risk_group)
+        return self.phi_risk.loc[dict(risk_group1=risk,
+                                      risk_group2=risk)].values
+
+    def run_step(self):
+        """
+        """
+        foi_arr = factored_FOI(
+            counts_S=self.counts.loc[dict(compartment='S')].values,
+            pressure=self.get_pressure(),
+            phi_t=self.phi_t.values,
+            phi_risk=self.get_phi_risk(),
+            beta=self.beta
+        )
+
+        # Convert the numpy arrray to a DataArray
+        self.foi = xr.DataArray(
+            data=foi_arr,
+            dims=self.FOI_DIMS,
+            coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
+        )
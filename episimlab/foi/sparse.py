@@ -0,0 +1,60 @@
+import xsimlab as xs
+import xarray as xr
+import numpy as np
+import logging
+
+from .factorized import FactoredFOI
+from ..utils import get_pair_index, pairs_to_bsr
+
+
+def sparse_FOI(counts_S, pressure, phi_bsr, phi_risk, beta) -> np.ndarray:
+    """Sparse counterpart of `factored_FOI`. `phi_bsr` is a block sparse
+    matrix with one (age1, age2) block for each vertex pair, with rows
+    (vertex1, age1) and columns (vertex2, age2) ordered like `counts_S`.
+    Only stored vertex pairs contribute to the contraction. The (risk1,
+    risk2) multiplier `phi_risk` is applied to `pressure` beforehand.
+    """
+    n_vertex, n_age, n_risk = counts_S.shape
+    pressure_r = np.tensordot(pressure, phi_risk, axes=([2], [1]))
+    contact = (phi_bsr @ pressure_r.reshape(n_vertex * n_age, n_risk))
+    return beta * counts_S * contact.reshape(counts_S.shape)
+
+
+@xs.process
+class SparseFOI(FactoredFOI):
+    """Like FactoredFOI, but consumes the sparse `phi_t` produced by
+    SparseContact2Phi, which is indexed on dimension `vertex_pair`.
+    """
+
+    def get_phi_bsr(self):
+        """Returns `phi_t` as a block sparse matrix for `sparse_FOI`. The
+        matrix is reused until `phi_t` is replaced by a new array.
+        """
+        if getattr(self, '_phi_src', None) is not self.phi_t:
+            phi = self.phi_t.transpose('vertex_pair', 'age_group1', 'age_group2')
+            self._phi_bsr = pairs_to_bsr(
+                np.ascontiguousarray(phi.values),
+                row=get_pair_index(phi.coords['vertex1'].values, self.vertex),
+                col=get_pair_index(phi.coords['vertex2'].values, self.vertex),
+                n=len(self.vertex)
+            )
+            self._phi_src = self.phi_t
+        return self._phi_bsr
+
+    def run_step(self):
+        """
+        """
+        foi_arr = sparse_FOI(
+            counts_S=self.counts.loc[dict(compartment='S')].values,
+            pressure=self.get_pressure(),
+            phi_bsr=self.get_phi_bsr(),
+            phi_risk=self.get_phi_risk(),
+            beta=self.beta
+        )
+
+        # Convert the numpy arrray to a DataArray
+        self.foi = xr.DataArray(
+            data=foi_arr,
+            dims=self.FOI_DIMS,
+            coords={dim: getattr(self, dim) for dim in self.FOI_DIMS}
+        )
@@ -0,0 +1,195 @@
+import os
+import io
+import csv
+import logging
+import pandas as pd
+import numpy as np
+from functools import lru_cache
+from ..utils.columnar import is_columnar, table_file, read_columnar, read_meta
+
+# number of travel indexes that are kept for reuse
+INDEX_CACHE_SIZE = 8
+
+
+class TravelCSVIndex:
+    """Index of the byte ranges that hold each date in travel CSV `fp`,
+    built by streaming the file once. Rows for a subset of dates can then
+    be read without loading the rest of the file. Quoted fields may contain
+    commas, but not newlines: each row is assumed to be one line.
+    """
+    # number of bytes to scan from `fp` at a time
+    CHUNK_BYTES = 2 ** 24
+
+    def __init__(self, fp, date_col='date'):
+        self.fp = fp
+        self.date_col = date_col
+        self.header, ranges = self.scan()
+
+        # map raw date strings to timestamps, merging equivalent strings
+        self.ranges = dict()
+        for raw, rng in ranges.items():
+            date = pd.Timestamp(raw)
+            self.ranges.setdefault(date, list()).extend(rng)
+        self.dates = pd.DatetimeIndex(sorted(self.ranges))
+
+    def scan(self) -> tuple:
+        """Returns the header line and a dictionary of (start, end) byte
+        ranges of contiguous rows, keyed on raw date string. The file is
+        read in chunks of whole lines.
+        """
+        ranges = dict()
+        with open(self.fp, 'rb') as f:
+            header = f.readline()
+            names = pd.read_csv(io.BytesIO(header)).columns
+            if self.date_col not in names:
+                raise KeyError(f"column {self.date_col} not found in {self.fp}")
+            col = names.get_loc(self.date_col)
+            offset = len(header)
+            while True:
+                chunk = f.read(self.CHUNK_BYTES)
+                if not chunk:
+                    break
+                # extend to the end of the last line
+                chunk += f.readline()
+                self.scan_chunk(chunk, offset, col, ranges)
+                offset += len(chunk)
+        return header, ranges
+
+    def scan_chunk(self, chunk, offset, col, ranges):
+        """Adds the byte ranges of rows in `chunk`, which starts at byte
+        `offset` of the file, to `ranges`.
+        """
+        buf = np.frombuffer(chunk, dtype=np.uint8)
+        ends = np.flatnonzero(buf == ord('\n')) + 1
+        if not chunk.endswith(b'\n'):
+            ends = np.append(ends, len(buf))
+        starts = np.concatenate([[0], ends[:-1]])
+
+        # chunks with quoted fields are parsed line by line
+        if b'"' in chunk:
+            fields = self.quoted_fields(chunk, starts, ends, col)
+        else:
+            fields = self.unquoted_fields(buf, starts, ends, col)
+
+        # first and last row of each run of contiguous rows with the same field
+        run_first = np.flatnonzero(np.concatenate([[True], fields[1:] != fields[:-1]]))
+        run_last = np.append(run_first[1:], len(fields)) - 1
+        for i, j in zip(run_first, run_last):
+            raw = fields[i].strip().strip(b'"').decode()
+            if not raw:
+                # skip blank lines, which are the only rows without a date
+                for start, end in zip(starts[i:j + 1], ends[i:j + 1]):
+                    if chunk[start:end].strip():
+                        raise ValueError(f"no {self.date_col} in row at byte " +
+                                         f"{offset + start} of {self.fp}")
+                continue
+            start, end = int(starts[i] + offset), int(ends[j] + offset)
+            rng = ranges.setdefault(raw, list())
+            if rng and rng[-1][1] == start:
+                rng[-1] = (rng[-1][0], end)
+            else:
+                rng.append((start, end))
+
+    @staticmethod
+    def unquoted_fields(buf, starts, ends, col) -> np.ndarray:
+        """Returns the field in column `col` of each line from `starts` to
+        `ends` in byte array `buf`, as an array of fixed-width byte strings.
+        Fields are found from the positions of commas, so `buf` must not
+        contain quoted fields.
+        """
+        # the field in column `col` lies between the col-th and (col + 1)-th
+        # commas in each line. Lines with fewer columns have empty fields
+        commas = np.append(np.flatnonzero(buf == ord(',')), len(buf))
+        first = np.searchsorted(commas, starts)
+        field_ends = np.minimum(commas[np.minimum(first + col, len(commas) - 1)], ends)
+        if col == 0:
+            field_starts = starts
+        else:
+            field_starts = np.minimum(commas[first + col - 1] + 1, field_ends)
+
+        # gather fields into an array of fixed-width byte strings
+        width = max(int((field_ends - field_starts).max()), 1)
+        pos = field_starts[:, None] + np.arange(width)
+        fields = buf[np.minimum(pos, len(buf) - 1)]
+        fields[pos >= field_ends[:, None]] = 0
+        return fields.view(f"S{width}").ravel()
+
+    @staticmethod
+    def quoted_fields(chunk, starts, ends, col) -> np.ndarray:
+        """Like `unquoted_fields`, but parses each line of `chunk` with
+        `csv.reader`, so that quoted fields may contain commas.
+        """
+        lines = (chunk[start:end].decode() for start, end in zip(starts, ends))
+        fields = [row[col] if len(row) > col else ''
+                  for row in csv.reader(lines)]
+        return np.array([field.encode() for field in fields], dtype=bytes)
+
+    def read(self, dates=None, **kwargs) -> pd.DataFrame:
+        """Reads rows for each of `dates` into a DataFrame, in file order.
+        Reads all rows if `dates` is None. Keyword arguments are passed to
+        `pd.read_csv`.
+        """
+        if dates is None:
+            dates = self.dates
+        ranges = sorted(rng for date in dates for rng in self.ranges.get(pd.Timestamp(date), []))
+        buf = io.BytesIO()
+        buf.write(self.header)
+        with open(self.fp, 'rb') as f:
+            for start, end in ranges:
+                f.seek(start)
+                chunk = f.read(end - start)
+                buf.write(chunk)
+                if not chunk.endswith(b'\n'):
+                    buf.write(b'\n')
+        buf.seek(0)
+        return pd.read_csv(buf, **kwargs)
+
+
+class ColumnarTravelIndex:
+    """Reads rows of a columnar travel table for a subset of dates. Has the
+    same interface as TravelCSVIndex. Rows must be sorted on `date_col`, as
+    written by `convert` with `--sort-by date`.
+    """
+
+    def __init__(self, fp, date_col='date'):
+        self.fp = fp
+        self.date_col = date_col
+        meta = read_meta(fp)
+        if meta.get('sort_by') != date_col:
+            raise ValueError(f"columnar travel table {fp} must be sorted " +
+                             f"on column {date_col}")
+        info = next(c for c in meta['columns'] if c['name'] == date_col)
+        self.date_arr = np.load(os.path.join(fp, info['file']), mmap_mode='r')
+        self.dates = pd.DatetimeIndex(np.unique(self.date_arr))
+
+    def read(self, dates=None) -> pd.DataFrame:
+        """Reads rows for each of `dates` into a DataFrame, in file order.
+        Reads all rows if `dates` is None.
+        """
+        if dates is None:
+            return read_columnar(self.fp)
+        dates = pd.DatetimeIndex(dates).values.astype('datetime64[ns]')
+        starts = np.searchsorted(self.date_arr, dates, side='left')
+        ends = np.searchsorted(self.date_arr, dates, side='right')
+        rows = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]
+                              + [np.array([], dtype=int)])
+        return read_columnar(self.fp, rows=np.sort(rows))
+
+
+def get_travel_index(fp, date_col='date'):
+    """Returns TravelCSVIndex for travel CSV `fp`, or ColumnarTravelIndex if
+    `fp` is a columnar table. Indexes of the INDEX_CACHE_SIZE most recently
+    used files are reused until the file is modified.
+    """
+    stat = os.stat(table_file(fp))
+    return _load_index(os.path.abspath(fp), stat.st_mtime, stat.st_size, date_col)
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _load_index(fp, mtime, size, date_col):
+    """Builds the index for `get_travel_index`. `mtime` and `size` are only
+    used to invalidate the cache.
+    """
+    logging.debug(f"Indexing dates in travel file {fp}")
+    cls = ColumnarTravelIndex if is_columnar(fp) else TravelCSVIndex
+    return cls(fp, date_col=date_col)
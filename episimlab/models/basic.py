@@ -3,15 +3,22 @@ import xsimlab as xs
 from ..setup import seed, sto, epi, counts, coords, adj, phi
 from ..foi import (
     brute_force as bf_foi,
-    bf_cython as bf_cython_foi
+    bf_cython as bf_cython_foi,
+    factorized as factorized_foi,
+    sparse as sparse_foi
 )
 from ..seir import (
     base as base_seir,
     brute_force as bf_seir,
-    bf_cython as bf_cython_seir
+    bf_cython as bf_cython_seir,
+    fused as fused_seir,
+    vectorized as vectorized_seir
+)
+from .. import apply_counts_delta, extinction
+from ..partition.partition import (
+    NC2Contact, Contact2Phi, FactoredContact2Phi, SparsePartition2Contact,
+    SparseContact2Phi
 )
-from .. import apply_counts_delta
-from ..partition.partition import NC2Contact, Contact2Phi
 from ..io.config import ReadV1Config
 from ..network import cython_explicit_travel
 
@@ -51,7 +58,10 @@ def minimum_viable():
         seir=base_seir.BaseSEIR,
 
         # Apply all changes made to counts
-        apply_counts_delta=apply_counts_delta.ApplyCountsDelta
+        apply_counts_delta=apply_counts_delta.ApplyCountsDelta,
+
+        # Flag extinction, for use with hook `extinction.fast_forward_extinct`
+        detect_extinction=extinction.DetectExtinction
     ))
 
 
@@ -69,6 +79,16 @@ def slow_seir():
     ))
 
 
+def vec_seir():
+    """NumPy FOI and SEIR, which do not use the Cython extensions.
+    """
+    model = slow_seir()
+    return model.update_processes(dict(
+        foi=factorized_foi.FactorizedFOI,
+        seir=vectorized_seir.VectorizedSEIR,
+    ))
+
+
 def cy_adj():
     model = minimum_viable()
     return model.update_processes(dict(
@@ -104,6 +124,46 @@ def cy_seir_cy_foi():
     ))
 
 
+def cy_batched():
+    """Like `cy_seir_cy_foi`, but runs `setup_counts__n_replicates`
+    replicates at once, along a leading `replicate` dimension of `counts`.
+    """
+    model = cy_seir_cy_foi()
+    return model.update_processes(dict(
+        setup_counts=counts.InitReplicateCounts,
+        foi=bf_cython_foi.BatchedCythonFOI,
+        seir=bf_cython_seir.BatchedCythonSEIR,
+    ))
+
+
+def cy_float32():
+    """Like `cy_seir_cy_foi`, but `counts` and `phi_t` are single precision,
+    which halves their memory. The engines accumulate in double precision.
+    """
+    model = cy_seir_cy_foi()
+    return model.update_processes(dict(
+        setup_counts=counts.InitFloat32Counts,
+        setup_phi=phi.InitFloat32Phi,
+    ))
+
+
+def cy_fused_foi_seir():
+    """Like `cy_seir_cy_foi`, but FOI and SEIR are calculated in one pass by
+    a single process, which takes the place of both `foi` and `seir`.
+    """
+    model = cy_seir_cy_foi()
+    processes = {k: type(model[k]) for k in model if k != 'foi'}
+    processes['seir'] = fused_seir.FusedFOISEIR
+    return xs.Model(processes)
+
+
+def cy_seir_factorized_foi():
+    model = cy_seir_cy_foi()
+    return model.update_processes(dict(
+        foi=factorized_foi.FactorizedFOI,
+    ))
+
+
 def cy_seir_cy_foi_cy_adj():
     model = cy_seir_cy_foi()
     return model.update_processes(dict(
@@ -114,6 +174,17 @@ def cy_seir_cy_foi_cy_adj():
     ))
 
 
+def cy_seir_cy_foi_sparse_adj():
+    """Like `cy_seir_cy_foi`, with travel between vertices on a sparse
+    adjacency, loaded from edge list `setup_adj__adj_fp`.
+    """
+    model = cy_seir_cy_foi()
+    return model.update_processes(dict(
+        setup_adj=adj.InitSparseAdj,
+        travel=cython_explicit_travel.CythonSparseTravel,
+    ))
+
+
 def partition():
     model = minimum_viable()
     return (model
@@ -124,4 +195,27 @@ def partition():
                 setup_coords=Contact2Phi, 
                 get_contact_xr=NC2Contact, 
             ))
-           )
\ No newline at end of file
+           )
+
+
+def sparse_partition():
+    """Partitions travel data into a sparse contact array, which is carried
+    through to a sparse phi array and FOI calculation.
+    """
+    model = partition()
+    return model.update_processes(dict(
+        foi=sparse_foi.SparseFOI,
+        setup_coords=SparseContact2Phi,
+        get_contact_xr=SparsePartition2Contact,
+    ))
+
+
+def factored_partition():
+    """Like `partition`, but `phi_t` is kept in factored form, with risk
+    group structure carried by a separate `phi_risk` multiplier.
+    """
+    model = partition()
+    return model.update_processes(dict(
+        foi=bf_cython_foi.FactoredCythonFOI,
+        setup_coords=FactoredContact2Phi,
+    ))
@@ -1,5 +1,6 @@
 import xsimlab as xs
 import xarray as xr
+import numpy as np
 import logging
 from itertools import product
 from numbers import Number
@@ -7,27 +8,39 @@ from numbers import Number
 from ..seir.base import BaseSEIR
 from ..apply_counts_delta import ApplyCountsDelta
 from ..setup.coords import InitDefaultCoords
-from ..setup.adj import InitAdjGrpMapping, InitToyAdj
-from .cython_explicit_travel_engine import graph_high_gran
+from ..setup.adj import InitAdjGrpMapping, InitToyAdj, InitSparseAdj
+from ..utils.build import import_engine
+
+_engine = import_engine('.cython_explicit_travel_engine', package=__package__)
+graph_high_gran = _engine.graph_high_gran
+graph_sparse = _engine.graph_sparse
+TravelWorkspace = _engine.TravelWorkspace
 
 
 @xs.process
-class CythonExplicitTravel:
-    """Calculate change in `counts` due to travel between nodes.
+class BaseTravel:
+    """Base class for travel between nodes. Only `mobile_compartments` are
+    passed to the travel engine; the rest stay put. The engine's edge
+    structures and buffers are kept in a TravelWorkspace for the whole run.
     """
 
     # COUNTS_DIMS = ('vertex', 'age_group', 'risk_group', 'compartment')
     COUNTS_DIMS = ApplyCountsDelta.COUNTS_DIMS
-
-    age_group = xs.global_ref('age_group')
-    risk_group = xs.global_ref('risk_group')
-    vertex = xs.global_ref('vertex')
-    compartment = xs.global_ref('compartment')
+    # hospitalized, dead, and tally compartments do not travel
+    MOBILE_COMPARTMENTS = ('S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'R')
 
     # TODO: switch to globals
     stochastic = xs.foreign(BaseSEIR, 'stochastic', intent='in')
     seed_state = xs.foreign(BaseSEIR, 'seed_state', intent='in')
 
+    mobile_compartments = xs.variable(
+        dims=('mobile_compartment'),
+        default=list(MOBILE_COMPARTMENTS),
+        static=True,
+        intent='in',
+        global_name='mobile_compartments',
+        description='compartments that travel between nodes'
+    )
     counts = xs.foreign(ApplyCountsDelta, 'counts', intent='in')
     counts_delta_gph = xs.variable(
         groups=['counts_delta'],
@@ -36,20 +49,41 @@ class CythonExplicitTravel:
         intent='out'
     )
 
-    adj_t = xs.foreign(InitToyAdj, 'adj_t', intent='in')
+    def initialize(self):
+        self.workspace = TravelWorkspace()
 
-    def run_step(self):
-        """
+    def get_mobile_index(self) -> np.ndarray:
+        """Integer positions of `mobile_compartments` on `counts`."""
+        idx = self.counts.get_index('compartment').get_indexer(
+            list(self.mobile_compartments))
+        if (idx < 0).any():
+            raise KeyError(f"mobile compartments {self.mobile_compartments} " +
+                           f"not found in counts")
+        return idx
+
+    def select_mobile(self, da) -> xr.DataArray:
+        """Selects `mobile_compartments` from `da`, if it also holds other
+        compartments.
         """
-        assert isinstance(self.adj_t, xr.DataArray)
-        assert isinstance(self.counts, xr.DataArray)
+        if list(da['compartment'].values) != list(self.mobile_compartments):
+            da = da.sel(compartment=list(self.mobile_compartments))
+        return da
 
-        self.counts_delta_gph_arr = graph_high_gran(
-            counts=self.counts.values,
-            adj_t=self.adj_t.values,
+    def get_delta(self, graph_func, **kwargs) -> np.ndarray:
+        """Calls `graph_func` on the mobile compartments of `counts`, and
+        returns its delta on all compartments.
+        """
+        idx = self.get_mobile_index()
+        counts = self.counts.values
+        delta = np.zeros_like(counts)
+        delta[..., idx] = graph_func(
+            counts=counts[..., idx],
             stochastic=self.stochastic,
-            int_seed=self.seed_state
+            int_seed=self.seed_state,
+            workspace=self.workspace,
+            **kwargs
         )
+        return delta
 
     def finalize_step(self):
         self.counts_delta_gph = xr.DataArray(
@@ -57,3 +91,46 @@ class CythonExplicitTravel:
             dims=self.counts.dims,
             coords=self.counts.coords
         )
+
+
+@xs.process
+class CythonExplicitTravel(BaseTravel):
+    """Calculate change in `counts` due to travel between nodes.
+    """
+
+    age_group = xs.global_ref('age_group')
+    risk_group = xs.global_ref('risk_group')
+    vertex = xs.global_ref('vertex')
+    compartment = xs.global_ref('compartment')
+
+    adj_t = xs.foreign(InitToyAdj, 'adj_t', intent='in')
+
+    def run_step(self):
+        """
+        """
+        assert isinstance(self.adj_t, xr.DataArray)
+        assert isinstance(self.counts, xr.DataArray)
+
+        self.counts_delta_gph_arr = self.get_delta(
+            graph_high_gran, adj_t=self.select_mobile(self.adj_t).values)
+
+
+@xs.process
+class CythonSparseTravel(BaseTravel):
+    """Like CythonExplicitTravel, but uses the sparse adjacency from
+    InitSparseAdj, iterating only over its edges.
+    """
+
+    adj = xs.foreign(InitSparseAdj, 'adj', intent='in')
+    adj_indices = xs.foreign(InitSparseAdj, 'adj_indices', intent='in')
+    adj_indptr_t = xs.foreign(InitSparseAdj, 'adj_indptr_t', intent='in')
+
+    def run_step(self):
+        """
+        """
+        self.counts_delta_gph_arr = self.get_delta(
+            graph_sparse,
+            indptr=self.adj_indptr_t,
+            indices=self.adj_indices,
+            rates=self.select_mobile(self.adj).values
+        )
@@ -0,0 +1,372 @@
+import logging
+import numpy as np
+cimport numpy as np
+cimport cython
+cimport openmp
+from cython cimport floating
+from cython.parallel import prange
+from libc.math cimport fabs
+from ..cy_utils.cy_utils cimport get_rng_streams, free_rng_streams
+
+# Abbreviate numpy dtypes
+DTYPE_FLOAT = np.float64
+DTYPE_INT = np.intc
+
+# Random generator from GSL lib
+cdef extern from "gsl/gsl_rng.h" nogil:
+    ctypedef struct gsl_rng_type:
+        pass
+    ctypedef struct gsl_rng:
+        pass
+    gsl_rng_type *gsl_rng_mt19937
+    gsl_rng *gsl_rng_alloc(gsl_rng_type * T)
+    void gsl_rng_set(gsl_rng * r, unsigned long int)
+    void gsl_rng_free(gsl_rng * r)
+
+# Poisson distribution from GSL lib
+cdef extern from "gsl/gsl_randist.h" nogil:
+    unsigned int gsl_ran_poisson(gsl_rng * r, double mu)
+
+
+# Travel is calculated in three passes, each parallel over vertices. No
+# thread writes to a vertex that it does not own, so results are
+# deterministic and do not depend on the number of threads:
+#   1. the net flow across each edge (vertex `c`, vertex `c2 > c`), drawn
+#      from the random stream of vertex `c` if stochastic
+#   2. the fraction of each vertex's total outflow that it can supply
+#      without becoming negative
+#   3. the delta of each vertex, gathered from the scaled flows across its
+#      edges, in the same order as a serial loop over edges
+# The delta of every edge is applied with opposite sign to its two
+# vertices, so the delta sums to zero.
+
+
+# precision of travel rates, which need not match that of counts
+ctypedef fused rate_t:
+    float
+    double
+
+
+class TravelWorkspace:
+    """Edge structures and scratch buffers of `graph_high_gran` and
+    `graph_sparse`, kept between calls so that they are built and allocated
+    once per simulation rather than at every step. Edge structures are
+    cached per vertex count for dense adjacencies, and per row pointers for
+    sparse ones, so a workspace must only be used with a single adjacency.
+    """
+
+    def __init__(self):
+        self.edges = dict()
+        self.buffers = dict()
+
+    def get_edges(self, key, build_func, *args) -> tuple:
+        if key not in self.edges:
+            self.edges[key] = build_func(*args)
+        return self.edges[key]
+
+    def get_buffer(self, name, shape) -> np.ndarray:
+        """Float64 array of `shape`, as a view on a buffer that only grows.
+        """
+        size = int(np.prod(shape))
+        buf = self.buffers.get(name)
+        if buf is None or buf.size < size:
+            buf = self.buffers[name] = np.empty(size, dtype=DTYPE_FLOAT)
+        return buf[:size].reshape(shape)
+
+
+def graph_high_gran(np.ndarray counts,
+                    np.ndarray adj_t,
+                    unsigned int stochastic,
+                    unsigned int int_seed,
+                    int num_threads=0,
+                    workspace=None
+                    ):
+    """`counts` may be single or double precision, and `adj_t` need not be
+    the same precision. The delta is returned in the precision of `counts`.
+    Runs on `num_threads` OpenMP threads, or the OpenMP default if less than
+    1. If a TravelWorkspace `workspace` is passed, the returned delta may be
+    a view on its buffers, which is overwritten by the next call.
+    """
+    cdef Py_ssize_t node_len = counts.shape[0]
+
+    # block of rates for edge (c, c2) is at c * node_len + c2
+    adj_2d = np.ascontiguousarray(adj_t).reshape(
+        node_len * node_len, _block_len(counts))
+    if workspace is None:
+        edges = _dense_edges(node_len)
+    else:
+        edges = workspace.get_edges(('dense', node_len), _dense_edges,
+                                    node_len)
+    return _travel(counts, adj_2d, edges, stochastic, int_seed, num_threads,
+                   workspace)
+
+
+def graph_sparse(np.ndarray counts,
+                 np.ndarray indptr,
+                 np.ndarray indices,
+                 np.ndarray rates,
+                 unsigned int stochastic,
+                 unsigned int int_seed,
+                 int num_threads=0,
+                 workspace=None
+                 ):
+    """Sparse counterpart of `graph_high_gran`, which iterates only over
+    stored edges. Edges of vertex `c` are `indptr[c]` to `indptr[c + 1]`,
+    each to vertex `indices[e] > c` with a (age, risk, compartment) block of
+    travel rates `rates[e]`.
+    """
+    cdef Py_ssize_t node_len = counts.shape[0]
+
+    # view on the edges between indptr[0] and indptr[-1]
+    start, stop = indptr[0], indptr[node_len]
+    rates_2d = np.ascontiguousarray(rates[start:stop]).reshape(
+        stop - start, _block_len(counts))
+    args = (indptr - start, indices[start:stop], np.arange(stop - start))
+    if workspace is None:
+        edges = _get_edges(*args)
+    else:
+        key = ('sparse', start, stop, np.asarray(indptr).tobytes())
+        edges = workspace.get_edges(key, _get_edges, *args)
+    return _travel(counts, rates_2d, edges, stochastic, int_seed,
+                   num_threads, workspace)
+
+
+def _block_len(np.ndarray counts) -> int:
+    """Size of the (age, risk, compartment) block of each vertex."""
+    return int(np.prod(np.shape(counts)[1:]))
+
+
+def _get_indptr(rows, Py_ssize_t node_len) -> np.ndarray:
+    """CSR row pointers of edges with sorted source vertices `rows`."""
+    indptr = np.zeros(node_len + 1, dtype=DTYPE_INT)
+    np.cumsum(np.bincount(rows, minlength=node_len), out=indptr[1:])
+    return indptr
+
+
+def _dense_edges(Py_ssize_t node_len) -> tuple:
+    """Edges between every pair of vertices (c, c2 > c), in row major order.
+    """
+    rows, indices = np.triu_indices(node_len, k=1)
+    return _get_edges(_get_indptr(rows, node_len), indices,
+                      rows * node_len + indices)
+
+
+def _get_edges(indptr, indices, rate_idx) -> tuple:
+    """Returns the CSR `indptr` and `indices` of edges, the source vertex
+    `rows` of each edge, the CSC pointers `col_ptr` and order `col_order` of
+    edges into each vertex, and the index `rate_idx` of each edge's block of
+    rates.
+    """
+    indptr = np.asarray(indptr, dtype=DTYPE_INT)
+    indices = np.asarray(indices, dtype=DTYPE_INT)
+    node_len = indptr.shape[0] - 1
+    # source vertex of each edge, and edges into each vertex sorted by source
+    rows = np.repeat(np.arange(node_len, dtype=DTYPE_INT), np.diff(indptr))
+    col_order = np.argsort(indices, kind='stable').astype(DTYPE_INT)
+    col_ptr = _get_indptr(indices, node_len)
+    return (indptr, indices, rows, col_ptr, col_order,
+            np.asarray(rate_idx, dtype=np.intp))
+
+
+def _travel(np.ndarray counts, np.ndarray rates, tuple edges,
+            unsigned int stochastic, unsigned int int_seed, int num_threads,
+            workspace) -> np.ndarray:
+    """Returns the delta on `counts` from travel across `edges` from
+    `_get_edges`. Edge `e` has the block of rates `rates[rate_idx[e]]`.
+    """
+    cdef:
+        Py_ssize_t node_len = counts.shape[0]
+        gsl_rng **rngs
+
+    if num_threads < 1:
+        num_threads = openmp.omp_get_max_threads()
+    indptr, indices, rows, col_ptr, col_order, rate_idx = edges
+
+    # flatten (age, risk, compartment) blocks
+    counts_2d = np.ascontiguousarray(counts).reshape(
+        node_len, _block_len(counts))
+    if workspace is None:
+        workspace = TravelWorkspace()
+    flow = workspace.get_buffer('flow', (indices.shape[0], counts_2d.shape[1]))
+    supply = workspace.get_buffer('supply', counts_2d.shape)
+    delta = workspace.get_buffer('delta', counts_2d.shape)
+    supply.fill(0.)
+    delta.fill(0.)
+
+    # one random number stream per node
+    rngs = get_rng_streams(int_seed, node_len)
+    if rngs == NULL:
+        raise MemoryError(f"could not allocate {node_len} RNG streams")
+    if counts.dtype == np.float32:
+        if rates.dtype == np.float32:
+            _flow[float, float](counts_2d, rates, rate_idx, indptr, indices,
+                                stochastic, rngs, flow, supply, num_threads)
+        else:
+            _flow[float, double](counts_2d, rates, rate_idx, indptr, indices,
+                                 stochastic, rngs, flow, supply, num_threads)
+        _gather[float](counts_2d, flow, supply, delta, indptr, indices, rows,
+                       col_ptr, col_order, num_threads)
+    else:
+        if rates.dtype == np.float32:
+            _flow[double, float](counts_2d, rates, rate_idx, indptr, indices,
+                                 stochastic, rngs, flow, supply, num_threads)
+        else:
+            _flow[double, double](counts_2d, rates, rate_idx, indptr,
+                                  indices, stochastic, rngs, flow, supply,
+                                  num_threads)
+        _gather[double](counts_2d, flow, supply, delta, indptr, indices, rows,
+                        col_ptr, col_order, num_threads)
+    free_rng_streams(rngs, node_len)
+    return delta.reshape(np.shape(counts)).astype(counts.dtype, copy=False)
+
+
+cdef void _flow(floating [:, ::1] counts_view,
+                rate_t [:, ::1] rates_view,
+                Py_ssize_t [:] rate_idx_view,
+                int [:] indptr_view,
+                int [:] indices_view,
+                unsigned int stochastic,
+                gsl_rng **rngs,
+                double [:, ::1] f_view,
+                double [:, ::1] s_view,
+                int num_threads
+                ):
+    """Net flow `f_view` from `c2` to `c` across each edge. Sums the
+    outflow from each vertex `c` to vertices after it in `s_view`.
+    """
+    cdef:
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t block_len = counts_view.shape[1]
+        Py_ssize_t c, e
+
+    if block_len == 0:
+        return
+    for c in prange(node_len, nogil=True, schedule='static',
+                    num_threads=num_threads):
+        for e in range(indptr_view[c], indptr_view[c + 1]):
+            _edge_flow(&counts_view[c, 0],
+                       &counts_view[indices_view[e], 0],
+                       &rates_view[rate_idx_view[e], 0],
+                       &f_view[e, 0], &s_view[c, 0], block_len, stochastic,
+                       rngs[c])
+
+
+cdef inline void _edge_flow(floating *counts_c,
+                            floating *counts_c2,
+                            rate_t *rates,
+                            double *flow,
+                            double *outflow,
+                            Py_ssize_t block_len,
+                            unsigned int stochastic,
+                            gsl_rng *rng
+                            ) nogil:
+    cdef:
+        Py_ssize_t b
+        double c2_to_c
+
+    if stochastic == 0:
+        for b in range(block_len):
+            # For this compartment, net migration from c2 to c1
+            c2_to_c = (counts_c2[b] * rates[b]) - (counts_c[b] * rates[b])
+            flow[b] = c2_to_c
+            outflow[b] -= _neg(c2_to_c)
+        return
+
+    for b in range(block_len):
+        c2_to_c = (counts_c2[b] * rates[b]) - (counts_c[b] * rates[b])
+        if c2_to_c < 0:
+            c2_to_c = -<double>gsl_ran_poisson(rng, -c2_to_c)
+        else:
+            c2_to_c = gsl_ran_poisson(rng, c2_to_c)
+        flow[b] = c2_to_c
+        outflow[b] -= _neg(c2_to_c)
+
+
+cdef void _gather(floating [:, ::1] counts_view,
+                  double [:, ::1] f_view,
+                  double [:, ::1] s_view,
+                  double [:, ::1] d_view,
+                  int [:] indptr_view,
+                  int [:] indices_view,
+                  int [:] rows_view,
+                  int [:] col_ptr_view,
+                  int [:] col_order_view,
+                  int num_threads
+                  ):
+    """Delta `d_view` on each vertex from flows `f_view`, where `s_view`
+    holds the outflow from each vertex to vertices after it.
+    """
+    cdef:
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t block_len = counts_view.shape[1]
+        Py_ssize_t v, c, k, e
+
+    if block_len == 0:
+        return
+
+    # Total outflow from each vertex, which is then replaced by the fraction
+    # of it that can leave without the vertex becoming negative
+    for v in prange(node_len, nogil=True, schedule='static',
+                    num_threads=num_threads):
+        # edges (c, v): positive flow leaves `v`
+        for k in range(col_ptr_view[v], col_ptr_view[v + 1]):
+            _add_pos(&f_view[col_order_view[k], 0], &s_view[v, 0], block_len)
+        _supply(&counts_view[v, 0], &s_view[v, 0], block_len)
+
+    # Gather the delta of each vertex, scaling each flow by the fraction
+    # of outflow that its source vertex can supply
+    for v in prange(node_len, nogil=True, schedule='static',
+                    num_threads=num_threads):
+        for k in range(col_ptr_view[v], col_ptr_view[v + 1]):
+            e = col_order_view[k]
+            c = rows_view[e]
+            # flow into `c` is flow out of `v`
+            _add_scaled(&f_view[e, 0], &s_view[c, 0], &s_view[v, 0],
+                        &d_view[v, 0], -1., block_len)
+        for e in range(indptr_view[v], indptr_view[v + 1]):
+            c = indices_view[e]
+            _add_scaled(&f_view[e, 0], &s_view[v, 0], &s_view[c, 0],
+                        &d_view[v, 0], 1., block_len)
+
+
+# Positive and negative parts of `x`, without branching. Exact, since
+# doubling and halving are exact.
+cdef inline double _pos(double x) nogil:
+    return 0.5 * (x + fabs(x))
+
+
+cdef inline double _neg(double x) nogil:
+    return 0.5 * (x - fabs(x))
+
+
+cdef inline void _add_pos(double *flow, double *outflow,
+                          Py_ssize_t block_len) nogil:
+    cdef Py_ssize_t b
+    for b in range(block_len):
+        outflow[b] += _pos(flow[b])
+
+
+cdef inline void _supply(floating *counts, double *outflow,
+                         Py_ssize_t block_len) nogil:
+    """Replaces `outflow` with the fraction of it that `counts` can supply.
+    """
+    cdef Py_ssize_t b
+    for b in range(block_len):
+        if outflow[b] > counts[b]:
+            outflow[b] = counts[b] / outflow[b]
+        else:
+            outflow[b] = 1.
+
+
+cdef inline void _add_scaled(double *flow, double *supply_c,
+                             double *supply_c2, double *delta, double sign,
+                             Py_ssize_t block_len) nogil:
+    """Adds `sign` times net `flow` from `c2` to `c` to `delta`, where
+    negative flow is scaled by the supply of `c`, and positive flow by the
+    supply of `c2`. Branchless, since the sign of each flow is
+    unpredictable.
+    """
+    cdef Py_ssize_t b
+    for b in range(block_len):
+        delta[b] += sign * (_neg(flow[b]) * supply_c[b] +
+                            _pos(flow[b]) * supply_c2[b])
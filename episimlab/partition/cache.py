@@ -0,0 +1,133 @@
+import os
+import json
+import logging
+import hashlib
+from functools import lru_cache
+import xarray as xr
+from ..utils.columnar import table_file
+
+# number of file digests that are kept for reuse
+HASH_CACHE_SIZE = 64
+
+
+def file_hash(fp, chunk_size=2 ** 20) -> str:
+    """Returns the sha256 hex digest of the contents of file `fp`, or of the
+    metadata of columnar table `fp`. Digests of the HASH_CACHE_SIZE most
+    recently used files are memoized until the file's modification time or
+    size changes.
+    """
+    fp = table_file(fp)
+    stat = os.stat(fp)
+    return _hash_file(os.path.abspath(fp), stat.st_mtime, stat.st_size, chunk_size)
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def _hash_file(fp, mtime, size, chunk_size) -> str:
+    """Hashes file `fp` for `file_hash`. `mtime` and `size` are only used to
+    invalidate the cache.
+    """
+    sha = hashlib.sha256()
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ContactCache:
+    """On-disk cache of `contact_xr` arrays, stored as one NetCDF file per
+    date window in directory `cache_dir`. Each file is named by a hash of the
+    input files and partitioning options, followed by a hash of the window.
+    Least recently used files are evicted once the cache exceeds `max_bytes`.
+    """
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, cache_dir, max_bytes=2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def inputs_key(self, name, travel_fp, contacts_fp, **opts) -> str:
+        """Returns a hash of the contents of `travel_fp` and `contacts_fp`,
+        along with the partitioning options `opts`. Entries cached under a
+        previous hash of the same (`name`, `travel_fp`, `contacts_fp`) are
+        deleted.
+        """
+        parts = [name, file_hash(travel_fp), file_hash(contacts_fp)]
+        parts.extend(f"{k}={opts[k]}" for k in sorted(opts))
+        key = hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+        # invalidate stale entries
+        inputs = '|'.join([name, os.path.abspath(travel_fp),
+                           os.path.abspath(contacts_fp)])
+        manifest = self.read_manifest()
+        old_key = manifest.get(inputs)
+        if old_key is not None and old_key != key:
+            logging.debug(f"Removing stale contact cache entries {old_key}")
+            for fn in os.listdir(self.cache_dir):
+                if fn.startswith(f"{old_key}_"):
+                    os.remove(os.path.join(self.cache_dir, fn))
+        if old_key != key:
+            manifest[inputs] = key
+            self.write_manifest(manifest)
+        return key
+
+    def path(self, inputs_key, window) -> str:
+        """Returns path to the file for the date window `window`, which is
+        an iterable of dates.
+        """
+        window_str = '|'.join(str(date) for date in window)
+        window_key = hashlib.sha256(window_str.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{inputs_key}_{window_key}.nc")
+
+    def get(self, inputs_key, window):
+        """Returns cached DataArray, or None if there is no entry."""
+        fp = self.path(inputs_key, window)
+        if not os.path.isfile(fp):
+            return None
+        with xr.open_dataarray(fp) as da:
+            da = da.load()
+        # mark as recently used
+        os.utime(fp)
+        return da
+
+    def put(self, inputs_key, window, da):
+        """Writes DataArray `da` to the cache, then evicts least recently
+        used entries as needed.
+        """
+        fp = self.path(inputs_key, window)
+        tmp_fp = f"{fp}.{os.getpid()}.tmp"
+        da.to_netcdf(tmp_fp)
+        os.replace(tmp_fp, fp)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the total size of the
+        cache is at most `max_bytes`.
+        """
+        entries = list()
+        for fn in os.listdir(self.cache_dir):
+            if not fn.endswith('.nc'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, fn))
+            entries.append((stat.st_mtime, stat.st_size, fn))
+        total = sum(size for _, size, _ in entries)
+        for _, size, fn in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logging.debug(f"Evicting contact cache entry {fn}")
+            os.remove(os.path.join(self.cache_dir, fn))
+            total -= size
+
+    def read_manifest(self) -> dict:
+        fp = os.path.join(self.cache_dir, self.MANIFEST)
+        if not os.path.isfile(fp):
+            return dict()
+        with open(fp, 'r') as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest):
+        fp = os.path.join(self.cache_dir, self.MANIFEST)
+        tmp_fp = f"{fp}.{os.getpid()}.tmp"
+        with open(tmp_fp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_fp, fp)
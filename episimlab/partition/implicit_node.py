@@ -18,6 +18,8 @@ Inputs needed
 import xarray as xr
 import pandas as pd
 import numpy as np
+
+from episimlab.utils.midx import scatter_to_array
 from collections import defaultdict
 
 
@@ -71,7 +73,7 @@ def contact_probability(n_i, n_j, n_i_total, n_k_total):
 
     return pr_ii_in_j
 
-def probabilistic_partition(travel_df, daily_timesteps):
+def probabilistic_partition_legacy(travel_df, daily_timesteps):
 
     total_pop = travel_df.groupby(['source'])['n'].sum().to_dict()
     total_contextual_dest = travel_df[travel_df['destination_type'] == 'contextual'].groupby(['destination'])['n'].sum().to_dict()
@@ -131,6 +133,70 @@ def probabilistic_partition(travel_df, daily_timesteps):
 
     return contact_df
 
+def probabilistic_partition(travel_df, daily_timesteps):
+    """Vectorized version of `probabilistic_partition_legacy`, which returns
+    identical results. Rather than filtering `travel_df` for each pair of
+    sources that share a contextual destination, contextual rows are merged
+    with each other on destination and age.
+    """
+    total_pop = travel_df.groupby(['source'])['n'].sum()
+    total_contextual_dest = travel_df[travel_df['destination_type'] == 'contextual'].groupby(['destination'])['n'].sum()
+
+    if len(total_pop.index.intersection(total_contextual_dest.index)) > 0:
+        raise ValueError('Contextual nodes cannot also be source nodes.')
+    total_pop = pd.concat([total_pop, total_contextual_dest])
+
+    def get_total(nodes):
+        missing = set(nodes) - set(total_pop.index)
+        if missing:
+            raise KeyError(missing)
+        return nodes.map(total_pop).values
+
+    cols = ['source', 'destination', 'age_src', 'age_dest', 'n']
+
+    # if it's local contact, or contact in contextual location within local pop only, it's straightforward
+    local = travel_df.loc[travel_df['destination_type'] == 'local', cols]
+    local_pr = local['n'].values / get_total(local['source'])
+    # if it's local within-node contact, the pr(contact) = n stay in node / n total in node (no need to multiply by another fraction)
+    is_between = (local['source'] != local['destination']).values
+    local_pr[is_between] *= (local['n'].values[is_between] /
+                             get_total(local['destination'][is_between]))
+    local_contacts = pd.DataFrame({
+        'i': local['source'].values,
+        'j': local['destination'].values,
+        'age_i': local['age_src'].values,
+        'age_j': local['age_dest'].values,
+        'pr_contact_ij': local_pr,
+    })
+
+    # partitioning contacts between two different nodes within a contextual node:
+    # pair each row with rows from every source at the same destination, with the same ages
+    contextual = travel_df.loc[travel_df['destination_type'] == 'contextual', cols]
+    pairs = pd.merge(
+        contextual, contextual,
+        on=['destination', 'age_src', 'age_dest'],
+        suffixes=['_i', '_j']
+    )
+    n_sources = contextual.groupby('destination')['source'].nunique()
+    n_pairs = pairs.groupby(['source_i', 'destination', 'age_src', 'age_dest']).size()
+    expected = n_sources.reindex(n_pairs.index.get_level_values('destination')).values
+    if len(n_pairs) != len(contextual) or (n_pairs.values != expected).any():
+        raise ValueError('Each source at a contextual destination requires '
+                         'exactly one row for each age pair at that destination.')
+    contextual_contacts = pd.DataFrame({
+        'i': pairs['source_i'].values,
+        'j': pairs['source_j'].values,
+        'age_i': pairs['age_src'].values,
+        'age_j': pairs['age_dest'].values,
+        'pr_contact_ij': ((pairs['n_i'].values / get_total(pairs['source_i'])) *
+                          (pairs['n_j'].values / get_total(pairs['destination']))),
+    })
+
+    contact_df = pd.concat([local_contacts, contextual_contacts], ignore_index=True)
+    contact_df = contact_df.groupby(['i', 'j', 'age_i', 'age_j'])['pr_contact_ij'].sum().reset_index()
+
+    return contact_df
+
 def partition_contacts(travel, contacts, daily_timesteps):
 
     tr_partitions = probabilistic_partition(travel, daily_timesteps)
@@ -169,7 +235,6 @@ def contact_matrix(contact_df):
         nodes.append(j)
     nodes = sorted(list(set(nodes)))
 
-    new_arr = np.zeros([len(nodes), len(nodes), len(ages), len(ages)])
     coords = {
         'vertex1': nodes,
         'vertex2': nodes,
@@ -177,32 +242,16 @@ def contact_matrix(contact_df):
         'age_group2': ages
     }
     new_da = xr.DataArray(
-        data=0.,
+        data=scatter_to_array(
+            contact_df,
+            columns=['i', 'j', 'age_i', 'age_j'],
+            coords=list(coords.values()),
+            value_col='partitioned_per_capita_contacts'
+        ),
         dims=('vertex1', 'vertex2', 'age_group1', 'age_group2'),
         coords=coords
     )
 
-    for i, n1 in enumerate(nodes):
-        for j, n2 in enumerate(nodes):
-            for k, a1 in enumerate(ages):
-                for l, a2 in enumerate(ages):
-                    subset = contact_df[(contact_df['i'] == n1) \
-                        & (contact_df['j'] == n2) \
-                        & (contact_df['age_i'] == a1) \
-                        & (contact_df['age_j'] == a2)]
-                    if subset.empty:
-                        val = 0
-                    else:
-                        val = subset['partitioned_per_capita_contacts'].item()
-                    new_arr[i, j, k, l] = val
-                    new_da.loc[{
-                        'vertex1': n1,
-                        'vertex2': n2,
-                        'age_group1': a1,
-                        'age_group2': a2,
-                    }] = val
-                    # breakpoint()
-
     return new_da
 
 
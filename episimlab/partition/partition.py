@@ -1,13 +1,20 @@
+import os
 import logging
 import pandas as pd
 import xarray as xr
 import xsimlab as xs
 import numpy as np
+from copy import copy
 from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 from .. import utils
+from .cache import ContactCache
+from ..io.travel import get_travel_index
+from ..utils.columnar import read_table, table_file
 from ..pytest_utils import profiler
 import dask.dataframe as dd
 from datetime import datetime
+from scipy.sparse import coo_matrix
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -60,46 +67,149 @@ def legacy_mapping(col_type, table):
 @xs.process
 class Partition2Contact:
     DIMS = ('vertex1', 'vertex2', 'age_group1', 'age_group2',)
+    # todo: surface "daily_timesteps" to user
+    DAILY_TIMESTEPS = 10
+
     travel_fp = xs.variable(intent='in')
     contacts_fp = xs.variable(intent='in')
     contact_xr = xs.variable(static=False, dims=DIMS, intent='out', global_name='contact_xr')
-
-    @xs.runtime(args=['step_delta', 'step_start', 'step_end'])
-    def initialize(self, step_delta, step_start, step_end):
-
-        self.baseline_contact_df = pd.read_csv(self.contacts_fp)
-        self.travel_df_with_date = self.load_travel_df()
+    precompute = xs.variable(
+        default=False, intent='in',
+        description='Build contact_xr for the travel dates in every step '
+                    'during initialize, and look them up from a cache at each step'
+    )
+    cache_dir = xs.variable(
+        default=None, intent='in',
+        description='Optional directory in which to persist contact_xr for '
+                    'each date window across runs'
+    )
+    cache_max_bytes = xs.variable(
+        default=2 ** 30, intent='in',
+        description='Size limit of the cache at `cache_dir`, beyond which '
+                    'least recently used entries are evicted'
+    )
+    precompute_workers = xs.variable(
+        default=None, intent='in',
+        description='Number of threads that partition step windows during '
+                    'precompute. Defaults to the number of CPUs'
+    )
+
+    @xs.runtime(args=['step_delta', 'step_start', 'step_end',
+                      'sim_start', 'sim_end', 'nsteps'])
+    def initialize(self, step_delta, step_start, step_end,
+                   sim_start=None, sim_end=None, nsteps=None):
+
+        self.baseline_contact_df = read_table(self.contacts_fp)
+        self.travel_index = get_travel_index(self.travel_fp)
         self.spatial_dims = ['source', 'destination']       # enforce that these are the only spatial dimensions
         self.age_dims = ['source_age', 'destination_age']          # always make age relative to source, destination
+        self.disk_cache, self.disk_cache_key = self.setup_disk_cache()
+        # contact_xr keyed on the travel dates in each step window
+        self.contact_cache = dict()
 
         # we need contact_xr set during initialize, for setting coordinates
         # time interval is set first timestep in travel df 
-        step_end = self.travel_df_with_date.date.min().to_datetime64()
+        step_end = self.travel_index.dates.min().to_datetime64()
         self.run_step(None, step_start=step_end, step_end=step_end)
         assert hasattr(self, 'contact_xr')
-        
-    def get_travel_df(self) -> pd.DataFrame:
-        """Given timestamps `step_start` and `step_end`, returns attr
-        `travel_df`, which is indexed from attr `travel_df_with_date`.
+
+        if self.precompute and nsteps:
+            self.precompute_windows(self.get_step_windows(sim_start, sim_end, nsteps))
+
+    def setup_disk_cache(self) -> tuple:
+        """Returns ContactCache at `cache_dir`, and the key of entries for
+        the current inputs. Returns (None, None) if `cache_dir` is unset.
+        """
+        if self.cache_dir is None:
+            return None, None
+        disk_cache = ContactCache(self.cache_dir, max_bytes=self.cache_max_bytes)
+        key = disk_cache.inputs_key(
+            type(self).__name__, self.travel_fp, self.contacts_fp,
+            daily_timesteps=self.DAILY_TIMESTEPS
+        )
+        return disk_cache, key
+
+    def get_step_windows(self, sim_start, sim_end, nsteps) -> list:
+        """Returns the distinct windows of travel dates that `run_step` looks
+        up over a clock of `nsteps` evenly spaced steps from `sim_start` to
+        `sim_end`. Steps without travel data are skipped.
+        """
+        clock = pd.date_range(sim_start, sim_end, periods=int(nsteps) + 1)
+        # run_step receives the previous clock value as `step_start`
+        starts = [pd.NaT] + list(clock[:-2])
+        windows = dict()
+        for start, end in zip(starts, clock[:-1]):
+            dates = self.select_travel_dates(start, end)
+            if len(dates):
+                windows.setdefault(tuple(dates), None)
+        return list(windows)
+
+    def precompute_windows(self, windows):
+        """Partitions each date window in `windows` into `contact_cache`,
+        reading from and writing to the disk cache if there is one. Windows
+        missing from the disk cache are partitioned on a pool of
+        `precompute_workers` threads.
+        """
+        missing = list()
+        for window in windows:
+            if window in self.contact_cache:
+                continue
+            contact_xr = None
+            if self.disk_cache is not None:
+                contact_xr = self.disk_cache.get(self.disk_cache_key, window)
+            if contact_xr is None:
+                missing.append(window)
+            else:
+                self.contact_cache[window] = contact_xr
+        if not missing:
+            return
+
+        logging.debug(f"Precomputing contacts for {len(missing)} windows")
+        # each window is partitioned on a shallow copy, which holds its own
+        # intermediate results
+        with ThreadPoolExecutor(max_workers=self.precompute_workers) as pool:
+            results = pool.map(
+                lambda window: copy(self).partition_window(window), missing)
+            for window, contact_xr in zip(missing, results):
+                self.contact_cache[window] = contact_xr
+                if self.disk_cache is not None:
+                    self.disk_cache.put(self.disk_cache_key, window, contact_xr)
+
+    def select_travel_dates(self, step_start, step_end) -> pd.DatetimeIndex:
+        """Returns the dates in the travel file that fall within the step
+        from `step_start` to `step_end`, which may be empty.
         Special handling for NaT and cases where `step_start` equals `step_end`.
         """
-        date = self.travel_df_with_date['date']
+        date = self.travel_index.dates
 
-        isnull = (pd.isnull(self.step_start), pd.isnull(self.step_end))
+        isnull = (pd.isnull(step_start), pd.isnull(step_end))
         assert not all(isnull), \
             f"both of `step_start` and `step_end` are null (NaT)"
         if isnull[0]:
-            mask = (date == self.step_end)
+            mask = (date == step_end)
         elif isnull[1]:
-            mask = (date == self.step_start)
-        elif self.step_start == self.step_end:
-            mask = (date == self.step_start)
+            mask = (date == step_start)
+        elif step_start == step_end:
+            mask = (date == step_start)
         else:
-            assert self.step_start <= self.step_end
-            mask = (date >= self.step_start) & (date < self.step_end)
-            
-        # Generate travel_df by indexing on `date`
-        self.travel_df = self.travel_df_with_date[mask]
+            assert step_start <= step_end
+            mask = (date >= step_start) & (date < step_end)
+        return date[mask]
+
+    def get_travel_dates(self) -> pd.DatetimeIndex:
+        """Given timestamps `step_start` and `step_end`, returns the dates in
+        the travel file that fall within this step.
+        """
+        dates = self.select_travel_dates(self.step_start, self.step_end)
+        assert len(dates), \
+            f'No travel data for date between {self.step_start} and {self.step_end}'
+        return dates
+
+    def get_travel_df(self) -> pd.DataFrame:
+        """Returns attr `travel_df`, which is read from `travel_fp` for only
+        the dates within this step.
+        """
+        self.travel_df = self.load_travel_df(self.get_travel_dates())
         assert not self.travel_df.empty, \
             f'No travel data for date between {self.step_start} and {self.step_end}'
         return self.travel_df
@@ -119,18 +229,43 @@ class Partition2Contact:
         self.all_dims = self.spatial_dims + self.age_dims
         self.non_spatial_dims = self.age_dims  # would add demographic dims here if we had any, still trying to think through how to make certain dimensions optional...
 
-        # Indexing on date, generate travel_df from travel_df_with_date
-        self.travel_df = self.get_travel_df()
+        window = tuple(self.get_travel_dates())
+        if window in self.contact_cache:
+            self.contact_xr = self.contact_cache[window]
+            return
+
+        if self.disk_cache is not None:
+            contact_xr = self.disk_cache.get(self.disk_cache_key, window)
+        else:
+            contact_xr = None
+
+        if contact_xr is None:
+            contact_xr = self.partition_window(window)
+            if self.disk_cache is not None:
+                self.disk_cache.put(self.disk_cache_key, window, contact_xr)
+
+        self.contact_xr = contact_xr
+        if self.precompute:
+            self.contact_cache[window] = self.contact_xr
+
+    def partition_window(self, window) -> xr.DataArray:
+        """Returns `contact_xr` partitioned from the travel data on each of
+        the dates in `window`.
+        """
+        # Indexing on date, generate travel_df from travel_fp
+        self.travel_df = self.load_travel_df(list(window))
+        assert not self.travel_df.empty, \
+            f'No travel data for dates {window}'
 
         # initialize empty class members to hold intermediate results generated during workflow
-        self.prob_partitions = self.dask_partition()
-        self.contact_partitions = self.partitions_to_contacts(daily_timesteps=10)
-        self.contact_xr = self.build_contact_xr()
+        self.prob_partitions = self.sparse_partition()
+        self.contact_partitions = self.partitions_to_contacts(daily_timesteps=self.DAILY_TIMESTEPS)
+        return self.build_contact_xr()
 
     @profiler()
-    def load_travel_df(self):
+    def load_travel_df(self, dates=None):
 
-        tdf = pd.read_csv(self.travel_fp)
+        tdf = get_travel_index(self.travel_fp).read(dates)
         tdf['date'] = pd.to_datetime(tdf['date'])
         try:
             tdf = tdf.rename(columns={'age_src': 'age'})
@@ -235,6 +370,70 @@ class Partition2Contact:
             'pr_contact_ijk'].sum().reset_index()
         return total_prob
 
+    @profiler()
+    def sparse_partition(self):
+        """Computes the same contact probabilities as `pandas_partition`,
+        without joining `travel_df` to itself on destination. Weights
+        n_ik / n_i and n_jk / n_k are stored as sparse (source, age) x
+        destination matrices, and their product sums over destinations k.
+        """
+        total = self.population_totals()
+        daily_pop = self.daily_totals()
+        travel = self.travel_df[['source', 'destination', 'age', 'n']]
+
+        # first merge adds n_total_i, the total population of i disregarding travel
+        left = pd.merge(
+            travel, total,
+            left_on=['source', 'age'],
+            right_on=['location', 'age'],
+            how='left',
+            suffixes=['', '_total']
+        )
+        # second merge adds n_total_k, the daily net population of k accounting for travel in and out by age group
+        right = pd.merge(
+            travel, daily_pop,
+            on=['destination', 'age'],
+            how='left',
+            suffixes=['', '_total']
+        )
+
+        # integer codes for each (source, age) row and destination column
+        src_codes, sources = pd.factorize(
+            pd.concat([left['source'], right['source']]), sort=True)
+        age_codes, ages = pd.factorize(
+            pd.concat([left['age'], right['age']]), sort=True)
+        dest_codes, _ = pd.factorize(
+            pd.concat([left['destination'], right['destination']]))
+        row_codes = src_codes * len(ages) + age_codes
+        shape = (len(sources) * len(ages), dest_codes.max() + 1)
+
+        def to_csr(data, sl):
+            return coo_matrix((data, (row_codes[sl], dest_codes[sl])),
+                              shape=shape).tocsr()
+
+        # NaN weights, e.g. from empty populations, are skipped by groupby sum
+        l_sl, r_sl = slice(0, len(left)), slice(len(left), None)
+        w_i = (left['n'] / left['n_total']).fillna(0.).values
+        w_j = (right['n'] / right['n_total']).fillna(0.).values
+        pr_contact = to_csr(w_i, l_sl) @ to_csr(w_j, r_sl).T
+
+        # index of (source_i, age_i, source_j, age_j) that share a destination
+        shared = to_csr(np.ones(len(left)), l_sl) @ to_csr(np.ones(len(right)), r_sl).T
+        shared = shared.tocoo()
+        row, col = shared.row, shared.col
+        order = np.lexsort((col % len(ages), row % len(ages),
+                            col // len(ages), row // len(ages)))
+        row, col = row[order], col[order]
+
+        total_prob = pd.DataFrame({
+            'source_i': sources[row // len(ages)],
+            'source_j': sources[col // len(ages)],
+            'age_i': ages[row % len(ages)],
+            'age_j': ages[col % len(ages)],
+            'pr_contact_ijk': np.asarray(pr_contact[row, col]).ravel(),
+        })
+        return total_prob
+
     def pandas_partition(self):
 
         total = self.population_totals()
@@ -274,7 +473,6 @@ class Partition2Contact:
         total_prob = travel_totals.groupby(['source_i', 'source_j', 'age_i', 'age_j'])['pr_contact_ijk'].sum().reset_index()
         return total_prob
 
-    # todo: surface "daily_timesteps" to user
     def partitions_to_contacts(self, daily_timesteps):
 
         tc = pd.merge(
@@ -341,32 +539,77 @@ class Partition2Contact:
             coords['age_i'] = self.age_group
             coords['age_j'] = self.age_group
 
+        # for now we are ignoring the possible demographic dimension
         new_da = xr.DataArray(
-            data=0.,
+            data=utils.scatter_to_array(
+                self.contact_partitions,
+                columns=['i', 'j', 'age_i', 'age_j'][:len(arr_dims)],
+                coords=list(coords.values()),
+                value_col='partitioned_per_capita_contacts'
+            ),
             dims=(coords.keys()),
             coords=coords
         )
 
-        # for now we are ignoring the possible demographic dimension
-        for n1, a1, n2, a2 in product(*[nodes, self.age_group] * 2):
-            subset = self.contact_partitions[(self.contact_partitions['i'] == n1) \
-                & (self.contact_partitions['j'] == n2) \
-                & (self.contact_partitions['age_i'] == a1) \
-                & (self.contact_partitions['age_j'] == a2)]
-            if subset.empty:
-                val = 0
-            else:
-                val = subset['partitioned_per_capita_contacts'].item()
-            new_da.loc[{
-                'vertex_i': n1,
-                'vertex_j': n2,
-                'age_i': a1,
-                'age_j': a2,
-            }] = val
-
         return new_da
 
 
+def to_sparse_contact(contact_xr) -> xr.DataArray:
+    """Converts dense `contact_xr` (vertex1, vertex2, age_group1, age_group2)
+    to the sparse layout used by SparsePartition2Contact, keeping only vertex
+    pairs with at least one nonzero contact rate.
+    """
+    da = contact_xr.transpose('vertex1', 'vertex2', 'age_group1', 'age_group2')
+    nonzero = (da != 0).any(dim=['age_group1', 'age_group2']).values
+    v1_idx, v2_idx = np.nonzero(nonzero)
+    return xr.DataArray(
+        data=da.values[v1_idx, v2_idx],
+        dims=SparsePartition2Contact.DIMS,
+        coords=dict(
+            vertex1=('vertex_pair', da.coords['vertex1'].values[v1_idx]),
+            vertex2=('vertex_pair', da.coords['vertex2'].values[v2_idx]),
+            age_group1=da.coords['age_group1'].values,
+            age_group2=da.coords['age_group2'].values,
+        )
+    )
+
+
+@xs.process
+class SparsePartition2Contact(Partition2Contact):
+    """Like Partition2Contact, but `contact_xr` is stored sparsely: one dense
+    (age_group1, age_group2) block for each pair of vertices that share
+    contacts, instead of a dense (vertex1, vertex2) array. Coordinates
+    `vertex1` and `vertex2` label each pair along dimension `vertex_pair`.
+    """
+    DIMS = ('vertex_pair', 'age_group1', 'age_group2')
+    contact_xr = xs.variable(static=False, dims=DIMS, intent='out', global_name='contact_xr')
+
+    def build_contact_xr(self):
+        logging.debug('Building sparse contact xarray at {}'.format(datetime.now()))
+        df = self.contact_partitions
+        ages = np.unique(df[['age_i', 'age_j']].values.ravel('K').astype(str))
+        age_i = pd.Index(ages).get_indexer(df['age_i'].astype(str))
+        age_j = pd.Index(ages).get_indexer(df['age_j'].astype(str))
+
+        # enumerate unique vertex pairs, sorted by vertex1 then vertex2
+        pair_codes, pairs = pd.MultiIndex.from_frame(df[['i', 'j']]).factorize(sort=True)
+
+        # scatter contact rates into one age block per vertex pair
+        data = np.zeros((len(pairs), len(ages), len(ages)))
+        data[pair_codes, age_i, age_j] = df['partitioned_per_capita_contacts'].values
+
+        return xr.DataArray(
+            data=data,
+            dims=self.DIMS,
+            coords=dict(
+                vertex1=('vertex_pair', pairs.get_level_values(0).values),
+                vertex2=('vertex_pair', pairs.get_level_values(1).values),
+                age_group1=ages,
+                age_group2=ages,
+            )
+        )
+
+
 @xs.process
 class Contact2Phi:
     """Given array `contact_xr`, coerces to `phi_t` array."""
@@ -413,6 +656,61 @@ class Contact2Phi:
                             'Py2Iy', 'Iy2Ih', 'H2D']
 
 
+@xs.process
+class FactoredContact2Phi(Contact2Phi):
+    """Given array `contact_xr`, sets `phi_t` in factored form: `phi_t` is
+    `contact_xr` itself, and the risk group structure is carried by a small
+    (risk_group1, risk_group2) multiplier `phi_risk`. The full phi array is
+    equal to their outer product. Consumed by FactoredFOI and
+    FactoredCythonFOI.
+    """
+    PHI_DIMS = ('vertex1', 'vertex2', 'age_group1', 'age_group2')
+    PHI_RISK_DIMS = ('risk_group1', 'risk_group2')
+
+    phi_t = xs.variable(dims=PHI_DIMS, intent='out', global_name='phi_t')
+    phi_risk = xs.variable(dims=PHI_RISK_DIMS, intent='out',
+                           global_name='phi_risk')
+
+    def initialize(self):
+        self.initialize_misc_coords()
+        self.phi_risk = xr.DataArray(
+            data=1.,
+            dims=self.PHI_RISK_DIMS,
+            coords={k: self.risk_group for k in self.PHI_RISK_DIMS}
+        )
+        self.run_step()
+
+    def get_phi(self):
+        self.phi_t = self.contact_xr.transpose(*self.PHI_DIMS)
+
+
+@xs.process
+class SparseContact2Phi(FactoredContact2Phi):
+    """Given sparse array `contact_xr` from SparsePartition2Contact, sets a
+    sparse `phi_t` with the same `vertex_pair` dimension. Memory scales with
+    the number of vertex pairs that share contacts. As in FactoredContact2Phi,
+    the risk group structure is carried by the multiplier `phi_risk`.
+    `phi_t` is only rebuilt when `contact_xr` is replaced by a new array.
+    """
+    PHI_DIMS = ('vertex_pair', 'age_group1', 'age_group2')
+
+    phi_t = xs.variable(dims=PHI_DIMS, intent='out', global_name='phi_t')
+
+    def run_step(self):
+        if getattr(self, '_contact_src', None) is self.contact_xr:
+            return
+        self._contact_src = self.contact_xr
+
+        # set age group and vertex coords
+        self.age_group = self.contact_xr.coords['age_group1'].values
+        self.vertex = np.unique(np.concatenate([
+            self.contact_xr.coords['vertex1'].values,
+            self.contact_xr.coords['vertex2'].values
+        ]))
+
+        self.get_phi()
+
+
 @xs.process
 class NC2Contact:
     """Reads DataArray from NetCDF file at `contact_da_fp`, and sets attr
@@ -20,6 +20,10 @@ class BaseSEIR:
     counts = xs.foreign(ApplyCountsDelta, 'counts', intent='in')
 
     stochastic = xs.variable(intent='in')
+    binomial = xs.variable(
+        default=False, intent='in',
+        description="draw stochastic transitions from chain binomials " +
+        "instead of Poissons")
     seed_state = xs.variable(intent='in')
 
     sigma = xs.variable()
@@ -1,13 +1,47 @@
 import xsimlab as xs
 import xarray as xr
+import numpy as np
 
 from ..foi.base import BaseFOI
 from .base import BaseSEIR
-from .bf_cython_engine import brute_force_SEIR
+from ..cy_utils.cy_utils import RNGStreams
+from ..utils.build import import_engine
+
+_engine = import_engine('.bf_cython_engine', package=__package__)
+brute_force_SEIR = _engine.brute_force_SEIR
+batched_SEIR = _engine.batched_SEIR
+transition_probs = _engine.transition_probs
+
+
+class TransitionProbsMixin:
+    """Provides the table of per-step transition probabilities passed to the
+    Cython SEIR engine, cached on the process. For SEIR processes that
+    subclass BaseSEIR.
+    """
+
+    def get_transition_probs(self, int_per_day) -> np.ndarray:
+        """Returns the table of per-step transition probabilities. The table
+        is reused across steps, and only recomputed if `int_per_day` or an epi
+        parameter changed since the last step, e.g. when parameters are
+        resampled by a SetupDynamic* process.
+        """
+        key = (int_per_day, self.mu, self.sigma, self.eta,
+               np.asarray(self.rho).tobytes(), np.asarray(self.gamma).tobytes())
+        if key != getattr(self, '_probs_key', None):
+            self._probs = transition_probs(
+                rho=np.asarray(self.rho, dtype='float64'),
+                gamma=np.asarray(self.gamma, dtype='float64'),
+                mu=self.mu,
+                sigma=self.sigma,
+                eta=self.eta,
+                int_per_day=int_per_day
+            )
+            self._probs_key = key
+        return self._probs
 
 
 @xs.process
-class BruteForceCythonSEIR(BaseSEIR):
+class BruteForceCythonSEIR(TransitionProbsMixin, BaseSEIR):
     """Calculate change in `counts` due to SEIR transmission. Brute force
     algorithm for testing purposes.
     """
@@ -29,6 +63,7 @@ class BruteForceCythonSEIR(BaseSEIR):
     def run_step(self, step_delta):
         """
         """
+        int_per_day = self.get_int_per_day(step_delta)
         self.counts_delta_seir_arr = brute_force_SEIR(
             # phi_grp_mapping=self.phi_grp_mapping.values,
             counts=self.counts.values,
@@ -46,9 +81,11 @@ class BruteForceCythonSEIR(BaseSEIR):
             sigma=self.sigma,
             tau=self.tau,
             eta=self.eta,
-            int_per_day=self.get_int_per_day(step_delta),
+            int_per_day=int_per_day,
             stochastic=self.stochastic,
-            int_seed=self.seed_state
+            int_seed=self.seed_state,
+            probs=self.get_transition_probs(int_per_day),
+            binomial=self.binomial
         )
 
     def finalize_step(self):
@@ -57,3 +94,55 @@ class BruteForceCythonSEIR(BaseSEIR):
             dims=self.counts.dims,
             coords=self.counts.coords
         )
+
+
+@xs.process
+class BatchedCythonSEIR(BruteForceCythonSEIR):
+    """Like BruteForceCythonSEIR, but `counts` and `foi` have a leading
+    `replicate` dimension, and all replicates are advanced in one call. Each
+    replicate draws from its own seed, spawned from `seed_state`.
+    """
+    COUNTS_DIMS = ('replicate',) + BaseSEIR.COUNTS_DIMS
+
+    replicate = xs.global_ref('replicate')
+    counts_delta_seir = xs.variable(
+        groups=['counts_delta'],
+        dims=COUNTS_DIMS,
+        static=False,
+        intent='out'
+    )
+
+    def get_seeds(self) -> np.ndarray:
+        """Returns one seed per replicate."""
+        seed_seq = np.random.SeedSequence(entropy=int(self.seed_state))
+        return seed_seq.generate_state(len(self.replicate))
+
+    def get_rngs(self):
+        """Returns RNG streams for every replicate and vertex, seeded for
+        this step. The streams are allocated once and reused across steps.
+        Returns None if transitions are deterministic.
+        """
+        if not self.stochastic:
+            return None
+        n_streams = self.counts.shape[0] * self.counts.shape[1]
+        if getattr(self, 'rngs', None) is None or self.rngs.n != n_streams:
+            self.rngs = RNGStreams(n_streams)
+        self.rngs.seed_blocks(self.get_seeds())
+        return self.rngs
+
+    @xs.runtime(args='step_delta')
+    def run_step(self, step_delta):
+        """
+        """
+        int_per_day = self.get_int_per_day(step_delta)
+        self.counts_delta_seir_arr = batched_SEIR(
+            counts=self.counts.values,
+            foi=self.foi.values,
+            probs=self.get_transition_probs(int_per_day),
+            pi=self.pi.values,
+            nu=self.nu.values,
+            tau=self.tau,
+            stochastic=self.stochastic,
+            rngs=self.get_rngs(),
+            binomial=self.binomial
+        )
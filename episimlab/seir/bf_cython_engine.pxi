@@ -0,0 +1,616 @@
+import logging
+import numpy as np
+cimport numpy as np
+cimport cython
+from cython cimport floating
+from cython.parallel import prange
+from ..cy_utils.cy_utils cimport get_rng_streams, free_rng_streams, \
+    discrete_time_approx, RNGStreams
+
+# Abbreviate numpy dtypes
+DTYPE_FLOAT = np.float64
+DTYPE_INT = np.intc
+
+# isinf from C math.h
+cdef extern from "math.h" nogil:
+    unsigned int isinf(double f)
+
+# Random generator from GSL lib
+cdef extern from "gsl/gsl_rng.h" nogil:
+    ctypedef struct gsl_rng_type:
+        pass
+    ctypedef struct gsl_rng:
+        pass
+    gsl_rng_type *gsl_rng_mt19937
+    gsl_rng *gsl_rng_alloc(gsl_rng_type * T)
+    void gsl_rng_set(gsl_rng * r, unsigned long int)
+    void gsl_rng_free(gsl_rng * r)
+
+# Poisson distribution from GSL lib
+cdef extern from "gsl/gsl_randist.h" nogil:
+    unsigned int gsl_ran_poisson(gsl_rng * r, double mu)
+    unsigned int gsl_ran_binomial(gsl_rng * r, double p, unsigned int n)
+
+
+# indices into the table returned by `transition_probs`
+cdef enum:
+    P_SIGMA = 0
+    P_RHO_A = 1
+    P_RHO_Y = 2
+    P_GAMMA_A = 3
+    P_GAMMA_Y = 4
+    P_GAMMA_H = 5
+    P_ETA = 6
+    P_MU = 7
+    N_PROBS = 8
+
+
+def transition_probs(np.ndarray rho,
+                     np.ndarray gamma,
+                     float mu,
+                     float sigma,
+                     float eta,
+                     float int_per_day):
+    """Returns the per-step probabilities of each transition, rescaled from
+    daily rates by `discrete_time_approx`. These are the same for every node,
+    age, and risk group.
+    """
+    cdef:
+        double [:] rho_view = rho
+        double [:] gamma_view = gamma
+        np.ndarray probs = np.empty(N_PROBS, dtype=DTYPE_FLOAT)
+        double [:] prob_view = probs
+
+    prob_view[P_SIGMA] = discrete_time_approx(sigma, int_per_day)
+    prob_view[P_RHO_A] = discrete_time_approx(rho_view[4], int_per_day)
+    prob_view[P_RHO_Y] = discrete_time_approx(rho_view[5], int_per_day)
+    prob_view[P_GAMMA_A] = discrete_time_approx(gamma_view[4], int_per_day)
+    prob_view[P_GAMMA_Y] = discrete_time_approx(gamma_view[5], int_per_day)
+    prob_view[P_GAMMA_H] = discrete_time_approx(gamma_view[6], int_per_day)
+    prob_view[P_ETA] = discrete_time_approx(eta, int_per_day)
+    prob_view[P_MU] = discrete_time_approx(mu, int_per_day)
+    return probs
+
+
+def brute_force_SEIR(np.ndarray counts,
+                     np.ndarray foi,
+                     np.ndarray rho,
+                     np.ndarray gamma,
+                     np.ndarray pi,
+                     np.ndarray nu,
+                     float mu,
+                     float sigma,
+                     float eta,
+                     float tau,
+                     float int_per_day,
+                     unsigned int stochastic,
+                     unsigned int int_seed,
+                     np.ndarray probs=None,
+                     unsigned int binomial=0
+                     ):
+    """`probs` is an optional table of transition probabilities from
+    `transition_probs`, which is computed from the epi parameters if not
+    passed. If `binomial` is 1, stochastic transitions are drawn as chain
+    binomials instead of Poissons. `counts` may be single or double
+    precision. `foi` is cast to the same precision if needed, and the result
+    is returned in it.
+    """
+    if probs is None:
+        probs = transition_probs(rho, gamma, mu, sigma, eta, int_per_day)
+    cdef:
+        double [:, :] pi_view = pi
+        double [:] nu_view = nu
+        double [:] prob_view = probs
+        # one GSL random number generator per node
+        Py_ssize_t node_len = counts.shape[0]
+        gsl_rng **rngs = get_rng_streams(int_seed, node_len)
+        np.ndarray result
+
+    if rngs == NULL:
+        raise MemoryError(f"could not allocate {node_len} RNG streams")
+    if counts.dtype == np.float32:
+        result = _brute_force_SEIR[float](
+            counts, foi.astype(np.float32, copy=False), prob_view, pi_view,
+            nu_view, tau, stochastic, binomial, rngs)
+    else:
+        result = _brute_force_SEIR[double](
+            counts, foi.astype(DTYPE_FLOAT, copy=False), prob_view, pi_view,
+            nu_view, tau, stochastic, binomial, rngs)
+    free_rng_streams(rngs, node_len)
+    return result
+
+
+cdef np.ndarray _brute_force_SEIR(floating [:, :, :, :] counts_view,
+                                  floating [:, :, :] foi_view,
+                                  # transition probabilities
+                                  double [:] prob_view,
+                                  # risk, age
+                                  double [:, :] pi_view,
+                                  # age
+                                  double [:] nu_view,
+                                  double tau,
+                                  unsigned int stochastic,
+                                  unsigned int binomial,
+                                  gsl_rng **rngs,
+                                  ):
+    """`rngs` may be NULL if not `stochastic`.
+    TODO: clean up cdefs
+    """
+    cdef:
+        # indexers and lengths of each dimension in state space
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t age_len = counts_view.shape[1]
+        Py_ssize_t risk_len = counts_view.shape[2]
+        Py_ssize_t compt_len = counts_view.shape[3]
+        Py_ssize_t n, a, r, a_2, r_2
+
+        # output state array, in the same precision as counts. Note that
+        # the only 'value_type' we are about is index 0, or 'count'
+        np.ndarray compt_counts = np.nan * np.empty(
+            (node_len, age_len, risk_len, compt_len),
+            dtype=np.asarray(counts_view).dtype)
+        floating [:, :, :, :] compt_v = compt_counts
+
+    # Iterate over node, age, and risk
+    for n in prange(node_len, nogil=True):
+    # for n in range(node_len):
+        for a in range(age_len):
+            for r in range(risk_len):
+                _seir_cell(counts_view, compt_v, n, a, r, foi_view[n, a, r],
+                           prob_view, pi_view[r, a], nu_view[a], tau,
+                           stochastic, binomial,
+                           rngs[n] if rngs != NULL else NULL)
+    return compt_counts
+
+
+def batched_SEIR(np.ndarray counts,
+                 np.ndarray foi,
+                 np.ndarray probs,
+                 np.ndarray pi,
+                 np.ndarray nu,
+                 float tau,
+                 unsigned int stochastic,
+                 RNGStreams rngs=None,
+                 unsigned int binomial=0):
+    """Like `brute_force_SEIR`, but `counts` and `foi` have a leading
+    replicate dimension. If `stochastic`, `rngs` holds one seeded stream per
+    replicate and node, in replicate major order; it is not used otherwise.
+    Each replicate gets the same result as `brute_force_SEIR` with `int_seed`
+    set to the seed of its block of streams (see `RNGStreams.seed_blocks`).
+    Runs in parallel over every replicate and node.
+    """
+    cdef:
+        Py_ssize_t rep_len = counts.shape[0]
+        Py_ssize_t node_len = counts.shape[1]
+        gsl_rng **streams = NULL
+        np.ndarray result
+
+    if stochastic:
+        if rngs is None or rngs.n != rep_len * node_len:
+            raise ValueError(f"expected {rep_len * node_len} RNG streams " +
+                             f"for stochastic transitions, received " +
+                             f"{None if rngs is None else rngs.n}")
+        streams = rngs.rngs
+
+    # flatten the replicate and node dimensions
+    result = _brute_force_SEIR[double](
+        counts.reshape((rep_len * node_len, counts.shape[2], counts.shape[3],
+                        counts.shape[4])),
+        foi.reshape((rep_len * node_len, foi.shape[2], foi.shape[3])),
+        probs,
+        pi,
+        nu,
+        tau,
+        stochastic,
+        binomial,
+        streams
+    )
+    return result.reshape((rep_len, node_len, counts.shape[2],
+                           counts.shape[3], counts.shape[4]))
+
+
+def fused_FOI_SEIR(np.ndarray counts,
+                   np.ndarray phi_t,
+                   np.ndarray omega,
+                   float beta,
+                   np.ndarray probs,
+                   np.ndarray pi,
+                   np.ndarray nu,
+                   float tau,
+                   unsigned int stochastic,
+                   RNGStreams rngs,
+                   np.ndarray pressure,
+                   np.ndarray sources,
+                   np.ndarray foi,
+                   np.ndarray counts_delta,
+                   unsigned int binomial=0):
+    """Calculates force of infection like `brute_force_FOI`, and applies SEIR
+    transitions to each cell as soon as its FOI is known. Writes into the
+    preallocated arrays `foi` and `counts_delta`. `pressure` is a (vertex, age,
+    risk) scratch array, and `sources` an intp scratch array with at least as
+    many elements. `rngs` holds one seeded stream per vertex.
+    """
+    cdef:
+        double [:, :, :, :] counts_view = counts
+        double [:, :, :, :, :, :] phi_view = phi_t
+        double [:, :] omega_view = omega
+        double [:] prob_view = probs
+        double [:, :] pi_view = pi
+        double [:] nu_view = nu
+        double [:, :, :] pressure_view = pressure
+        double [:, :, :] foi_view = foi
+        double [:, :, :, :] compt_v = counts_delta
+        gsl_rng **streams = rngs.rngs
+        # indexers and lengths of each dimension in state space
+        Py_ssize_t node_len = counts_view.shape[0]
+        Py_ssize_t age_len = counts_view.shape[1]
+        Py_ssize_t risk_len = counts_view.shape[2]
+        Py_ssize_t compt_len = counts_view.shape[3]
+        Py_ssize_t n, a, r, c, n_2, a_2, r_2, i, j, n_src
+        Py_ssize_t [:] src_view = sources
+        double total_pop, rate_S2E
+
+    if rngs.n < node_len:
+        raise ValueError(f"expected at least {node_len} RNG streams, " +
+                         f"received {rngs.n}")
+    if src_view.shape[0] < node_len * age_len * risk_len:
+        raise ValueError(f"expected at least {node_len * age_len * risk_len} " +
+                         f"elements in `sources`, received {src_view.shape[0]}")
+
+    # infectious pressure exerted by each node, age, and risk group
+    for n_2 in prange(node_len, nogil=True):
+        for a_2 in range(age_len):
+            for r_2 in range(risk_len):
+                total_pop = 0.
+                for c in range(compt_len):
+                    total_pop = total_pop + counts_view[n_2, a_2, r_2, c]
+                # Ignore case where node population is zero or negative
+                if total_pop <= 0:
+                    pressure_view[n_2, a_2, r_2] = 0.
+                    continue
+                pressure_view[n_2, a_2, r_2] = (
+                    (omega_view[a_2, 4] * counts_view[n_2, a_2, r_2, 4]) + \
+                    (omega_view[a_2, 5] * counts_view[n_2, a_2, r_2, 5]) + \
+                    (omega_view[a_2, 2] * counts_view[n_2, a_2, r_2, 2]) + \
+                    (omega_view[a_2, 3] * counts_view[n_2, a_2, r_2, 3])
+                ) / total_pop
+
+    # only sources that exert pressure contribute
+    n_src = _fill_sources(pressure_view, src_view)
+
+    # Iterate over node, age, and risk
+    for n in prange(node_len, nogil=True):
+        for a in range(age_len):
+            for r in range(risk_len):
+                rate_S2E = 0.
+                if counts_view[n, a, r, 0] != 0:
+                    for i in range(n_src):
+                        j = src_view[i]
+                        n_2 = j // (age_len * risk_len)
+                        a_2 = (j // risk_len) % age_len
+                        r_2 = j % risk_len
+                        rate_S2E = rate_S2E + (
+                            phi_view[n, n_2, a, a_2, r, r_2] * \
+                            pressure_view[n_2, a_2, r_2])
+                rate_S2E = beta * counts_view[n, a, r, 0] * rate_S2E
+                foi_view[n, a, r] = rate_S2E
+                _seir_cell(counts_view, compt_v, n, a, r, rate_S2E,
+                           prob_view, pi_view[r, a], nu_view[a], tau,
+                           stochastic, binomial, streams[n])
+
+
+cdef inline Py_ssize_t _fill_sources(double [:, :, :] pressure_view,
+                                    Py_ssize_t [:] src_view) nogil:
+    """Writes the flat index of each (vertex, age, risk) group with nonzero
+    pressure to the start of `src_view`, in order, and returns their number.
+    """
+    cdef:
+        Py_ssize_t n, a, r, j = 0, n_src = 0
+    for n in range(pressure_view.shape[0]):
+        for a in range(pressure_view.shape[1]):
+            for r in range(pressure_view.shape[2]):
+                if pressure_view[n, a, r] != 0:
+                    src_view[n_src] = j
+                    n_src = n_src + 1
+                j = j + 1
+    return n_src
+
+
+cdef inline void _seir_cell(floating [:, :, :, :] counts_view,
+                            floating [:, :, :, :] compt_v,
+                            Py_ssize_t n,
+                            Py_ssize_t a,
+                            Py_ssize_t r,
+                            double rate_S2E,
+                            double [:] prob_view,
+                            double pi,
+                            double nu,
+                            double tau,
+                            unsigned int stochastic,
+                            unsigned int binomial,
+                            gsl_rng *rng) nogil:
+    """Writes the change in compartments 'S' through 'D' of cell (`n`, `a`,
+    `r`) to `compt_v`, given the force of infection `rate_S2E` on the cell.
+    """
+    cdef:
+        # epi params
+        double gamma_a = prob_view[P_GAMMA_A]
+        double gamma_y = prob_view[P_GAMMA_Y]
+        double gamma_h = prob_view[P_GAMMA_H]
+        double sigma = prob_view[P_SIGMA]
+        double rho_a = prob_view[P_RHO_A]
+        double rho_y = prob_view[P_RHO_Y]
+        double eta = prob_view[P_ETA]
+        double mu = prob_view[P_MU]
+        # compartment counts
+        double S, E, Pa, Py, Ia, Iy, Ih, R, D, E2P, E2Py, P2I, Pa2Ia, Py2Iy, \
+            Iy2Ih, H2D
+        # delta compartment values
+        double d_S, d_E, d_Pa, d_Py, d_Ia, d_Iy, d_Ih, d_R, d_D
+        # new compartment values, after deltas applied
+        double new_S, new_E, new_Pa, new_Py, new_Ia, new_Iy, new_Ih, new_R, \
+            new_D, new_E2P, new_E2Py, new_P2I, new_Pa2Ia, new_Py2Iy, \
+            new_Iy2Ih, new_H2D
+        # rates between compartments
+        double rate_E2P, rate_Pa2Ia, rate_Py2Iy, rate_Ia2R, \
+            rate_Iy2R, rate_Ih2R, rate_Iy2Ih, rate_Ih2D
+        Py_ssize_t c
+
+    # inert cells, with no one infected and no force of infection, have no
+    # transitions
+    if rate_S2E == 0 and counts_view[n, a, r, 1] == 0 and \
+            counts_view[n, a, r, 2] == 0 and counts_view[n, a, r, 3] == 0 and \
+            counts_view[n, a, r, 4] == 0 and counts_view[n, a, r, 5] == 0 and \
+            counts_view[n, a, r, 6] == 0:
+        for c in range(9):
+            compt_v[n, a, r, c] = 0.
+        return
+
+    if stochastic == 1 and binomial == 1:
+        _binomial_seir_cell(counts_view, compt_v, n, a, r, rate_S2E,
+                            prob_view, pi, nu, tau, rng)
+        return
+
+    # -----------   Expand compartment counts  -------------
+
+    # 'S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih', 'R', 'D', 'E2P', 'E2Py', 'P2I', 'Pa2Ia', 'Py2Iy', 'Iy2Ih', 'H2D'
+    S = counts_view[n, a, r, 0]
+    E = counts_view[n, a, r, 1]
+    Pa = counts_view[n, a, r, 2]
+    Py = counts_view[n, a, r, 3]
+    Ia = counts_view[n, a, r, 4]
+    Iy = counts_view[n, a, r, 5]
+    Ih = counts_view[n, a, r, 6]
+    R = counts_view[n, a, r, 7]
+    D = counts_view[n, a, r, 8]
+
+    E2P = counts_view[n, a, r, 9]
+    E2Py = counts_view[n, a, r, 10]
+    P2I = counts_view[n, a, r, 11]
+    Pa2Ia = counts_view[n, a, r, 12]
+    Py2Iy = counts_view[n, a, r, 13]
+    Iy2Ih = counts_view[n, a, r, 14]
+    H2D = counts_view[n, a, r, 15]
+
+    # ----------------   Get other deltas  -----------------
+
+    rate_E2P = E * sigma
+    rate_Pa2Ia = Pa * rho_a
+    rate_Py2Iy = Py * rho_y
+    rate_Ia2R = Ia * gamma_a
+    rate_Iy2R = (1 - pi) * gamma_y * Iy
+    rate_Ih2R = (1 - nu) * gamma_h * Ih
+    rate_Iy2Ih = pi * Iy * eta
+    rate_Ih2D = nu * Ih * mu
+
+    # --------------   Sample from Poisson  ----------------
+
+    if stochastic == 1:
+        rate_S2E = gsl_ran_poisson(rng, rate_S2E)
+        rate_E2P = gsl_ran_poisson(rng, rate_E2P)
+        rate_Py2Iy = gsl_ran_poisson(rng, rate_Py2Iy)
+        rate_Pa2Ia = gsl_ran_poisson(rng, rate_Pa2Ia)
+        rate_Ia2R = gsl_ran_poisson(rng, rate_Ia2R)
+        rate_Iy2R = gsl_ran_poisson(rng, rate_Iy2R)
+        rate_Ih2R = gsl_ran_poisson(rng, rate_Ih2R)
+        rate_Iy2Ih = gsl_ran_poisson(rng, rate_Iy2Ih)
+        rate_Ih2D = gsl_ran_poisson(rng, rate_Ih2D)
+
+    if isinf(rate_S2E):
+        rate_S2E = 0
+    if isinf(rate_E2P):
+        rate_E2P = 0
+    if isinf(rate_Py2Iy):
+        rate_Py2Iy = 0
+    if isinf(rate_Pa2Ia):
+        rate_Pa2Ia = 0
+    if isinf(rate_Ia2R):
+        rate_Ia2R = 0
+    if isinf(rate_Iy2R):
+        rate_Iy2R = 0
+    if isinf(rate_Ih2R):
+        rate_Ih2R = 0
+    if isinf(rate_Iy2Ih):
+        rate_Iy2Ih = 0
+    if isinf(rate_Ih2D):
+        rate_Ih2D = 0
+
+    # -----------------   Apply deltas  --------------------
+
+    d_S = -rate_S2E
+    new_S = S + d_S
+    if new_S < 0:
+        rate_S2E = S
+        rate_S2E = 0
+
+    d_E = rate_S2E - rate_E2P
+    new_E = E + d_E
+    if new_E < 0:
+        rate_E2P = E + rate_S2E
+        new_E = 0
+
+    new_E2P = rate_E2P
+    new_E2Py = tau * rate_E2P
+    if new_E2Py < 0:
+        rate_E2P = 0
+        new_E2P = 0
+        new_E2Py = 0
+
+    d_Pa = (1 - tau) * rate_E2P - rate_Pa2Ia
+    new_Pa = Pa + d_Pa
+    new_Pa2Ia = rate_Pa2Ia
+    if new_Pa < 0:
+        rate_Pa2Ia = Pa + (1 - tau) * rate_E2P
+        new_Pa = 0
+        new_Pa2Ia = rate_Pa2Ia
+
+    d_Py = tau * rate_E2P - rate_Py2Iy
+    new_Py = Py + d_Py
+    new_Py2Iy = rate_Py2Iy
+    if new_Py < 0:
+        rate_Py2Iy = Py + tau * rate_E2P
+        new_Py = 0
+        new_Py2Iy = rate_Py2Iy
+
+    new_P2I = new_Pa2Ia + new_Py2Iy
+
+    d_Ia = rate_Pa2Ia - rate_Ia2R
+    new_Ia = Ia + d_Ia
+    if new_Ia < 0:
+        rate_Ia2R = Ia + rate_Pa2Ia
+        new_Ia = 0
+
+    d_Iy = rate_Py2Iy - rate_Iy2R - rate_Iy2Ih
+    new_Iy = Iy + d_Iy
+    if new_Iy < 0:
+        rate_Iy2R = (Iy + rate_Py2Iy) * rate_Iy2R / \
+            (rate_Iy2R + rate_Iy2Ih)
+        rate_Iy2Ih = Iy + rate_Py2Iy - rate_Iy2R
+        new_Iy = 0
+
+    new_Iy2Ih = rate_Iy2Ih
+    if new_Iy2Ih < 0:
+        new_Iy2Ih = 0
+
+    d_Ih = rate_Iy2Ih - rate_Ih2R - rate_Ih2D
+    new_Ih = Ih + d_Ih
+    if new_Ih < 0:
+        rate_Ih2R = (Ih + rate_Iy2Ih) * rate_Ih2R / \
+            (rate_Ih2R + rate_Ih2D)
+        rate_Ih2D = Ih + rate_Iy2Ih - rate_Ih2R
+        new_Ih = 0
+
+    d_R = rate_Ia2R + rate_Iy2R + rate_Ih2R
+    new_R = R + d_R
+
+    d_D = rate_Ih2D
+    new_H2D = rate_Ih2D
+    new_D = D + d_D
+
+    # ----------   Load new vals to state array  ---------------
+
+    # 'S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih', 'R', 'D', 'E2P', 'E2Py', 'P2I', 'Pa2Ia', 'Py2Iy', 'Iy2Ih', 'H2D'
+    compt_v[n, a, r, 0] = new_S - S
+    compt_v[n, a, r, 1] = new_E - E
+    compt_v[n, a, r, 2] = new_Pa - Pa
+    compt_v[n, a, r, 3] = new_Py - Py
+    compt_v[n, a, r, 4] = new_Ia - Ia
+    compt_v[n, a, r, 5] = new_Iy - Iy
+    compt_v[n, a, r, 6] = new_Ih - Ih
+    compt_v[n, a, r, 7] = new_R - R
+    compt_v[n, a, r, 8] = new_D - D
+
+
+cdef inline void _binomial_seir_cell(floating [:, :, :, :] counts_view,
+                                     floating [:, :, :, :] compt_v,
+                                     Py_ssize_t n,
+                                     Py_ssize_t a,
+                                     Py_ssize_t r,
+                                     double rate_S2E,
+                                     double [:] prob_view,
+                                     double pi,
+                                     double nu,
+                                     double tau,
+                                     gsl_rng *rng) nogil:
+    """Like `_seir_cell`, but each outflow is a binomial draw from the whole
+    individuals in the compartment at the start of the step, and competing
+    outflows are drawn from a multinomial. Compartments cannot become
+    negative, so no adjustments are needed.
+    """
+    cdef:
+        unsigned int S = _n_trials(counts_view[n, a, r, 0])
+        unsigned int E = _n_trials(counts_view[n, a, r, 1])
+        unsigned int Pa = _n_trials(counts_view[n, a, r, 2])
+        unsigned int Py = _n_trials(counts_view[n, a, r, 3])
+        unsigned int Ia = _n_trials(counts_view[n, a, r, 4])
+        unsigned int Iy = _n_trials(counts_view[n, a, r, 5])
+        unsigned int Ih = _n_trials(counts_view[n, a, r, 6])
+        double p_S2E = 0.
+        # number of transitions
+        unsigned int S2E, E2P, E2Py, Pa2Ia, Py2Iy, Ia2R, Iy2R, Iy2Ih, Ih2R, \
+            Ih2D
+
+    # FOI is the expected number of new infections
+    if S > 0 and rate_S2E > 0:
+        p_S2E = rate_S2E / S
+    S2E = gsl_ran_binomial(rng, _clip_prob(p_S2E), S)
+    E2P = gsl_ran_binomial(rng, _clip_prob(prob_view[P_SIGMA]), E)
+    E2Py = gsl_ran_binomial(rng, _clip_prob(tau), E2P)
+    Pa2Ia = gsl_ran_binomial(rng, _clip_prob(prob_view[P_RHO_A]), Pa)
+    Py2Iy = gsl_ran_binomial(rng, _clip_prob(prob_view[P_RHO_Y]), Py)
+    Ia2R = gsl_ran_binomial(rng, _clip_prob(prob_view[P_GAMMA_A]), Ia)
+    Iy2R, Iy2Ih = _two_outflows(rng, Iy, (1 - pi) * prob_view[P_GAMMA_Y],
+                                pi * prob_view[P_ETA])
+    Ih2R, Ih2D = _two_outflows(rng, Ih, (1 - nu) * prob_view[P_GAMMA_H],
+                               nu * prob_view[P_MU])
+
+    # 'S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih', 'R', 'D'
+    compt_v[n, a, r, 0] = -<double>S2E
+    compt_v[n, a, r, 1] = <double>S2E - E2P
+    compt_v[n, a, r, 2] = <double>(E2P - E2Py) - Pa2Ia
+    compt_v[n, a, r, 3] = <double>E2Py - Py2Iy
+    compt_v[n, a, r, 4] = <double>Pa2Ia - Ia2R
+    compt_v[n, a, r, 5] = <double>Py2Iy - Iy2R - Iy2Ih
+    compt_v[n, a, r, 6] = <double>Iy2Ih - Ih2R - Ih2D
+    compt_v[n, a, r, 7] = <double>Ia2R + Iy2R + Ih2R
+    compt_v[n, a, r, 8] = <double>Ih2D
+
+
+cdef inline unsigned int _n_trials(double count) nogil:
+    """Number of whole individuals in a compartment with `count`"""
+    if count < 1:
+        return 0
+    return <unsigned int>count
+
+
+cdef inline double _clip_prob(double p) nogil:
+    if p < 0:
+        return 0.
+    elif p > 1:
+        return 1.
+    return p
+
+
+cdef inline (unsigned int, unsigned int) _two_outflows(gsl_rng *rng,
+                                                       unsigned int count,
+                                                       double p_1,
+                                                       double p_2) nogil:
+    """Draws the number of the `count` individuals that leave along each of
+    two competing outflows, with probabilities `p_1` and `p_2`, from a
+    multinomial. Probabilities are scaled down if their sum exceeds 1.
+    """
+    cdef:
+        double total
+        unsigned int n_1
+
+    p_1 = _clip_prob(p_1)
+    p_2 = _clip_prob(p_2)
+    total = p_1 + p_2
+    if total > 1:
+        p_1 = p_1 / total
+        p_2 = p_2 / total
+    n_1 = gsl_ran_binomial(rng, p_1, count)
+    if p_1 >= 1:
+        return n_1, 0
+    return n_1, gsl_ran_binomial(rng, _clip_prob(p_2 / (1 - p_1)),
+                                 count - n_1)
@@ -70,11 +70,16 @@ class BruteForceSEIR(BaseSEIR):
         # logging.debug(f"{rate}, {timestep}, {val}")
         return val
 
+    def initialize(self):
+        if self.binomial:
+            raise ValueError("BruteForceSEIR does not support chain-binomial " +
+                             "transitions; set `binomial` to False (sto_mode " +
+                             "'poisson') or use VectorizedSEIR")
+
     @xs.runtime(args='step_delta')
     def run_step(self, step_delta):
         """
         """
-
         # Get a RNG for this timepoint, based off of the uint64 seed
         # at this timepoint
         self.rng = self.get_rng()
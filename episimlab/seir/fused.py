@@ -0,0 +1,59 @@
+import xsimlab as xs
+import xarray as xr
+import numpy as np
+
+from ..foi.base import BaseFOI
+from ..cy_utils.cy_utils import RNGStreams
+from .base import BaseSEIR
+from .bf_cython import TransitionProbsMixin
+from ..utils.build import import_engine
+
+fused_FOI_SEIR = import_engine(
+    '.bf_cython_engine', package=__package__).fused_FOI_SEIR
+
+
+@xs.process
+class FusedFOISEIR(TransitionProbsMixin, BaseFOI, BaseSEIR):
+    """Calculates force of infection and the change in `counts` due to SEIR
+    transmission in a single pass, with the same results as
+    BruteForceCythonFOI followed by BruteForceCythonSEIR. Output arrays are
+    allocated once and written in place at every step. Replaces both the `foi`
+    and `seir` processes in a model.
+    """
+    phi_t = xs.global_ref('phi_t')
+
+    counts_delta_seir = xs.variable(
+        groups=['counts_delta'],
+        dims=BaseSEIR.COUNTS_DIMS,
+        static=False,
+        intent='out'
+    )
+
+    def initialize(self):
+        super(FusedFOISEIR, self).initialize()
+        self.counts_delta_seir = xr.zeros_like(self.counts)
+        self.pressure = np.zeros(self.foi.shape)
+        self.sources = np.zeros(self.pressure.size, dtype=np.intp)
+        self.rngs = RNGStreams(len(self.vertex))
+
+    @xs.runtime(args='step_delta')
+    def run_step(self, step_delta):
+        """Writes `foi` and `counts_delta_seir` in place for this step."""
+        self.rngs.seed(self.seed_state)
+        fused_FOI_SEIR(
+            counts=self.counts.values,
+            phi_t=self.phi_t.values,
+            omega=self.omega.values,
+            beta=self.beta,
+            probs=self.get_transition_probs(self.get_int_per_day(step_delta)),
+            pi=self.pi.values,
+            nu=self.nu.values,
+            tau=self.tau,
+            stochastic=self.stochastic,
+            rngs=self.rngs,
+            pressure=self.pressure,
+            sources=self.sources,
+            foi=self.foi.values,
+            counts_delta=self.counts_delta_seir.values,
+            binomial=self.binomial
+        )
@@ -0,0 +1,205 @@
+import xsimlab as xs
+import xarray as xr
+import numpy as np
+
+from ..foi.base import BaseFOI
+from .base import BaseSEIR
+from ..utils import discrete_time_approx as py_dta, rng
+
+
+@xs.process
+class VectorizedSEIR(BaseSEIR):
+    """Calculate change in `counts` due to SEIR transmission. Same algorithm
+    as BruteForceSEIR, but each rate and adjustment is applied to every
+    vertex, age, and risk group at once with NumPy array operations, so it
+    does not require the Cython extensions.
+    """
+    # compartments that are changed by SEIR transitions
+    COMPARTMENTS = ('S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih', 'R', 'D')
+
+    foi = xs.foreign(BaseFOI, 'foi', intent='in')
+    counts_delta_seir = xs.variable(
+        groups=['counts_delta'],
+        dims=BaseSEIR.COUNTS_DIMS,
+        static=False,
+        intent='out'
+    )
+
+    def discrete_time_approx(self, rate):
+        return py_dta(rate=float(rate), timestep=float(self.int_per_day))
+
+    def get_rates(self) -> dict:
+        """Returns the expected number of transitions for each flow, as arrays
+        with shape (vertex, age_group, risk_group).
+        """
+        cts = self.get_compartments()
+        coords = {dim: self.counts.coords[dim].values
+                  for dim in ('age_group', 'risk_group')}
+        pi = self.pi.loc[coords].transpose('age_group', 'risk_group').values
+        nu = self.nu.loc[coords['age_group']].values[:, np.newaxis]
+        gamma = {k: self.discrete_time_approx(self.gamma.loc[dict(compartment=k)])
+                 for k in ('Ia', 'Iy', 'Ih')}
+        rho = {k: self.discrete_time_approx(self.rho.loc[dict(compartment=k)])
+               for k in ('Ia', 'Iy')}
+        return dict(
+            S2E=self.foi.transpose(*BaseFOI.FOI_DIMS).values.copy(),
+            E2P=self.discrete_time_approx(self.sigma) * cts['E'],
+            Pa2Ia=rho['Ia'] * cts['Pa'],
+            Py2Iy=rho['Iy'] * cts['Py'],
+            Ia2R=gamma['Ia'] * cts['Ia'],
+            Iy2R=(1 - pi) * gamma['Iy'] * cts['Iy'],
+            Ih2R=(1 - nu) * gamma['Ih'] * cts['Ih'],
+            Iy2Ih=pi * cts['Iy'] * self.discrete_time_approx(self.eta),
+            Ih2D=nu * cts['Ih'] * self.discrete_time_approx(self.mu),
+        )
+
+    def get_compartments(self) -> dict:
+        """Returns a (vertex, age_group, risk_group) view of `counts` for each
+        of COMPARTMENTS.
+        """
+        counts = self.counts.transpose(*self.COUNTS_DIMS)
+        compt_idx = counts.get_index('compartment')
+        return {k: counts.values[..., compt_idx.get_loc(k)]
+                for k in self.COMPARTMENTS}
+
+    @xs.runtime(args='step_delta')
+    def run_step(self, step_delta):
+        """
+        """
+        self.int_per_day = self.get_int_per_day(step_delta)
+        cts = self.get_compartments()
+        rates = self.get_rates()
+
+        if self.stochastic is True and self.binomial is True:
+            gen = rng.get_rng(seed=self.seed_state)
+            new = self.draw_binomial(cts, rates, gen)
+        else:
+            if self.stochastic is True:
+                gen = rng.get_rng(seed=self.seed_state)
+                rates = {k: gen.poisson(v).astype('float64')
+                         for k, v in rates.items()}
+            for v in rates.values():
+                v[np.isinf(v)] = 0.
+            new = self.apply_rates(cts, rates)
+
+        counts = self.counts.transpose(*self.COUNTS_DIMS)
+        delta = np.nan * xr.zeros_like(counts)
+        compt_idx = counts.get_index('compartment')
+        for k in self.COMPARTMENTS:
+            delta.values[..., compt_idx.get_loc(k)] = new[k] - cts[k]
+        self.counts_delta_seir = delta
+
+    def apply_rates(self, cts, rates) -> dict:
+        """Given compartment counts `cts` and transition counts `rates`,
+        returns new counts in each compartment. Wherever a compartment would
+        become negative, its outflows are reduced as in BruteForceSEIR.
+        """
+        tau = self.tau
+        S, E, Pa, Py = cts['S'], cts['E'], cts['Pa'], cts['Py']
+        Ia, Iy, Ih = cts['Ia'], cts['Iy'], cts['Ih']
+        S2E, E2P, Pa2Ia, Py2Iy = (rates[k] for k in ('S2E', 'E2P', 'Pa2Ia', 'Py2Iy'))
+        Ia2R, Iy2R, Ih2R = rates['Ia2R'], rates['Iy2R'], rates['Ih2R']
+        Iy2Ih, Ih2D = rates['Iy2Ih'], rates['Ih2D']
+
+        # NOTE: like the other engines, S is decremented by the unadjusted
+        # S2E, but E does not receive any inflow where S would be negative
+        new_S = S - S2E
+        S2E = np.where(new_S < 0, 0., S2E)
+
+        new_E = E + (S2E - E2P)
+        neg = new_E < 0
+        E2P = np.where(neg, E + S2E, E2P)
+        new_E = np.where(neg, 0., new_E)
+
+        E2P = np.where(tau * E2P < 0, 0., E2P)
+
+        new_Pa = Pa + ((1 - tau) * E2P - Pa2Ia)
+        neg = new_Pa < 0
+        Pa2Ia = np.where(neg, Pa + (1 - tau) * E2P, Pa2Ia)
+        new_Pa = np.where(neg, 0., new_Pa)
+
+        new_Py = Py + (tau * E2P - Py2Iy)
+        neg = new_Py < 0
+        Py2Iy = np.where(neg, Py + tau * E2P, Py2Iy)
+        new_Py = np.where(neg, 0., new_Py)
+
+        new_Ia = Ia + (Pa2Ia - Ia2R)
+        neg = new_Ia < 0
+        Ia2R = np.where(neg, Ia + Pa2Ia, Ia2R)
+        new_Ia = np.where(neg, 0., new_Ia)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_Iy = Iy + (Py2Iy - Iy2R - Iy2Ih)
+            neg = new_Iy < 0
+            Iy2R = np.where(neg, (Iy + Py2Iy) * Iy2R / (Iy2R + Iy2Ih), Iy2R)
+            Iy2Ih = np.where(neg, Iy + Py2Iy - Iy2R, Iy2Ih)
+            new_Iy = np.where(neg, 0., new_Iy)
+
+            new_Ih = Ih + (Iy2Ih - Ih2R - Ih2D)
+            neg = new_Ih < 0
+            Ih2R = np.where(neg, (Ih + Iy2Ih) * Ih2R / (Ih2R + Ih2D), Ih2R)
+            Ih2D = np.where(neg, Ih + Iy2Ih - Ih2R, Ih2D)
+            new_Ih = np.where(neg, 0., new_Ih)
+
+        return dict(
+            S=new_S,
+            E=new_E,
+            Pa=new_Pa,
+            Py=new_Py,
+            Ia=new_Ia,
+            Iy=new_Iy,
+            Ih=new_Ih,
+            R=cts['R'] + (Ia2R + Iy2R + Ih2R),
+            D=cts['D'] + Ih2D,
+        )
+
+    def draw_binomial(self, cts, rates, gen) -> dict:
+        """Returns new counts in each compartment, given compartment counts
+        `cts` and expected transitions `rates`. As in the chain-binomial mode
+        of the Cython engine, each outflow is a binomial draw from the whole
+        individuals in its compartment, and competing outflows from 'Iy' and
+        'Ih' are drawn from a multinomial.
+        """
+        n = {k: np.floor(np.clip(cts[k], 0., None)).astype('int64')
+             for k in self.COMPARTMENTS}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = {k: np.clip(np.where(n[src] > 0, rates[k] / cts[src], 0.), 0., 1.)
+                 for k, src in (('E2P', 'E'), ('Pa2Ia', 'Pa'), ('Py2Iy', 'Py'),
+                                ('Ia2R', 'Ia'), ('Iy2R', 'Iy'), ('Iy2Ih', 'Iy'),
+                                ('Ih2R', 'Ih'), ('Ih2D', 'Ih'))}
+            p['S2E'] = np.clip(np.where(n['S'] > 0, rates['S2E'] / n['S'], 0.),
+                               0., 1.)
+
+        S2E = gen.binomial(n['S'], p['S2E'])
+        E2P = gen.binomial(n['E'], p['E2P'])
+        E2Py = gen.binomial(E2P, np.clip(self.tau, 0., 1.))
+        Pa2Ia = gen.binomial(n['Pa'], p['Pa2Ia'])
+        Py2Iy = gen.binomial(n['Py'], p['Py2Iy'])
+        Ia2R = gen.binomial(n['Ia'], p['Ia2R'])
+        Iy2R, Iy2Ih = _two_outflows(gen, n['Iy'], p['Iy2R'], p['Iy2Ih'])
+        Ih2R, Ih2D = _two_outflows(gen, n['Ih'], p['Ih2R'], p['Ih2D'])
+
+        return dict(
+            S=cts['S'] - S2E,
+            E=cts['E'] + (S2E - E2P),
+            Pa=cts['Pa'] + (E2P - E2Py - Pa2Ia),
+            Py=cts['Py'] + (E2Py - Py2Iy),
+            Ia=cts['Ia'] + (Pa2Ia - Ia2R),
+            Iy=cts['Iy'] + (Py2Iy - Iy2R - Iy2Ih),
+            Ih=cts['Ih'] + (Iy2Ih - Ih2R - Ih2D),
+            R=cts['R'] + (Ia2R + Iy2R + Ih2R),
+            D=cts['D'] + Ih2D,
+        )
+
+
+def _two_outflows(gen, count, p_1, p_2) -> tuple:
+    """Draws the number of the `count` individuals that leave along each of
+    two competing outflows, with probabilities `p_1` and `p_2`, from a
+    multinomial. Probabilities are scaled down if their sum exceeds 1.
+    """
+    total = np.maximum(p_1 + p_2, 1.)
+    p_1, p_2 = p_1 / total, p_2 / total
+    n_1 = gen.binomial(count, p_1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_2 = np.where(p_1 < 1., np.clip(p_2 / (1. - p_1), 0., 1.), 0.)
+    return n_1, gen.binomial(count - n_1, p_2)
@@ -5,7 +5,27 @@ import pandas as pd
 import itertools
 
 from ..setup.coords import InitDefaultCoords
-from ..utils import ravel_to_midx, unravel_encoded_midx
+from ..utils import (
+    ravel_to_midx, unravel_encoded_midx, get_pair_index, get_day_of_week
+)
+
+
+def get_day_profiles(days) -> tuple:
+    """Deduplicates `days`, an iterable of the adjacency on each day of
+    week as a tuple of arrays. Returns a list of the unique adjacencies, and
+    an array with the index among them of the adjacency on each day.
+    """
+    profiles = list()
+    day_profile = list()
+    for day in days:
+        for i, profile in enumerate(profiles):
+            if all(np.array_equal(a, b) for a, b in zip(day, profile)):
+                day_profile.append(i)
+                break
+        else:
+            day_profile.append(len(profiles))
+            profiles.append(day)
+    return profiles, np.array(day_profile, dtype=np.intc)
 
 
 @xs.process
@@ -46,16 +66,23 @@ class InitAdjGrpMapping:
 
 @xs.process
 class InitToyAdj:
-    """TODO: Separate the adj_t slicing and adj
+    """Holds travel rates for `mobile_compartments` only, which are set by
+    the travel process.
+
+    Days of week with identical travel rates share a day profile in `adj`,
+    and `adj_day_profile` maps each day of week to its profile.
+
+    TODO: Separate the adj_t slicing and adj
     instantiation into separate processes
     """
-    ADJ_DIMS = ('day_of_week', 'vertex1', 'vertex2',
+    ADJ_DIMS = ('day_profile', 'vertex1', 'vertex2',
                 'age_group', 'risk_group', 'compartment')
 
     age_group = xs.foreign(InitAdjGrpMapping, 'age_group', intent='in')
     risk_group = xs.foreign(InitAdjGrpMapping, 'risk_group', intent='in')
     vertex = xs.foreign(InitAdjGrpMapping, 'vertex', intent='in')
     compartment = xs.foreign(InitAdjGrpMapping, 'compartment', intent='in')
+    mobile_compartments = xs.global_ref('mobile_compartments')
     # TODO: set these coords separately
     day_of_week = xs.index(dims=('day_of_week'))
 
@@ -63,6 +90,11 @@ class InitToyAdj:
         dims=ADJ_DIMS,
         static=True,
         intent='out')
+    adj_day_profile = xs.variable(
+        dims=('day_of_week'),
+        static=True,
+        intent='out',
+        description='index on day_profile of each day of week in adj')
     adj_t = xs.variable(dims=ADJ_DIMS[1:], intent='out')
 
     def initialize(self):
@@ -73,19 +105,175 @@ class InitToyAdj:
         # Set day of week coords
         self.day_of_week = np.arange(7)
 
-        self.ADJ_COORDS = {k: getattr(self, k) for k in self.ADJ_DIMS}
+        self.ADJ_COORDS = {k: getattr(self, k) for k in self.ADJ_DIMS[1:]}
+        self.ADJ_COORDS['compartment'] = list(self.mobile_compartments)
+        profiles, self.adj_day_profile = get_day_profiles(
+            (self.get_day_adj(day), ) for day in self.day_of_week)
+        self.ADJ_COORDS['day_profile'] = np.arange(len(profiles))
         self.adj = xr.DataArray(
-            data=0.,
+            data=np.stack([adj for adj, in profiles]),
             dims=self.ADJ_DIMS,
             coords=self.ADJ_COORDS
         )
 
-    @xs.runtime(args='step')
-    def run_step(self, step):
+    def get_day_adj(self, day) -> np.ndarray:
+        """Travel rates on day of week `day`, which are all zero."""
+        shape = [len(self.ADJ_COORDS[dim]) for dim in self.ADJ_DIMS[1:]]
+        return np.zeros(shape)
+
+    @xs.runtime(args=('step', 'step_start'))
+    def run_step(self, step, step_start):
+        """Travel rates on the day of week of `step_start`, as a view on
+        `adj`. Assumes that step 0 is a Monday if the clock is not datetime.
+        """
+        day_idx = get_day_of_week(step, step_start)
+        self.adj_t = self.adj[self.adj_day_profile[day_idx]]
+
+
+@xs.process
+class InitSparseAdj:
+    """Sparse counterpart of InitToyAdj, loaded from edge list CSV `adj_fp`
+    with columns `vertex1`, `vertex2` and `rate`. Optional columns
+    `day_of_week`, `age_group`, `risk_group` and `compartment` restrict a row
+    to one coordinate; if a column is absent or blank, the row applies to all
+    of them.
+    As in InitToyAdj, travel between a pair of vertices is symmetric: each
+    pair is stored once with vertex1 before vertex2, and rates of repeated
+    rows are summed. Only rows for `mobile_compartments` are kept.
+
+    `adj` holds an (age_group, risk_group, compartment) block of rates for
+    each edge, sorted on day profile and vertex pair. Days of week with
+    identical edges and rates share a day profile, given by
+    `adj_day_profile`. Each day of week is a CSR matrix over vertex pairs,
+    with row pointers `adj_indptr` into `adj` and column positions
+    `adj_indices`. Memory scales with the number of edges rather than the
+    square of the number of vertices.
+    """
+    BLOCK_DIMS = ('age_group', 'risk_group', 'compartment')
+
+    age_group = xs.global_ref('age_group')
+    risk_group = xs.global_ref('risk_group')
+    vertex = xs.global_ref('vertex')
+    compartment = xs.global_ref('compartment')
+    mobile_compartments = xs.global_ref('mobile_compartments')
+    day_of_week = xs.index(dims=('day_of_week'))
+
+    adj_fp = xs.variable(static=True, intent='in',
+                         description='path to edge list CSV')
+    adj = xs.variable(dims=('edge',) + BLOCK_DIMS, static=True, intent='out')
+    adj_indices = xs.variable(dims=('edge'), static=True, intent='out')
+    adj_day_profile = xs.variable(
+        dims=('day_of_week'),
+        static=True,
+        intent='out',
+        description='day profile of the edges of each day of week in adj')
+    adj_indptr = xs.variable(dims=('day_of_week', 'vertex_ptr'), static=True,
+                             intent='out')
+    adj_indptr_t = xs.variable(dims=('vertex_ptr'), intent='out')
+
+    def initialize(self):
+        self.day_of_week = np.arange(7)
+        self.BLOCK_COORDS = dict(
+            age_group=self.age_group,
+            risk_group=self.risk_group,
+            compartment=list(self.mobile_compartments)
+        )
+        edges = self.read_edges()
+        n_vertex = len(self.vertex)
+
+        # unique edges, sorted on day of week, then vertex1, then vertex2
+        key = (edges['day_of_week'] * n_vertex + edges['vertex1']) * \
+            n_vertex + edges['vertex2']
+        edge_keys, edge_idx = np.unique(key, return_inverse=True)
+        day, pair = np.divmod(edge_keys, n_vertex * n_vertex)
+        row, col = np.divmod(pair, n_vertex)
+
+        shape = [edge_keys.size] + [len(self.BLOCK_COORDS[dim])
+                                    for dim in self.BLOCK_DIMS]
+        rates = np.zeros(shape, dtype='float64')
+        np.add.at(rates, (edge_idx, ) +
+                  tuple(edges[dim] for dim in self.BLOCK_DIMS), edges['rate'])
+
+        # keep the edges of only the first day of each day profile
+        bounds = np.searchsorted(day, np.arange(8))
+        profiles, self.adj_day_profile = get_day_profiles(
+            (row[start:stop], col[start:stop], rates[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:]))
+        row, col, rates = (np.concatenate(arrs) for arrs in zip(*profiles))
+        n_profile = len(profiles)
+        profile = np.repeat(np.arange(n_profile),
+                            [p_row.size for p_row, _, _ in profiles])
+
+        # row pointers of each day index into edges of all day profiles
+        ptr = np.zeros(n_profile * n_vertex + 1, dtype=np.intc)
+        np.cumsum(np.bincount(profile * n_vertex + row,
+                              minlength=n_profile * n_vertex), out=ptr[1:])
+        self.adj_indptr = np.stack([ptr[p * n_vertex:(p + 1) * n_vertex + 1]
+                                    for p in self.adj_day_profile])
+        self.adj_indices = col.astype(np.intc)
+        self.adj = xr.DataArray(
+            data=rates,
+            dims=('edge',) + self.BLOCK_DIMS,
+            coords=dict(
+                day_profile=('edge', profile),
+                vertex1=('edge', np.asarray(self.vertex)[row]),
+                vertex2=('edge', np.asarray(self.vertex)[col]),
+                **self.BLOCK_COORDS
+            )
+        )
+
+    def read_edges(self) -> dict:
+        """Returns integer positions of each row of `adj_fp` on each
+        dimension, along with its `rate`. Rows are broadcast over absent or
+        blank columns. Self-loops and rows for compartments that are not
+        mobile are dropped.
         """
-        TODO: this assumes that the first day is Monday...
+        df = pd.read_csv(self.adj_fp)
+        missing = {'vertex1', 'vertex2', 'rate'} - set(df.columns)
+        if missing:
+            raise KeyError(f"columns {missing} not found in {self.adj_fp}")
+        coords = dict(day_of_week=self.day_of_week, **self.BLOCK_COORDS)
+        for dim in ('day_of_week',) + self.BLOCK_DIMS:
+            if dim not in df.columns:
+                df[dim] = np.nan
+            blank = df[dim].isna()
+            if blank.any():
+                coord = pd.DataFrame({dim: coords[dim]})
+                df = pd.concat([
+                    df[~blank],
+                    df[blank].drop(columns=dim).merge(coord, how='cross')
+                ], ignore_index=True)
+
+        def labels(col, coord):
+            # match the dtype of coord, e.g. vertex labels read as integers,
+            # without truncating strings to the width of coord
+            dtype = np.asarray(coord).dtype
+            return df[col].values.astype(str if dtype.kind in 'US' else dtype)
+
+        v1 = get_pair_index(labels('vertex1', self.vertex), self.vertex)
+        v2 = get_pair_index(labels('vertex2', self.vertex), self.vertex)
+        edges = dict(
+            vertex1=np.minimum(v1, v2),
+            vertex2=np.maximum(v1, v2),
+            rate=df['rate'].values
+        )
+        keep = v1 != v2
+        for dim in ('day_of_week',) + self.BLOCK_DIMS:
+            # all compartments are valid labels, but only mobile ones are kept
+            valid = self.compartment if dim == 'compartment' else coords[dim]
+            dim_labels = labels(dim, valid)
+            if (pd.Index(valid).get_indexer(dim_labels) < 0).any():
+                raise KeyError(f"{dim} labels in {self.adj_fp} not found " +
+                               f"in coords {valid}")
+            edges[dim] = pd.Index(coords[dim]).get_indexer(dim_labels)
+            keep &= edges[dim] >= 0
+        return {k: v[keep] for k, v in edges.items()}
+
+    @xs.runtime(args=('step', 'step_start'))
+    def run_step(self, step, step_start):
+        """Row pointers for the day of week of `step_start`, as a view on
+        `adj_indptr`. Assumes that step 0 is a Monday if the clock is not
+        datetime.
         """
-        # Get the index on `day_of_week`
-        day_idx = step % 7
-        self.adj_t = self.adj[day_idx]
-        # print(step, self.day_of_week.size, day_idx)
+        self.adj_indptr_t = self.adj_indptr[
+            get_day_of_week(step, step_start)]
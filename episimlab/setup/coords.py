@@ -4,6 +4,8 @@ import pandas as pd
 import xsimlab as xs
 import xarray as xr
 
+from ..utils.columnar import is_columnar, read_columnar, read_meta
+
 
 @xs.process
 class InitDefaultCoords:
@@ -73,26 +75,39 @@ class InitCoordsExceptVertex:
 
 @xs.process
 class InitCoordsFromTravel(InitDefaultCoords):
-    travel_fp = xs.variable(intent='in')
+    # number of rows to read from `travel_fp` at a time
+    CHUNKSIZE = 10 ** 6
 
-    def load_travel_df(self):
-        tdf = pd.read_csv(self.travel_fp)
-        tdf['date'] = pd.to_datetime(tdf['date'])
-        try:
-            tdf = tdf.rename(columns={'age_src': 'age'})
-        except KeyError:
-            raise
-            # pass
-        return tdf
+    travel_fp = xs.variable(intent='in')
 
     def get_df_coords(self) -> dict:
-        df = self.load_travel_df()
-        age_group = pd.unique(df[['age', 'age_dest']].values.ravel('K'))
-        vertex = pd.unique(df[['source', 'destination']].values.ravel('K'))
-        # breakpoint()
+        """Streams `travel_fp` in chunks, collecting unique ages and vertices
+        in order of first appearance in each column. `travel_fp` may also be
+        a columnar table.
+        """
+        if is_columnar(self.travel_fp):
+            names = [c['name'] for c in read_meta(self.travel_fp)['columns']]
+        else:
+            names = pd.read_csv(self.travel_fp, nrows=0).columns
+        age_col = 'age_src' if 'age_src' in names else 'age'
+        columns = [age_col, 'age_dest', 'source', 'destination']
+        if is_columnar(self.travel_fp):
+            chunks = [read_columnar(self.travel_fp, columns=columns)]
+        else:
+            chunks = pd.read_csv(self.travel_fp, usecols=columns, chunksize=self.CHUNKSIZE)
+
+        uniques = {col: list() for col in columns}
+        for chunk in chunks:
+            for col in columns:
+                uniques[col].append(chunk[col].unique())
+
+        def ordered_unique(*cols):
+            return pd.unique(np.concatenate(
+                [pd.unique(np.concatenate(uniques[col])) for col in cols]))
+
         return dict(
-            age_group=age_group,
-            vertex=vertex
+            age_group=ordered_unique(age_col, 'age_dest'),
+            vertex=ordered_unique('source', 'destination')
         )
 
     def initialize(self):
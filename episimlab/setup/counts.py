@@ -1,10 +1,12 @@
 import logging
+import numpy as np
 import pandas as pd
 import xsimlab as xs
 import xarray as xr
 from .coords import InitDefaultCoords
 
 from ..apply_counts_delta import ApplyCountsDelta
+from ..utils.columnar import read_table
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -49,9 +51,36 @@ class InitDefaultCounts:
         return da
 
 
+@xs.process
+class InitReplicateCounts(InitDefaultCounts):
+    """Initializes the same counts as InitDefaultCounts in each of
+    `n_replicates` replicates, along a leading `replicate` dimension.
+    """
+    n_replicates = xs.variable(static=True, intent='in')
+    replicate = xs.index(dims='replicate', global_name='replicate')
+
+    def initialize(self):
+        super(InitReplicateCounts, self).initialize()
+        self.replicate = np.arange(self.n_replicates)
+        self.counts = self.counts.expand_dims(replicate=self.replicate).copy()
+
+
+@xs.process
+class InitFloat32Counts(InitDefaultCounts):
+    """Initializes the same counts as InitDefaultCounts, in single
+    precision. The Cython FOI, SEIR, and travel engines then run in single
+    precision.
+    """
+
+    def initialize(self):
+        super(InitFloat32Counts, self).initialize()
+        self.counts = self.counts.astype('float32')
+
+
 @xs.process
 class InitCountsFromCensusCSV(InitDefaultCounts):
-    """Initializes counts from a census.gov formatted CSV file.
+    """Initializes counts from a census.gov formatted CSV file, or a
+    columnar table converted from one.
     """
     census_counts_csv = xs.variable(intent='in')
     
@@ -91,7 +120,7 @@ class InitCountsFromCensusCSV(InitDefaultCounts):
         self.counts.loc[dict(compartment='Ia', risk_group='low')] = 50.
 
     def read_census_csv(self) -> xr.DataArray:
-        df = pd.read_csv(self.census_counts_csv)
+        df = read_table(self.census_counts_csv)
         assert not df.isna().any().any(), ('found null values in df', df.isna().any())
         df.rename(columns={'GEOID': 'vertex', 'age_bin': 'age_group'}, inplace=True)
         df.set_index(['vertex', 'age_group'], inplace=True)
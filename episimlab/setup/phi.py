@@ -29,6 +29,17 @@ class InitPhi:
         pass
 
 
+@xs.process
+class InitFloat32Phi(InitPhi):
+    """Like InitPhi, but `phi` and `phi_t` are single precision.
+    """
+
+    def initialize(self):
+        super(InitFloat32Phi, self).initialize()
+        self.phi = self.phi.astype('float32')
+        self.phi_t = self.phi
+
+
 @xs.process
 class InitPartitionedPhi:
     """
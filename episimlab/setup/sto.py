@@ -12,12 +12,22 @@ from ..setup.coords import InitDefaultCoords
 @xs.process
 class InitStochasticFromToggle:
     """Switches on stochasticity after simulation has run `sto_toggle` steps.
+    Stochastic transitions are drawn from Poissons, or from chain binomials
+    if `sto_mode` is 'binomial'.
     """
+    STO_MODES = ('poisson', 'binomial')
+
     sto_toggle = xs.variable(static=True, intent='in')
+    sto_mode = xs.variable(default='poisson', static=True, intent='in')
     stochastic = xs.foreign(BaseSEIR, 'stochastic', intent='out')
+    binomial = xs.foreign(BaseSEIR, 'binomial', intent='out')
 
     def initialize(self):
         """Ensures that stochastic is set during initialization"""
+        if self.sto_mode not in self.STO_MODES:
+            raise ValueError(f"sto_mode must be one of {self.STO_MODES}, " +
+                             f"received {self.sto_mode}")
+        self.binomial = self.sto_mode == 'binomial'
         self.run_step(step=0)
 
     @xs.runtime(args="step")
@@ -2,3 +2,4 @@ from .discrete_time_approx import *
 from .midx import *
 from .datetime import *
 from .variable import *
+from .sparse import *
@@ -0,0 +1,30 @@
+import os
+import importlib
+
+# environment variable that selects a build of the Cython engines
+BUILD_ENV_VAR = 'EPISIMLAB_CYTHON_BUILD'
+CYTHON_BUILDS = ('release', 'checked')
+
+
+def get_cython_build() -> str:
+    """Returns the build of the Cython engines selected by environment
+    variable EPISIMLAB_CYTHON_BUILD: 'release' (the default), which is
+    optimized, or 'checked', which has bounds and None checks.
+    """
+    build = os.environ.get(BUILD_ENV_VAR, 'release')
+    if build not in CYTHON_BUILDS:
+        raise ValueError(f"{BUILD_ENV_VAR} must be one of {CYTHON_BUILDS}, " +
+                         f"received {build}")
+    return build
+
+
+def import_engine(name, package=None, build=None):
+    """Imports Cython engine module `name` if `build` is 'checked', or its
+    optimized build `name` + '_release' if `build` is 'release'. Defaults to
+    the build returned by `get_cython_build`.
+    """
+    if build is None:
+        build = get_cython_build()
+    if build == 'release':
+        name = f"{name}_release"
+    return importlib.import_module(name, package=package)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""Typed columnar format for travel, contacts, and census inputs. A table
+is a directory holding one .npy file per column, which are memory-mapped on
+read, and a JSON metadata file. String columns are stored as integer codes
+into a list of categories, and date columns as datetime64. Convert a CSV
+once with:
+
+    python -m episimlab.utils.columnar travel.csv travel.cols
+"""
+import os
+import json
+import hashlib
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+META = 'meta.json'
+
+
+def is_columnar(fp) -> bool:
+    """Returns True if `fp` is a table written by `write_columnar`."""
+    return os.path.isfile(os.path.join(fp, META))
+
+
+def table_file(fp) -> str:
+    """Returns the file whose modification marks a change to the table at
+    `fp`: the metadata file of a columnar table, or `fp` itself otherwise.
+    """
+    return os.path.join(fp, META) if is_columnar(fp) else fp
+
+
+def write_columnar(df, fp, date_cols=('date', ), sort_by=None, source=None):
+    """Writes DataFrame `df` to a columnar table at directory `fp`. Columns
+    in `date_cols` are parsed as dates, and other non-numeric columns are
+    stored as categorical codes. Rows are stably sorted on column `sort_by`
+    if specified. Metadata is written last, so a partially written table is
+    never read.
+    """
+    df = df.copy()
+    if sort_by is not None:
+        df = df.sort_values(sort_by, kind='stable').reset_index(drop=True)
+    os.makedirs(fp, exist_ok=True)
+    if is_columnar(fp):
+        os.remove(os.path.join(fp, META))
+
+    meta = dict(nrows=len(df), columns=list(), source=source, sort_by=sort_by)
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        fn = f"{i}.npy"
+        if col in date_cols:
+            kind, categories = 'datetime', None
+            arr = pd.to_datetime(values).values.astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            kind, categories = 'numeric', None
+            arr = values.values
+        else:
+            kind = 'category'
+            codes, uniques = pd.factorize(values.astype(str), sort=True)
+            categories = uniques.tolist()
+            arr = codes.astype(np.int32)
+        np.save(os.path.join(fp, fn), arr, allow_pickle=False)
+        meta['columns'].append(dict(name=col, file=fn, kind=kind,
+                                    categories=categories))
+
+    with open(os.path.join(fp, META), 'w') as f:
+        json.dump(meta, f)
+
+
+def read_columnar(fp, columns=None, rows=slice(None)) -> pd.DataFrame:
+    """Reads `columns` (default all) of table at `fp` into a DataFrame,
+    restricted to `rows`, which is a slice or integer array. Only the
+    requested rows are copied out of the memory-mapped column files.
+    """
+    meta = read_meta(fp)
+    by_name = {c['name']: c for c in meta['columns']}
+    if columns is None:
+        columns = list(by_name)
+    missing = [col for col in columns if col not in by_name]
+    if missing:
+        raise ValueError(f"columns {missing} not found in table {fp}")
+
+    data = dict()
+    for col in columns:
+        info = by_name[col]
+        arr = np.load(os.path.join(fp, info['file']), mmap_mode='r')[rows]
+        if info['kind'] == 'category':
+            arr = np.asarray(info['categories'], dtype=object)[arr]
+        data[col] = np.array(arr)
+    return pd.DataFrame(data, columns=columns)
+
+
+def read_meta(fp) -> dict:
+    with open(os.path.join(fp, META), 'r') as f:
+        return json.load(f)
+
+
+def read_table(fp, **kwargs) -> pd.DataFrame:
+    """Reads table at `fp`, which is either a columnar table or a CSV. Keyword
+    arguments are passed to `pd.read_csv`.
+    """
+    if is_columnar(fp):
+        return read_columnar(fp)
+    return pd.read_csv(fp, **kwargs)
+
+
+def convert(csv_fp, out_fp, date_cols=('date', ), sort_by=None):
+    """Converts CSV at `csv_fp` to a columnar table at `out_fp`."""
+    df = pd.read_csv(csv_fp)
+    date_cols = [col for col in date_cols if col in df.columns]
+    if sort_by is None and 'date' in date_cols:
+        sort_by = 'date'
+    with open(csv_fp, 'rb') as f:
+        source = hashlib.sha256(f.read()).hexdigest()
+    logging.info(f"Writing {len(df)} rows from {csv_fp} to {out_fp}")
+    write_columnar(df, out_fp, date_cols=date_cols, sort_by=sort_by,
+                   source=source)
+
+
+def get_opts() -> dict:
+    """Get options from command line"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_fp', type=str, help='path to input CSV file')
+    parser.add_argument('out_fp', type=str, help='path to output table directory')
+    parser.add_argument('--date-cols', type=str, nargs='*', default=['date'],
+                        help='columns to store as dates')
+    parser.add_argument('--sort-by', type=str, default=None, required=False,
+                        help='column on which to sort rows. Defaults to date, if present')
+    return vars(parser.parse_args())
+
+
+if __name__ == '__main__':
+    convert(**get_opts())
@@ -17,3 +17,12 @@ def get_int_per_day(step_delta) -> float:
     assert isinstance(step_delta, np.timedelta64), \
         f"`step_delta` is not datetime64: {step_delta} type is {type(step_delta)}"
     return np.timedelta64(1, 'D') / step_delta
+
+
+def get_day_of_week(step, step_start) -> int:
+    """Day of week of `step_start` if it is a datetime64, where Monday == 0.
+    Otherwise, assumes that steps are daily and step 0 is a Monday.
+    """
+    if isinstance(step_start, np.datetime64):
+        return dt64_to_day_of_week(step_start)
+    return step % 7
@@ -64,3 +64,25 @@ def unravel_encoded_midx(midx, dims, coords):
     indices = np.unravel_index(midx, shape)
     arrays = [c[dim][index] for dim, index in zip(dims, indices)]
     return pd.MultiIndex.from_arrays(arrays)
+
+
+def scatter_to_array(df, columns, coords, value_col) -> np.ndarray:
+    """Returns array with one axis for each of `columns`, where each axis
+    is labeled by the corresponding list in `coords`. Values in column
+    `value_col` of DataFrame `df` are scattered into the array in a single
+    pass, by mapping labels in `columns` to integer positions. Cells
+    without a matching row are zero, and rows with labels missing from
+    `coords` are ignored. Raises ValueError if a cell matches multiple rows.
+    """
+    assert len(columns) == len(coords)
+    shape = [len(c) for c in coords]
+    positions = [pd.Index(c).get_indexer(df[col])
+                 for col, c in zip(columns, coords)]
+    found = np.logical_and.reduce([pos >= 0 for pos in positions])
+    flat = np.ravel_multi_index([pos[found] for pos in positions], shape)
+    if np.unique(flat).size != flat.size:
+        raise ValueError(f"multiple rows in `df` map to the same cell")
+
+    arr = np.zeros(shape)
+    arr.flat[flat] = df[value_col].values[found]
+    return arr
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import bsr_matrix
+
+
+def get_pair_index(labels, vertex) -> np.ndarray:
+    """Returns integer position of each of `labels` on coordinate `vertex`.
+    Raises KeyError if any label is missing from `vertex`.
+    """
+    idx = pd.Index(vertex).get_indexer(labels)
+    if (idx < 0).any():
+        missing = np.asarray(labels)[idx < 0]
+        raise KeyError(f"vertex labels {missing} not found in coords {vertex}")
+    return idx
+
+
+def pairs_to_bsr(data, row, col, n) -> bsr_matrix:
+    """Given dense blocks `data` with shape (pair, block_row, block_col),
+    stored at block coordinates `row` and `col`, returns a block sparse row
+    (BSR) matrix with shape (n * block_row, n * block_col). Each pair of block
+    coordinates is expected to be unique.
+    """
+    row = np.asarray(row)
+    col = np.asarray(col)
+    order = np.lexsort((col, row))
+    if not (order == np.arange(order.size)).all():
+        data, row, col = data[order], row[order], col[order]
+    indptr = np.zeros(n + 1, dtype=np.intc)
+    np.cumsum(np.bincount(row, minlength=n), out=indptr[1:])
+    shape = (n * data.shape[1], n * data.shape[2])
+    return bsr_matrix((data, col.astype(np.intc), indptr), shape=shape)
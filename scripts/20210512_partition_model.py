@@ -25,7 +25,9 @@ def partition_from_csv():
         'travel_fp': 'data/20200311_travel.csv',
         'contacts_fp': 'data/polymod_contacts.csv',
         'census_counts_csv': 'data/2019_zcta_pop_5_age_groups.csv',
-        'beta': 1.
+        'beta': 1.,
+        'precompute': False,
+        'cache_dir': None,
     }
     # Reindex with `process__variable` keys
     input_vars_with_proc = dict()
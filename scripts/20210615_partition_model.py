@@ -130,6 +130,10 @@ def get_opts() -> dict:
                         help='global transmission parameter') 
     parser.add_argument('--initial-ia', type=float, default=50., required=False,
                         help='initial size of the Ia compartment (low risk only)') 
+    parser.add_argument('--precompute', action='store_true', required=False,
+                        help='partition the travel dates in every step once during initialize')
+    parser.add_argument('--cache-dir', type=str, default=None, required=False,
+                        help='directory in which to cache partitioned contacts across runs')
     parser.add_argument('--start-date', type=str, default='3/11/2020', required=False,
                         help='starting date for the simulation, in string format of pandas.date_range') 
     parser.add_argument('--end-date', type=str, default='3/13/2020', required=False,
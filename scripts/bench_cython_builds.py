@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Benchmarks the checked and release builds of the Cython FOI, SEIR, and
+travel engines, on synthetic counts with every compartment populated.
+
+Usage: python scripts/bench_cython_builds.py --nodes 10 50 100 --repeats 5
+"""
+import argparse
+import time
+import numpy as np
+from episimlab.utils.build import CYTHON_BUILDS, import_engine
+
+
+def synthetic_inputs(n_nodes, n_ages=5, n_risks=2, n_compts=16, seed=0) -> dict:
+    rng = np.random.default_rng(seed)
+    return dict(
+        counts=rng.uniform(0., 1000., size=(n_nodes, n_ages, n_risks, n_compts)),
+        phi_t=rng.uniform(0., 1., size=(n_nodes, n_nodes, n_ages, n_ages,
+                                        n_risks, n_risks)),
+        adj_t=rng.uniform(0., 1e-3, size=(n_nodes, n_nodes, n_ages, n_risks,
+                                          n_compts)),
+        omega=rng.uniform(0., 1., size=(n_ages, n_compts)),
+        rho=rng.uniform(0., 1., size=n_compts),
+        gamma=rng.uniform(0., 1., size=n_compts),
+        pi=rng.uniform(0., 1., size=(n_risks, n_ages)),
+        nu=rng.uniform(0., 1., size=n_ages),
+    )
+
+
+def get_benchmarks(build, inputs) -> dict:
+    """Returns a function that calls each engine in `build` on `inputs`,
+    keyed by name.
+    """
+    foi_engine = import_engine('episimlab.foi.bf_cython_engine', build=build)
+    seir_engine = import_engine('episimlab.seir.bf_cython_engine', build=build)
+    travel_engine = import_engine(
+        'episimlab.network.cython_explicit_travel_engine', build=build)
+    foi = foi_engine.brute_force_FOI(
+        inputs['counts'], inputs['phi_t'], inputs['omega'], 0.3)
+    seir_kwargs = dict(
+        counts=inputs['counts'], foi=foi, rho=inputs['rho'],
+        gamma=inputs['gamma'], pi=inputs['pi'], nu=inputs['nu'], mu=0.1,
+        sigma=0.3, eta=0.1, tau=0.6, int_per_day=2., int_seed=0)
+    return {
+        'brute_force_FOI': lambda: foi_engine.brute_force_FOI(
+            inputs['counts'], inputs['phi_t'], inputs['omega'], 0.3),
+        'brute_force_SEIR': lambda: seir_engine.brute_force_SEIR(
+            stochastic=1, **seir_kwargs),
+        'graph_high_gran': lambda: travel_engine.graph_high_gran(
+            inputs['counts'], inputs['adj_t'], 1, 0),
+    }
+
+
+def best_time(func, repeats) -> float:
+    times = list()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'engine':<18}{'nodes':>8}" +
+          ''.join(f"{build + ' (s)':>15}" for build in CYTHON_BUILDS) +
+          f"{'speedup':>10}")
+    for n_nodes in args.nodes:
+        inputs = synthetic_inputs(n_nodes)
+        benches = {build: get_benchmarks(build, inputs)
+                   for build in CYTHON_BUILDS}
+        for name in benches[CYTHON_BUILDS[0]]:
+            times = [best_time(benches[build][name], args.repeats)
+                     for build in CYTHON_BUILDS]
+            speedup = times[CYTHON_BUILDS.index('checked')] / \
+                times[CYTHON_BUILDS.index('release')]
+            print(f"{name:<18}{n_nodes:>8}" +
+                  ''.join(f"{t:>15.5f}" for t in times) + f"{speedup:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Benchmarks vectorized `probabilistic_partition` against the legacy loop
+in `episimlab.partition.implicit_node`, on synthetic travel tables.
+
+Usage: python scripts/bench_probabilistic_partition.py --rows 1e3 1e4 1e5 1e6
+"""
+import argparse
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from episimlab.partition.implicit_node import (
+    probabilistic_partition, probabilistic_partition_legacy
+)
+
+
+def synthetic_travel(n_rows, n_ages=5, sources_per_context=10, seed=0) -> pd.DataFrame:
+    """Returns travel table with roughly `n_rows` rows. Each source has a
+    local row for each age pair, and visits one contextual destination,
+    which is shared with `sources_per_context` - 1 other sources.
+    """
+    rng = np.random.default_rng(seed)
+    ages = [f"age{a}" for a in range(n_ages)]
+    age_pairs = list(itertools.product(ages, ages))
+    n_sources = max(int(n_rows) // (2 * len(age_pairs)), sources_per_context)
+    sources = np.array([f"s{i}" for i in range(n_sources)])
+    contexts = np.array([f"c{i // sources_per_context}" for i in range(n_sources)])
+
+    age_src, age_dest = (np.array(a) for a in zip(*age_pairs))
+    n_pairs = len(age_pairs)
+    local = pd.DataFrame({
+        'source': np.repeat(sources, n_pairs),
+        'destination': np.repeat(sources, n_pairs),
+        'destination_type': 'local',
+        'age_src': np.tile(age_src, n_sources),
+        'age_dest': np.tile(age_dest, n_sources),
+    })
+    contextual = pd.DataFrame({
+        'source': np.repeat(sources, n_pairs),
+        'destination': np.repeat(contexts, n_pairs),
+        'destination_type': 'contextual',
+        'age_src': np.tile(age_src, n_sources),
+        'age_dest': np.tile(age_dest, n_sources),
+    })
+    travel = pd.concat([local, contextual], ignore_index=True)
+    travel['n'] = rng.integers(0, 1000, size=len(travel))
+    return travel
+
+
+def bench(func, travel, repeats) -> float:
+    """Returns best wall time of `repeats` calls, in seconds"""
+    times = list()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(travel, daily_timesteps=10)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(rows, legacy_max_rows, repeats):
+    print(f"{'rows':>10} {'vectorized (s)':>15} {'legacy (s)':>12} {'speedup':>8}")
+    for n_rows in rows:
+        travel = synthetic_travel(n_rows)
+        vec = bench(probabilistic_partition, travel, repeats)
+        if len(travel) <= legacy_max_rows:
+            legacy = bench(probabilistic_partition_legacy, travel, 1)
+            print(f"{len(travel):>10} {vec:>15.4f} {legacy:>12.4f} {legacy / vec:>8.1f}")
+        else:
+            print(f"{len(travel):>10} {vec:>15.4f} {'skipped':>12} {'-':>8}")
+
+
+def get_opts() -> dict:
+    """Get options from command line"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=float, nargs='+', default=[1e3, 1e4, 1e5, 1e6],
+                        help='approximate number of rows in each synthetic travel table')
+    parser.add_argument('--legacy-max-rows', type=float, default=1e3,
+                        help='skip legacy loop, which is quadratic in rows, for tables larger than this')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='number of timed calls to the vectorized implementation')
+    return vars(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main(**get_opts())
@@ -75,17 +75,19 @@ extensions = [
     Extension('episimlab.cy_utils.cy_utils',
               sources=[f"episimlab/cy_utils/cy_utils{src_ext}"],
               **gsl_lib),
-    Extension('episimlab.network.cython_explicit_travel_engine',
-              sources=[f"episimlab/network/cython_explicit_travel_engine{src_ext}"],
-              **gsl_lib),
-    Extension('episimlab.seir.bf_cython_engine',
-              sources=[f"episimlab/seir/bf_cython_engine{src_ext}"],
-              **gsl_lib),
-    Extension('episimlab.foi.bf_cython_engine',
-              sources=[f"episimlab/foi/bf_cython_engine.pyx"],
-              **gsl_lib)
-
 ]
+# engines are built twice from the same *.pxi source: a checked build with
+# bounds checks, and an optimized `*_release` build without. See
+# `episimlab.utils.build` for selecting between them at runtime.
+engines = [
+    'episimlab.network.cython_explicit_travel_engine',
+    'episimlab.seir.bf_cython_engine',
+    'episimlab.foi.bf_cython_engine',
+]
+for engine in engines:
+    for name in (engine, f"{engine}_release"):
+        extensions.append(Extension(
+            name, sources=[f"{name.replace('.', '/')}{src_ext}"], **gsl_lib))
 
 # Cythonize extensions
 if USE_CYTHON is True:
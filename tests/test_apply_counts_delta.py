@@ -17,3 +17,41 @@ class TestApplyCountsDelta:
         proc.finalize_step()
         result = proc.counts
         assert isinstance(result, xr.DataArray)
+
+    def get_proc(self, counts, deltas, **kwargs):
+        return ApplyCountsDelta(counts=counts.copy(), counts_delta=deltas,
+                                **kwargs)
+
+    def test_same_as_xarray(self, counts_basic):
+        rng = np.random.default_rng(seed=0)
+        deltas = [counts_basic.copy(data=rng.normal(size=counts_basic.shape))
+                  for _ in range(3)]
+        # a delta on a subset of compartments, in another order
+        deltas.append(deltas[0].loc[dict(compartment=['R', 'S'])])
+        deltas[1][0, 0, 0, 0] = np.nan
+        proc = self.get_proc(counts_basic, deltas)
+        proc.finalize_step()
+        expected = counts_basic + xr.concat(deltas, dim='_delta').sum(
+            dim='_delta')
+        xr.testing.assert_allclose(proc.counts, expected)
+        assert not proc.counts.isnull().any()
+
+    def test_reuses_buffer(self, counts_basic):
+        proc = self.get_proc(counts_basic, [counts_basic] * 2)
+        first = proc.aggregate_delta(proc.counts_delta)
+        second = proc.aggregate_delta(proc.counts_delta)
+        assert first is second
+        np.testing.assert_array_equal(second, 2 * counts_basic.values)
+
+    def test_validate_coords(self, counts_basic):
+        reordered = counts_basic.copy()
+        reordered['compartment'] = counts_basic['compartment'].values[::-1]
+        self.get_proc(counts_basic, [reordered]).finalize_step()
+        with pytest.raises(ValueError):
+            self.get_proc(counts_basic, [reordered],
+                          validate_coords=True).finalize_step()
+
+    def test_no_deltas(self, counts_basic):
+        proc = self.get_proc(counts_basic, [])
+        proc.finalize_step()
+        xr.testing.assert_equal(proc.counts, counts_basic)
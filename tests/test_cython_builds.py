@@ -0,0 +1,76 @@
+import pytest
+import logging
+import numpy as np
+from episimlab.utils.build import (
+    BUILD_ENV_VAR, CYTHON_BUILDS, get_cython_build, import_engine
+)
+
+
+@pytest.fixture
+def engines():
+    """Checked and release builds of each Cython engine."""
+    names = ('episimlab.foi.bf_cython_engine',
+             'episimlab.seir.bf_cython_engine',
+             'episimlab.network.cython_explicit_travel_engine')
+    return {build: [import_engine(name, build=build) for name in names]
+            for build in CYTHON_BUILDS}
+
+
+@pytest.fixture
+def arrays():
+    rng = np.random.default_rng(seed=12345)
+    counts = rng.uniform(0., 1000., size=(4, 5, 2, 16))
+    # no one infectious in some cells
+    counts[0, :, :, 1:7] = 0.
+    return dict(
+        counts=counts,
+        phi_t=rng.uniform(0., 1., size=(4, 4, 5, 5, 2, 2)),
+        adj_t=rng.uniform(0., 1e-2, size=(4, 4, 5, 2, 16)),
+        omega=rng.uniform(0., 1., size=(5, 16)),
+        rho=rng.uniform(0., 1., size=16),
+        gamma=rng.uniform(0., 1., size=16),
+        pi=rng.uniform(0., 1., size=(2, 5)),
+        nu=rng.uniform(0., 1., size=5),
+    )
+
+
+class TestCythonBuilds:
+
+    def test_get_cython_build(self, monkeypatch):
+        monkeypatch.delenv(BUILD_ENV_VAR, raising=False)
+        assert get_cython_build() == 'release'
+        monkeypatch.setenv(BUILD_ENV_VAR, 'checked')
+        assert get_cython_build() == 'checked'
+        monkeypatch.setenv(BUILD_ENV_VAR, 'fast')
+        with pytest.raises(ValueError):
+            get_cython_build()
+
+    def test_import_engine(self):
+        checked = import_engine('.bf_cython_engine', package='episimlab.seir',
+                                build='checked')
+        release = import_engine('.bf_cython_engine', package='episimlab.seir',
+                                build='release')
+        assert checked.__name__ == 'episimlab.seir.bf_cython_engine'
+        assert release.__name__ == 'episimlab.seir.bf_cython_engine_release'
+
+    @pytest.mark.parametrize('stochastic', [0, 1])
+    @pytest.mark.parametrize('dtype', ['float64', 'float32'])
+    def test_same_results(self, engines, arrays, stochastic, dtype):
+        """Release and checked builds return identical results."""
+        counts = arrays['counts'].astype(dtype)
+        results = dict()
+        for build, (foi_engine, seir_engine, travel_engine) in engines.items():
+            foi = foi_engine.brute_force_FOI(
+                counts, arrays['phi_t'], arrays['omega'], 0.3)
+            seir = seir_engine.brute_force_SEIR(
+                counts=counts, foi=foi, rho=arrays['rho'],
+                gamma=arrays['gamma'], pi=arrays['pi'], nu=arrays['nu'],
+                mu=0.1, sigma=0.3, eta=0.1, tau=0.6, int_per_day=2.,
+                stochastic=stochastic, int_seed=42)
+            travel = travel_engine.graph_high_gran(
+                counts, arrays['adj_t'], stochastic, 42)
+            results[build] = (foi, seir, travel)
+
+        for checked, release in zip(results['checked'], results['release']):
+            assert checked.dtype == release.dtype
+            np.testing.assert_array_equal(checked, release)
@@ -0,0 +1,71 @@
+import pytest
+import logging
+import xarray as xr
+import xsimlab as xs
+import numpy as np
+from episimlab.extinction import DetectExtinction, fast_forward_extinct
+from episimlab.models import basic
+
+
+class TestDetectExtinction:
+
+    @pytest.mark.parametrize('infected, threshold, expected', [
+        (0., 0., True),
+        (1., 0., False),
+        (1., 5., True),
+    ])
+    def test_is_extinct(self, counts_basic, infected, threshold, expected):
+        counts = counts_basic.copy()
+        counts.loc[dict(compartment=list(DetectExtinction.INFECTED))] = 0.
+        first = {dim: counts.coords[dim][0]
+                 for dim in ('vertex', 'age_group', 'risk_group')}
+        counts.loc[dict(first, compartment='Iy')] = infected
+        proc = DetectExtinction(counts=counts, threshold=threshold)
+        proc.run_step()
+        assert proc.extinct is expected
+
+    def test_any_replicate_active(self, counts_basic):
+        counts = counts_basic.expand_dims(replicate=np.arange(2)).copy()
+        counts.loc[dict(compartment=list(DetectExtinction.INFECTED))] = 0.
+        counts.loc[dict(replicate=1, compartment='E')] = 1.
+        proc = DetectExtinction(counts=counts)
+        proc.run_step()
+        assert proc.extinct is False
+
+
+class TestFastForwardExtinct:
+
+    def run_model(self, model, step_clock, input_vars, hooks):
+        out_var_key = 'apply_counts_delta__counts'
+        in_ds = xs.create_setup(
+            model=model,
+            clocks=step_clock,
+            input_vars=input_vars,
+            output_vars={out_var_key: 'step'}
+        )
+        return in_ds.xsimlab.run(
+            model=model, hooks=hooks,
+            decoding=dict(mask_and_scale=False))[out_var_key]
+
+    @pytest.mark.parametrize('threshold', [0., 1e12])
+    def test_fast_forward(self, step_clock, config_fp, config_dict, threshold):
+        """Once extinct, counts are carried forward unchanged. Otherwise, the
+        hook has no effect.
+        """
+        cfg = config_fp(config_dict)
+        model = basic.cy_seir_cy_foi()
+        input_vars = dict(
+            read_config__config_fp=cfg,
+            setup_coords__config_fp=cfg,
+            detect_extinction__threshold=threshold
+        )
+        result = self.run_model(model, step_clock, input_vars,
+                                hooks=[fast_forward_extinct])
+        assert result.sizes['step'] == len(step_clock['step'])
+
+        if threshold > 0:
+            initial = result[dict(step=0)]
+            assert (result == initial).all()
+        else:
+            expected = self.run_model(model, step_clock, input_vars, hooks=[])
+            xr.testing.assert_identical(result, expected)
@@ -1,7 +1,8 @@
 import pytest
 import logging
+import numpy as np
 import xarray as xr
-from episimlab.foi.bf_cython import BruteForceCythonFOI
+from episimlab.foi.bf_cython import BruteForceCythonFOI, BatchedCythonFOI
 from episimlab.foi.brute_force import BruteForceFOI
 
 
@@ -57,3 +58,94 @@ class TestBruteForceCythonFOI:
         assert cy_result.sum() >= 1e-8
         # assert equality
         xr.testing.assert_allclose(cy_result, py_result)
+
+    def test_float32(self, beta, omega, counts_basic, phi_t):
+        """Single precision counts and phi give single precision FOI, close
+        to the double precision result.
+        """
+        inputs = {
+            'age_group': counts_basic.coords['age_group'],
+            'risk_group': counts_basic.coords['risk_group'],
+            'vertex': counts_basic.coords['vertex'],
+            'beta': beta,
+            'omega': omega,
+            'counts': counts_basic,
+            'phi_t': phi_t,
+        }
+        proc64 = BruteForceCythonFOI(**inputs)
+        proc64.run_step()
+        proc32 = BruteForceCythonFOI(**dict(
+            inputs, counts=counts_basic.astype('float32'),
+            phi_t=phi_t.astype('float32')))
+        proc32.run_step()
+
+        assert proc32.foi.dtype == np.float32
+        xr.testing.assert_allclose(proc32.foi.astype('float64'), proc64.foi,
+                                   rtol=1e-5)
+
+    def test_few_infected(self, beta, omega, counts_basic, phi_t):
+        """Same as the Python implementation when most cells have no one
+        infectious or susceptible, so are skipped.
+        """
+        counts = counts_basic.copy()
+        infectious = dict(compartment=['E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih'])
+        counts.loc[infectious] = 0.
+        first = {dim: counts.coords[dim][0]
+                 for dim in ('vertex', 'age_group', 'risk_group')}
+        counts.loc[dict(first, compartment='Iy')] = 5.
+        last = dict(vertex=counts.coords['vertex'][-1])
+        counts.loc[dict(last, compartment='S')] = 0.
+        inputs = {
+            'age_group': counts_basic.coords['age_group'],
+            'risk_group': counts_basic.coords['risk_group'],
+            'vertex': counts_basic.coords['vertex'],
+            'beta': beta,
+            'omega': omega,
+            'counts': counts,
+            'phi_t': phi_t,
+        }
+        cy_proc = BruteForceCythonFOI(**inputs)
+        cy_proc.run_step()
+        py_proc = BruteForceFOI(**inputs)
+        py_proc.run_step()
+
+        assert cy_proc.foi.sum() >= 1e-8
+        assert (cy_proc.foi.loc[last] == 0).all()
+        xr.testing.assert_allclose(cy_proc.foi, py_proc.foi)
+
+
+class TestBatchedCythonFOI:
+
+    @pytest.mark.parametrize('per_replicate_beta', [False, True])
+    def test_same_as_unbatched(self, beta, omega, counts_basic, phi_t,
+                               per_replicate_beta):
+        """Each replicate has the same FOI as BruteForceCythonFOI."""
+        replicate = np.arange(3)
+        rng = np.random.default_rng(seed=12345)
+        counts = counts_basic.expand_dims(replicate=replicate).copy()
+        counts.values = rng.uniform(0., 100., size=counts.shape)
+        betas = beta * np.arange(1, 4) if per_replicate_beta else beta
+        inputs = {
+            'age_group': counts_basic.coords['age_group'],
+            'risk_group': counts_basic.coords['risk_group'],
+            'vertex': counts_basic.coords['vertex'],
+            'replicate': replicate,
+            'beta': betas,
+            'omega': omega,
+            'counts': counts,
+            'phi_t': phi_t,
+        }
+        proc = BatchedCythonFOI(**inputs)
+        proc.run_step()
+        result = proc.foi
+        assert result.dims == BatchedCythonFOI.FOI_DIMS
+
+        for k in replicate:
+            bf_proc = BruteForceCythonFOI(**{
+                **{key: val for key, val in inputs.items() if key != 'replicate'},
+                'counts': counts.isel(replicate=k, drop=True),
+                'beta': np.broadcast_to(betas, replicate.shape)[k]
+            })
+            bf_proc.run_step()
+            xr.testing.assert_allclose(result.isel(replicate=k, drop=True),
+                                       bf_proc.foi)
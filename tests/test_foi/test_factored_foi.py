@@ -0,0 +1,78 @@
+import pytest
+import logging
+import numpy as np
+import xarray as xr
+from episimlab.foi.factorized import FactoredFOI
+from episimlab.foi.bf_cython import FactoredCythonFOI
+from episimlab.foi.brute_force import BruteForceFOI
+
+
+@pytest.fixture
+def contact_xr(counts_coords):
+    dims = ('vertex1', 'vertex2', 'age_group1', 'age_group2')
+    coords = {k: counts_coords[k[:-1]] for k in dims}
+    rng = np.random.default_rng(seed=12345)
+    return xr.DataArray(
+        data=rng.uniform(0., 1., size=[len(v) for v in coords.values()]),
+        dims=dims,
+        coords=coords
+    )
+
+
+@pytest.fixture
+def phi_risk(counts_coords):
+    dims = ('risk_group1', 'risk_group2')
+    return xr.DataArray(
+        data=[[1., 0.5], [2., 3.]],
+        dims=dims,
+        coords={k: counts_coords['risk_group'] for k in dims}
+    )
+
+
+@pytest.fixture
+def inputs(beta, omega, counts_basic, contact_xr, phi_risk):
+    return {
+        'age_group': counts_basic.coords['age_group'],
+        'risk_group': counts_basic.coords['risk_group'],
+        'vertex': counts_basic.coords['vertex'],
+        'beta': beta,
+        'omega': omega,
+        'counts': counts_basic,
+        'phi_t': contact_xr,
+        'phi_risk': phi_risk,
+    }
+
+
+class TestFactoredFOI:
+
+    @pytest.mark.parametrize('foi_cls', [FactoredFOI, FactoredCythonFOI])
+    def test_can_run_step(self, inputs, foi_cls):
+        proc = foi_cls(**inputs)
+        proc.run_step()
+        result = proc.foi
+
+        # assert that FOI is non zero
+        assert result.sum() >= 1e-8
+        assert isinstance(result, xr.DataArray)
+
+    # NOTE: the Cython engine casts beta to single precision, so it is only
+    # expected to match to the default tolerance
+    @pytest.mark.parametrize('foi_cls, tol', [
+        (FactoredFOI, dict(rtol=1e-10, atol=1e-10)),
+        (FactoredCythonFOI, dict()),
+    ])
+    def test_same_as_brute_force(self, inputs, foi_cls, tol):
+        proc = foi_cls(**inputs)
+        proc.run_step()
+        result = proc.foi
+
+        # brute force FOI with the full phi array
+        bf_inputs = inputs.copy()
+        del bf_inputs['phi_risk']
+        bf_inputs['phi_t'] = inputs['phi_t'] * inputs['phi_risk']
+        bf_proc = BruteForceFOI(**bf_inputs)
+        bf_proc.run_step()
+        expected = bf_proc.foi
+
+        assert result.sum() >= 1e-8
+        xr.testing.assert_allclose(result, expected, **tol)
@@ -0,0 +1,76 @@
+import pytest
+import logging
+import numpy as np
+import xarray as xr
+from episimlab.foi.factorized import FactorizedFOI, GROUPED_PHI_DIMS
+from episimlab.foi.bf_cython import BruteForceCythonFOI
+from episimlab.foi.brute_force import BruteForceFOI
+
+
+@pytest.fixture
+def inputs(beta, omega, counts_basic, phi_t):
+    return {
+        'age_group': counts_basic.coords['age_group'],
+        'risk_group': counts_basic.coords['risk_group'],
+        'vertex': counts_basic.coords['vertex'],
+        'beta': beta,
+        'omega': omega,
+        'counts': counts_basic,
+        'phi_t': phi_t,
+    }
+
+
+class TestFactorizedFOI:
+
+    def test_can_run_step(self, inputs):
+        proc = FactorizedFOI(**inputs)
+        proc.run_step()
+        result = proc.foi
+
+        # assert that FOI is non zero
+        assert result.sum() >= 1e-8
+        assert isinstance(result, xr.DataArray)
+
+    # NOTE: the Cython engine casts beta to single precision, so it is only
+    # expected to match to the default tolerance
+    @pytest.mark.parametrize('foi_cls, tol', [
+        (BruteForceFOI, dict(rtol=1e-10, atol=1e-10)),
+        (BruteForceCythonFOI, dict()),
+    ])
+    @pytest.mark.parametrize('randomize', [False, True])
+    def test_same_as_brute_force(self, inputs, foi_cls, tol, randomize):
+        if randomize is True:
+            rng = np.random.default_rng(seed=12345)
+            for k in ('counts', 'phi_t'):
+                da = inputs[k].copy()
+                da.values = rng.uniform(0., 100., size=da.shape)
+                inputs[k] = da
+
+        proc = FactorizedFOI(**inputs)
+        proc.run_step()
+        result = proc.foi
+
+        bf_proc = foi_cls(**inputs)
+        bf_proc.run_step()
+        expected = bf_proc.foi
+
+        assert result.sum() >= 1e-8
+        xr.testing.assert_allclose(result, expected, **tol)
+
+    def test_phi_not_copied(self, inputs):
+        """`phi_t` is copied into grouped order once, and not at all if it is
+        already in that order.
+        """
+        proc = FactorizedFOI(**inputs)
+        proc.run_step()
+        expected = proc.foi
+        phi_2d = proc.get_phi_2d()
+        proc.run_step()
+        assert proc.get_phi_2d() is phi_2d
+
+        grouped = inputs['phi_t'].transpose(*GROUPED_PHI_DIMS)
+        grouped = grouped.copy(data=np.ascontiguousarray(grouped.values))
+        proc = FactorizedFOI(**dict(inputs, phi_t=grouped))
+        proc.run_step()
+        assert np.shares_memory(proc.get_phi_2d(), grouped.values)
+        xr.testing.assert_allclose(proc.foi, expected)
@@ -0,0 +1,98 @@
+import pytest
+import logging
+import numpy as np
+import xarray as xr
+from episimlab.foi.factorized import FactoredFOI
+from episimlab.foi.sparse import SparseFOI
+
+
+@pytest.fixture
+def contact_xr(counts_coords):
+    """Dense contacts where vertex 2 has no contact with vertex 0"""
+    dims = ('vertex1', 'vertex2', 'age_group1', 'age_group2')
+    coords = {k: counts_coords[k[:-1]] for k in dims}
+    rng = np.random.default_rng(seed=12345)
+    da = xr.DataArray(
+        data=rng.uniform(0., 1., size=[len(v) for v in coords.values()]),
+        dims=dims,
+        coords=coords
+    )
+    da.loc[dict(vertex1=0, vertex2=2)] = 0.
+    da.loc[dict(vertex1=2, vertex2=0)] = 0.
+    return da
+
+
+@pytest.fixture
+def phi_risk(counts_coords):
+    dims = ('risk_group1', 'risk_group2')
+    return xr.DataArray(
+        data=[[1., 0.5], [2., 3.]],
+        dims=dims,
+        coords={k: counts_coords['risk_group'] for k in dims}
+    )
+
+
+@pytest.fixture
+def inputs(beta, omega, counts_basic, phi_risk):
+    return {
+        'age_group': counts_basic.coords['age_group'],
+        'risk_group': counts_basic.coords['risk_group'],
+        'vertex': counts_basic.coords['vertex'],
+        'beta': beta,
+        'omega': omega,
+        'counts': counts_basic,
+        'phi_risk': phi_risk,
+    }
+
+
+def to_sparse_phi(contact_xr) -> xr.DataArray:
+    """Stacks vertex1 and vertex2 of a dense contact array, dropping vertex
+    pairs that have no contacts.
+    """
+    da = (contact_xr
+          .stack(vertex_pair=('vertex1', 'vertex2'))
+          .reset_index('vertex_pair')
+          .transpose('vertex_pair', ...))
+    nonzero = (da != 0).any(dim=[d for d in da.dims if d != 'vertex_pair'])
+    return da[dict(vertex_pair=nonzero.values)]
+
+
+class TestSparseFOI:
+
+    def test_can_run_step(self, inputs, contact_xr):
+        proc = SparseFOI(phi_t=to_sparse_phi(contact_xr), **inputs)
+        proc.run_step()
+        result = proc.foi
+
+        # assert that FOI is non zero
+        assert result.sum() >= 1e-8
+        assert isinstance(result, xr.DataArray)
+
+    def test_same_as_dense(self, inputs, contact_xr):
+        sparse_phi_t = to_sparse_phi(contact_xr)
+        assert sparse_phi_t.sizes['vertex_pair'] == 7
+
+        proc = SparseFOI(phi_t=sparse_phi_t, **inputs)
+        proc.run_step()
+        result = proc.foi
+
+        dense_proc = FactoredFOI(phi_t=contact_xr, **inputs)
+        dense_proc.run_step()
+        expected = dense_proc.foi
+
+        assert result.sum() >= 1e-8
+        xr.testing.assert_allclose(result, expected, rtol=1e-10, atol=1e-10)
+
+    def test_reuses_bsr(self, inputs, contact_xr):
+        """Block sparse matrix is only rebuilt when phi_t is replaced"""
+        proc = SparseFOI(phi_t=to_sparse_phi(contact_xr), **inputs)
+        proc.run_step()
+        phi_bsr = proc.get_phi_bsr()
+        proc.run_step()
+        assert proc.get_phi_bsr() is phi_bsr
+
+        proc.phi_t = to_sparse_phi(contact_xr * 2.)
+        proc.run_step()
+        assert proc.get_phi_bsr() is not phi_bsr
+        np.testing.assert_allclose(proc.get_phi_bsr().toarray(),
+                                   2. * phi_bsr.toarray())
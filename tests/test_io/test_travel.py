@@ -0,0 +1,118 @@
+import pytest
+import numpy as np
+import pandas as pd
+from episimlab.io.travel import (
+    TravelCSVIndex, ColumnarTravelIndex, get_travel_index, _load_index,
+    INDEX_CACHE_SIZE
+)
+from episimlab.utils.columnar import convert
+
+
+@pytest.fixture
+def travel_fp(tmp_path):
+    """Travel CSV with dates in non-contiguous blocks"""
+    rng = np.random.default_rng(seed=0)
+    dates = ['2020-03-11', '2020-03-12', '2020-03-13']
+    df = pd.DataFrame(dict(
+        date=rng.choice(dates, size=50),
+        source=rng.choice(['A', 'B'], size=50),
+        destination=rng.choice(['A', 'B', 'school'], size=50),
+        age=rng.choice(['young', 'old'], size=50),
+        n=rng.integers(0, 100, size=50),
+    ))
+    fp = tmp_path / 'travel.csv'
+    df.to_csv(fp)
+    return str(fp)
+
+
+class TestTravelCSVIndex:
+
+    def test_dates(self, travel_fp):
+        idx = TravelCSVIndex(travel_fp)
+        expected = pd.to_datetime(pd.read_csv(travel_fp)['date']).unique()
+        np.testing.assert_array_equal(idx.dates.values, np.sort(expected))
+
+    @pytest.mark.parametrize('dates', [
+        ['2020-03-11'],
+        ['2020-03-12', '2020-03-13'],
+        None,
+    ])
+    def test_read(self, travel_fp, dates):
+        result = TravelCSVIndex(travel_fp).read(dates)
+        expected = pd.read_csv(travel_fp)
+        if dates is not None:
+            expected = expected[expected['date'].isin(dates)]
+        pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+    @pytest.mark.parametrize('chunk_bytes', [1, 64, 2 ** 24])
+    def test_chunks(self, travel_fp, tmp_path, monkeypatch, chunk_bytes):
+        """Index is the same for any chunk size, and skips blank lines"""
+        expected = TravelCSVIndex(travel_fp)
+        with open(travel_fp, 'r') as f:
+            lines = f.readlines()
+        blank_fp = tmp_path / 'blank.csv'
+        blank_fp.write_text(''.join(lines[:10] + ['\n'] + lines[10:] + ['\n']))
+
+        monkeypatch.setattr(TravelCSVIndex, 'CHUNK_BYTES', chunk_bytes)
+        idx = TravelCSVIndex(travel_fp)
+        assert idx.ranges == expected.ranges
+        blank_idx = TravelCSVIndex(str(blank_fp))
+        np.testing.assert_array_equal(blank_idx.dates, expected.dates)
+        pd.testing.assert_frame_equal(blank_idx.read(), pd.read_csv(travel_fp))
+
+    @pytest.mark.parametrize('chunk_bytes', [1, 2 ** 24])
+    def test_quoted_comma(self, tmp_path, monkeypatch, chunk_bytes):
+        """Quoted fields that contain commas do not shift the date column"""
+        fp = tmp_path / 'quoted.csv'
+        fp.write_text('source,name,date,n\n'
+                      '1,"a,b",2020-03-11,5\n'
+                      '2,c,2020-03-11,6\n'
+                      '3,"d,e,f","2020-03-12",7\n')
+        monkeypatch.setattr(TravelCSVIndex, 'CHUNK_BYTES', chunk_bytes)
+        idx = TravelCSVIndex(str(fp))
+        np.testing.assert_array_equal(
+            idx.dates, pd.DatetimeIndex(['2020-03-11', '2020-03-12']))
+        expected = pd.read_csv(fp)
+        pd.testing.assert_frame_equal(idx.read(['2020-03-12']),
+                                      expected.iloc[2:].reset_index(drop=True))
+
+    def test_reuse_index(self, travel_fp):
+        idx = get_travel_index(travel_fp)
+        assert get_travel_index(travel_fp) is idx
+
+        # index is rebuilt when the file changes
+        with open(travel_fp, 'a') as f:
+            f.write('50,2020-03-14,A,A,young,1\n')
+        new_idx = get_travel_index(travel_fp)
+        assert new_idx is not idx
+        assert pd.Timestamp('2020-03-14') in new_idx.dates
+
+    def test_index_cache_bounded(self, travel_fp, tmp_path):
+        for i in range(INDEX_CACHE_SIZE + 2):
+            fp = tmp_path / f'travel{i}.csv'
+            fp.write_text(open(travel_fp).read())
+            get_travel_index(str(fp))
+        assert _load_index.cache_info().currsize <= INDEX_CACHE_SIZE
+
+
+class TestColumnarTravelIndex:
+
+    @pytest.mark.parametrize('dates', [
+        ['2020-03-11'],
+        ['2020-03-12', '2020-03-13'],
+        None,
+    ])
+    def test_same_as_csv(self, travel_fp, tmp_path, dates):
+        cols_fp = str(tmp_path / 'travel.cols')
+        convert(travel_fp, cols_fp)
+        idx = get_travel_index(cols_fp)
+        assert isinstance(idx, ColumnarTravelIndex)
+
+        csv_idx = TravelCSVIndex(travel_fp)
+        np.testing.assert_array_equal(idx.dates, csv_idx.dates)
+
+        # columnar rows are sorted on date
+        expected = csv_idx.read(dates)
+        expected['date'] = pd.to_datetime(expected['date'])
+        expected = expected.sort_values('date', kind='stable').reset_index(drop=True)
+        pd.testing.assert_frame_equal(idx.read(dates), expected)
@@ -38,6 +38,7 @@ class TestBasicModels:
         # basic.slow_seir(),
         # basic.slow_seir_cy_foi(),
         basic.cy_seir_cy_foi(),
+        basic.vec_seir(),
     ))
     def test_sanity(self, epis, model, input_vars, counts_basic, output_vars,
                     step_clock):
@@ -69,4 +70,65 @@ class TestBasicModels:
 
         # check that no phi_grp dims are in the final output dataset (see #4)
         assert not any('phi_grp' in dim for dim in result.dims), \
-            (result.dims, "dims contain phi groups")
\ No newline at end of file
+            (result.dims, "dims contain phi groups")
+
+    def test_batched(self, input_vars, output_vars, step_clock, config_dict):
+        """Replicates of a batched model are the same as an unbatched model
+        if deterministic, and differ from each other if stochastic.
+        """
+        result = self.run_model(
+            basic.cy_batched(), step_clock,
+            dict(input_vars, setup_counts__n_replicates=3), output_vars)
+        counts = result['apply_counts_delta__counts']
+        assert counts.sizes['replicate'] == 3
+
+        if config_dict['sto_toggle'] == -1:
+            expected = self.run_model(
+                basic.cy_seir_cy_foi(), step_clock, input_vars,
+                output_vars)['apply_counts_delta__counts']
+            for k in range(3):
+                xr.testing.assert_allclose(
+                    counts.isel(replicate=k, drop=True), expected)
+        else:
+            final = counts.isel(step=-1)
+            assert not final.isel(replicate=0).equals(final.isel(replicate=1))
+
+    @pytest.mark.parametrize('model', (
+        basic.cy_seir_cy_foi(),
+        basic.vec_seir(),
+    ))
+    def test_binomial(self, model, input_vars, output_vars, step_clock):
+        """Chain-binomial transitions conserve population and never make a
+        compartment negative.
+        """
+        result = self.run_model(
+            model, step_clock,
+            dict(input_vars, sto__sto_mode='binomial'), output_vars)
+        counts = result['apply_counts_delta__counts']
+        assert (counts >= 0).all()
+        net_change = (counts[dict(step=0)] - counts[dict(step=-1)]).sum()
+        assert abs(net_change) <= 1e-8
+
+    def test_sparse_adj(self, config_fp, config_dict, output_vars,
+                        step_clock, tmpdir):
+        """Deterministic travel on a sparse adjacency conserves population
+        and moves people between vertices.
+        """
+        cfg = config_fp(dict(config_dict, sto_toggle=-1))
+        input_vars = dict(
+            read_config__config_fp=cfg,
+            setup_coords__config_fp=cfg
+        )
+        adj_fp = str(tmpdir.join('edges.csv'))
+        with open(adj_fp, 'w') as f:
+            f.write("vertex1,vertex2,rate\n0,1,0.1\n1,2,0.05\n")
+        result = self.run_model(
+            basic.cy_seir_cy_foi_sparse_adj(), step_clock,
+            dict(input_vars, setup_adj__adj_fp=adj_fp), output_vars)
+        counts = result['apply_counts_delta__counts']
+        assert (counts >= 0).all()
+        net_change = (counts[dict(step=0)] - counts[dict(step=-1)]).sum()
+        assert abs(net_change) <= 1e-6
+        vertex_change = (counts[dict(step=-1)] - counts[dict(step=0)]).sum(
+            ['age_group', 'risk_group', 'compartment'])
+        assert (abs(vertex_change) > 1e-8).any()
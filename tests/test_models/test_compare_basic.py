@@ -15,6 +15,8 @@ from episimlab.foi import (
     brute_force as foi_bf,
     bf_cython as foi_bf_cython,
 )
+from episimlab.setup import adj
+from episimlab.network import cython_explicit_travel
 from episimlab.pytest_utils import plotter
 
 VERBOSE = False
@@ -117,3 +119,42 @@ class TestCompareBasicModels:
                 logging.debug(f"where_max_diff: {where_max_diff}")
 
                 raise
+
+    @pytest.mark.parametrize('travel', [False, True])
+    def test_float32_drift(self, step_clock, config_fp, config_dict, travel):
+        """Single precision runs stay close to double precision runs of the
+        same deterministic model. Logs the largest drift in any compartment,
+        relative to the largest count.
+        """
+        cfg = config_fp(dict(config_dict, sto_toggle=-1))
+        input_vars = dict(
+            read_config__config_fp=cfg,
+            setup_coords__config_fp=cfg
+        )
+        model64 = basic.cy_seir_cy_foi()
+        model32 = basic.cy_float32()
+        if travel is True:
+            travel_procs = dict(
+                setup_adj_grp=adj.InitAdjGrpMapping,
+                setup_adj=adj.InitToyAdj,
+                travel=cython_explicit_travel.CythonExplicitTravel,
+            )
+            model64 = model64.update_processes(travel_procs)
+            model32 = model32.update_processes(travel_procs)
+
+        out_var_key = 'apply_counts_delta__counts'
+        in_ds = xs.create_setup(
+            model=model64,
+            clocks=step_clock,
+            input_vars=input_vars,
+            output_vars={out_var_key: 'step'}
+        )
+        result64 = in_ds.xsimlab.run(
+            model=model64, decoding=dict(mask_and_scale=False))[out_var_key]
+        result32 = in_ds.xsimlab.run(
+            model=model32, decoding=dict(mask_and_scale=False))[out_var_key]
+        assert result32.dtype == np.float32
+
+        drift = float(abs(result32 - result64).max() / abs(result64).max())
+        logging.info(f"float32 drift relative to float64: {drift:.3e}")
+        assert drift < 1e-5
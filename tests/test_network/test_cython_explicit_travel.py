@@ -1,7 +1,10 @@
 import pytest
 import logging
 import xarray as xr
-from episimlab.network.cython_explicit_travel import CythonExplicitTravel
+from episimlab.network.cython_explicit_travel import (
+    CythonExplicitTravel, CythonSparseTravel, graph_high_gran, graph_sparse,
+    TravelWorkspace
+)
 import numpy as np
 
 from episimlab.pytest_utils import profiler
@@ -29,11 +32,137 @@ class TestCythonExplicitTravel:
         # logging.debug(f"proc.counts: {proc.counts.coords}")
         # logging.debug(f"proc.counts: {proc.counts.dims}")
 
-        # proc.initialize()
+        proc.initialize()
         proc.run_step()
         proc.finalize_step()
         result = proc.counts_delta_gph
         assert isinstance(result, xr.DataArray)
+        # only mobile compartments travel
+        immobile = [c for c in counts_coords['compartment']
+                    if c not in proc.mobile_compartments]
+        assert immobile
+        assert (result.loc[dict(compartment=immobile)] == 0).all()
 
         # logging.debug(f"result.shape: {result.shape}")
         # logging.debug(f"result: {result}")
+
+
+class TestCythonSparseTravel:
+
+    def test_same_as_dense(self, counts_basic):
+        """Deterministic travel on a sparse adjacency is the same as on the
+        equivalent dense adjacency.
+        """
+        counts = counts_basic.values
+        n_vertex = counts.shape[0]
+        rng = np.random.default_rng(seed=1)
+        dense = np.zeros((n_vertex, n_vertex) + counts.shape[1:])
+        # a single edge, from vertex 0 to the last vertex
+        dense[0, -1] = rng.uniform(0., 0.2, size=counts.shape[1:])
+
+        indptr = np.array([0] + [1] * n_vertex)
+        indices = np.array([n_vertex - 1])
+        result = graph_sparse(counts, indptr, indices, dense[0, -1:], 0, 0)
+        expected = graph_high_gran(counts, dense, 0, 0)
+        np.testing.assert_array_equal(result, expected)
+        assert abs(result.sum()) < 1e-8
+
+    def test_can_run_step(self, counts_basic, stochastic, seed_entropy):
+        n_vertex = counts_basic.sizes['vertex']
+        block_dims = ('age_group', 'risk_group', 'compartment')
+        adj = xr.DataArray(
+            data=np.full((1, ) + counts_basic.shape[1:], 0.1),
+            dims=('edge', ) + block_dims,
+            coords={k: counts_basic.coords[k] for k in block_dims}
+        )
+        proc = CythonSparseTravel(
+            counts=counts_basic,
+            adj=adj,
+            adj_indices=np.array([1], dtype=np.intc),
+            adj_indptr_t=np.array([0] + [1] * n_vertex, dtype=np.intc),
+            stochastic=stochastic,
+            seed_state=seed_entropy
+        )
+        proc.initialize()
+        proc.run_step()
+        proc.finalize_step()
+        result = proc.counts_delta_gph
+        assert isinstance(result, xr.DataArray)
+        # only vertices 0 and 1 exchange travelers
+        assert (result.loc[dict(vertex=2)] == 0).all()
+        assert abs(float(result.sum())) < 1e-8
+
+
+class TestGraphHighGran:
+
+    @pytest.fixture
+    def arrays(self):
+        rng = np.random.default_rng(seed=3)
+        counts = rng.uniform(0., 1000., size=(6, 5, 2, 16))
+        counts[2] = 0.
+        return counts, rng.uniform(0., 0.5, size=(6, 6, 5, 2, 16))
+
+    @pytest.mark.parametrize('stochastic', [0, 1])
+    def test_num_threads(self, arrays, stochastic):
+        """Results do not depend on the number of threads."""
+        counts, adj = arrays
+        expected = graph_high_gran(counts, adj, stochastic, 7, num_threads=1)
+        for num_threads in (2, 3, 8):
+            result = graph_high_gran(counts, adj, stochastic, 7,
+                                     num_threads=num_threads)
+            np.testing.assert_array_equal(result, expected)
+
+    @pytest.mark.parametrize('stochastic', [0, 1])
+    def test_conserved(self, arrays, stochastic):
+        """Travel conserves population and never makes a compartment
+        negative, even if total outflow exceeds counts.
+        """
+        counts, adj = arrays
+        result = graph_high_gran(counts, adj, stochastic, 7)
+        assert abs(result.sum()) < 1e-6
+        assert (counts + result >= -1e-9).all()
+
+    def test_direction(self):
+        """Net travel is from the larger to the smaller vertex."""
+        counts = np.array([1000., 10.]).reshape(2, 1, 1, 1)
+        adj = np.full((2, 2, 1, 1, 1), 0.01)
+        for stochastic in (0, 1):
+            result = graph_high_gran(counts, adj, stochastic, 0).ravel()
+            assert result[0] < 0 < result[1]
+
+    @pytest.mark.parametrize('stochastic', [0, 1])
+    def test_workspace(self, arrays, stochastic):
+        """Reusing a workspace across calls gives the same results, without
+        rebuilding its edges.
+        """
+        counts, adj = arrays
+        workspace = TravelWorkspace()
+        for seed in (7, 8):
+            expected = graph_high_gran(counts, adj, stochastic, seed)
+            result = graph_high_gran(counts, adj, stochastic, seed,
+                                     workspace=workspace)
+            np.testing.assert_array_equal(result, expected)
+        assert len(workspace.edges) == 1
+
+        # two days of a sparse adjacency, sharing the workspace
+        indices = np.array([1, 2, 5, 3], dtype=np.intc)
+        rates = adj[0, :4]
+        workspace = TravelWorkspace()
+        for indptr in ([0, 2, 2, 2, 2, 2, 2], [2, 2, 2, 4, 4, 4, 4]) * 2:
+            indptr = np.array(indptr, dtype=np.intc)
+            expected = graph_sparse(counts, indptr, indices, rates,
+                                    stochastic, 7)
+            result = graph_sparse(counts, indptr, indices, rates, stochastic,
+                                  7, workspace=workspace)
+            np.testing.assert_array_equal(result, expected)
+        assert len(workspace.edges) == 2
+
+    def test_mixed_precision(self, arrays):
+        """Single precision counts travel on double precision rates without
+        casting them.
+        """
+        counts, adj = arrays
+        expected = graph_high_gran(counts, adj, 0, 7)
+        result = graph_high_gran(counts.astype('float32'), adj, 0, 7)
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-2)
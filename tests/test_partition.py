@@ -10,7 +10,16 @@ import xsimlab as xs
 from itertools import product
 
 
-from episimlab.partition.partition import Partition2Contact
+from episimlab.partition.partition import (
+    Partition2Contact, SparsePartition2Contact, Contact2Phi,
+    FactoredContact2Phi, SparseContact2Phi,
+    to_sparse_contact
+)
+from episimlab.partition.cache import (
+    ContactCache, file_hash, _hash_file, HASH_CACHE_SIZE
+)
+from episimlab.utils.columnar import convert
+from episimlab.partition import implicit_node
 from episimlab.models import basic
 from episimlab.setup import epi
 
@@ -144,6 +153,25 @@ class TestPartitionInModel:
         assert isinstance(result, xr.Dataset)
 
 
+    @pytest.mark.skipif(not os.path.isfile("data/20200311_travel.csv"),
+                        reason="Requires data/20200311_travel.csv")
+    def test_sparse_partition_from_csv(self):
+        step_clock = {
+            'step': pd.date_range(
+                start='3/11/2020', end='3/13/2020', freq='24H'
+            )
+        }
+        model = basic.sparse_partition()
+        input_vars = dict(
+            read_config__config_fp='tests/config/example_v2.yaml',
+            get_contact_xr__travel_fp='data/20200311_travel.csv',
+            get_contact_xr__contacts_fp='tests/data/polymod_contacts.csv',
+        )
+        output_vars = dict(apply_counts_delta__counts='step')
+        result = self.run_model(model, step_clock, input_vars, output_vars)
+        assert isinstance(result, xr.Dataset)
+
+
 class TestPartitioning:
     """
     Check that refactored partitioning generates expected results
@@ -192,3 +220,326 @@ class TestPartitioning:
 
         xr.testing.assert_allclose(sort_coords(
             proc.contact_xr), sort_coords(phi))
+
+
+class TestSparsePartitioning:
+    """
+    Check that sparse partitioning generates the same contacts as dense
+    """
+
+    def run_proc(self, cls, results):
+        inputs = {k: results[k] for k in ('contacts_fp', 'travel_fp')}
+        kw = dict(step_delta=np.timedelta64(24, 'h'),
+                  step_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+                  step_end=np.datetime64('2020-03-12T00:00:00.000000000'),)
+        proc = cls(**inputs)
+        proc.initialize(**kw)
+        proc.run_step(**kw)
+        return proc
+
+    def test_same_as_dense(self, updated_results):
+        dense = self.run_proc(Partition2Contact, updated_results).contact_xr
+        sparse = self.run_proc(SparsePartition2Contact, updated_results).contact_xr
+        assert sparse.dims == SparsePartition2Contact.DIMS
+
+        # sparse array should be identical to the dense array after
+        # dropping vertex pairs without any contacts
+        xr.testing.assert_allclose(sparse, to_sparse_contact(dense))
+
+    def test_sparse_phi(self, updated_results):
+        dense = self.run_proc(Partition2Contact, updated_results).contact_xr
+        sparse = self.run_proc(SparsePartition2Contact, updated_results).contact_xr
+
+        dense_proc = Contact2Phi(contact_xr=dense)
+        dense_proc.initialize()
+        sparse_proc = SparseContact2Phi(contact_xr=sparse)
+        sparse_proc.initialize()
+        assert list(sparse_proc.vertex) == list(dense_proc.vertex)
+        assert sparse_proc.phi_t.dims == SparseContact2Phi.PHI_DIMS
+
+        # index dense phi at each of the sparse vertex pairs
+        sparse_phi = (sparse_proc.phi_t * sparse_proc.phi_risk)
+        dense_phi = dense_proc.phi_t.sel(
+            vertex1=sparse_phi.coords['vertex1'],
+            vertex2=sparse_phi.coords['vertex2'],
+        ).transpose(*sparse_phi.dims)
+        np.testing.assert_allclose(sparse_phi.values, dense_phi.values)
+
+        # phi_t is only rebuilt for a new contact_xr
+        phi_t = sparse_proc.phi_t
+        sparse_proc.run_step()
+        assert sparse_proc.phi_t is phi_t
+
+    def test_factored_phi(self, updated_results):
+        dense = self.run_proc(Partition2Contact, updated_results).contact_xr
+
+        dense_proc = Contact2Phi(contact_xr=dense)
+        dense_proc.initialize()
+        factored_proc = FactoredContact2Phi(contact_xr=dense)
+        factored_proc.initialize()
+        assert factored_proc.phi_t.dims == FactoredContact2Phi.PHI_DIMS
+
+        # outer product of factors should be identical to the full phi array
+        full_phi = (factored_proc.phi_t * factored_proc.phi_risk)
+        xr.testing.assert_allclose(
+            full_phi.transpose(*Contact2Phi.PHI_DIMS), dense_proc.phi_t)
+
+
+class TestPrecompute:
+    """
+    Check that the contacts for each step window are precomputed during
+    initialize, looked up from cache at each step, and are the same as
+    contacts computed at each step
+    """
+    clock = dict(sim_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+                 sim_end=np.datetime64('2020-03-17T00:00:00.000000000'),
+                 nsteps=3)
+
+    @pytest.fixture
+    def inputs(self, updated_results, tmp_path):
+        """Travel file with the same rows on each of 3 days"""
+        df = pd.read_csv(updated_results['travel_fp'], index_col=0)
+        days = list()
+        for day in range(3):
+            day_df = df.copy()
+            day_df['date'] = pd.Timestamp('2020-03-11') + pd.Timedelta(days=day)
+            day_df['n'] = day_df['n'] * (day + 1)
+            days.append(day_df)
+        travel_fp = tmp_path / 'travel.csv'
+        pd.concat(days).to_csv(travel_fp, index=False)
+        return dict(contacts_fp=updated_results['contacts_fp'],
+                    travel_fp=str(travel_fp))
+
+    def step_kws(self) -> list:
+        """Runtime arguments for `run_step` at each step of the clock, as
+        passed by xsimlab
+        """
+        clock = pd.date_range(self.clock['sim_start'], self.clock['sim_end'],
+                              periods=self.clock['nsteps'] + 1).values
+        starts = [np.datetime64('NaT')] + list(clock[:-2])
+        return [dict(step_delta=end - clock[0], step_start=start, step_end=end)
+                for start, end in zip(starts, clock[:-1])]
+
+    @pytest.mark.parametrize('cls', [Partition2Contact, SparsePartition2Contact])
+    def test_step_windows(self, inputs, cls):
+        proc = cls(precompute=True, **inputs)
+        proc.initialize(step_delta=0, step_start=0, step_end=0, **self.clock)
+        dates = pd.date_range('2020-03-11', periods=3)
+        assert list(proc.contact_cache) == [
+            (dates[0],), (dates[0], dates[1]), (dates[2],)]
+
+    @pytest.mark.parametrize('cls', [Partition2Contact, SparsePartition2Contact])
+    def test_same_as_not_precomputed(self, inputs, cls, monkeypatch):
+        proc = cls(**inputs)
+        proc.initialize(step_delta=0, step_start=0, step_end=0, **self.clock)
+        expected = list()
+        for kw in self.step_kws():
+            proc.run_step(**kw)
+            expected.append(proc.contact_xr)
+
+        cached_proc = cls(precompute=True, precompute_workers=2, **inputs)
+        cached_proc.initialize(step_delta=0, step_start=0, step_end=0,
+                               **self.clock)
+
+        # steps should look up every window from cache, without partitioning
+        monkeypatch.setattr(cls, 'partition_window', None)
+        for kw, contact_xr in zip(self.step_kws(), expected):
+            cached_proc.run_step(**kw)
+            xr.testing.assert_identical(cached_proc.contact_xr, contact_xr)
+
+    def test_instance_scoped(self, inputs):
+        first = Partition2Contact(precompute=True, **inputs)
+        first.initialize(step_delta=0, step_start=0, step_end=0, **self.clock)
+        second = Partition2Contact(precompute=True, **inputs)
+        second.initialize(step_delta=0, step_start=0, step_end=0, nsteps=0)
+        assert len(first.contact_cache) == 3
+        assert len(second.contact_cache) == 1
+
+
+class TestDiskCache:
+    """
+    Check that contacts persisted to disk are the same as contacts computed
+    from scratch, and are invalidated when inputs change
+    """
+    kw = dict(step_delta=np.timedelta64(24, 'h'),
+              step_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+              step_end=np.datetime64('2020-03-12T00:00:00.000000000'),)
+
+    def run_proc(self, cls, inputs):
+        proc = cls(**inputs)
+        proc.initialize(**self.kw)
+        proc.run_step(**self.kw)
+        return proc
+
+    @pytest.mark.parametrize('cls', [Partition2Contact, SparsePartition2Contact])
+    def test_warm_start(self, updated_results, cls, tmp_path, monkeypatch):
+        inputs = {k: updated_results[k] for k in ('contacts_fp', 'travel_fp')}
+        expected = self.run_proc(cls, inputs).contact_xr
+
+        inputs['cache_dir'] = str(tmp_path)
+        cold = self.run_proc(cls, inputs).contact_xr
+        xr.testing.assert_allclose(cold, expected)
+        assert len(list(tmp_path.glob('*.nc'))) == 1
+
+        # warm start should not partition
+        monkeypatch.setattr(cls, 'sparse_partition', None)
+        warm = self.run_proc(cls, inputs).contact_xr
+        xr.testing.assert_allclose(warm, expected)
+
+    def test_invalidate(self, updated_results, tmp_path):
+        travel_fp = tmp_path / 'travel.csv'
+        travel_fp.write_text(open(updated_results['travel_fp']).read())
+        inputs = dict(contacts_fp=updated_results['contacts_fp'],
+                      travel_fp=str(travel_fp), cache_dir=str(tmp_path / 'cache'))
+        self.run_proc(Partition2Contact, inputs)
+        old = set((tmp_path / 'cache').glob('*.nc'))
+        assert len(old) == 1
+
+        # modifying travel_fp replaces the stale entry
+        df = pd.read_csv(travel_fp)
+        df['n'] += 1
+        df.to_csv(travel_fp, index=False)
+        self.run_proc(Partition2Contact, inputs)
+        new = set((tmp_path / 'cache').glob('*.nc'))
+        assert len(new) == 1
+        assert not new & old
+
+    def test_evict(self, tmp_path):
+        cache = ContactCache(str(tmp_path), max_bytes=0)
+        da = xr.DataArray(np.ones((2, 2)), dims=('x', 'y'))
+        cache.put('key', ('2020-03-11', ), da)
+        assert not list(tmp_path.glob('*.nc'))
+        assert cache.get('key', ('2020-03-11', )) is None
+
+    def test_cache_max_bytes(self, updated_results, tmp_path):
+        inputs = {k: updated_results[k] for k in ('contacts_fp', 'travel_fp')}
+        proc = self.run_proc(Partition2Contact, dict(
+            inputs, cache_dir=str(tmp_path), cache_max_bytes=0))
+        assert proc.disk_cache.max_bytes == 0
+        assert not list(tmp_path.glob('*.nc'))
+
+    def test_hash_cache_bounded(self, tmp_path):
+        for i in range(HASH_CACHE_SIZE + 2):
+            fp = tmp_path / f'file{i}.csv'
+            fp.write_text(str(i))
+            file_hash(str(fp))
+        assert _hash_file.cache_info().currsize <= HASH_CACHE_SIZE
+
+
+@pytest.fixture(params=[0, 1, 2])
+def random_travel_fp(request, tmp_path):
+    """Random travel data with several local and contextual destinations"""
+    rng = np.random.default_rng(seed=request.param)
+    sources = ['A', 'B', 'C', 'D', 'E']
+    rows = list()
+    for src, dest, age in product(sources, sources + ['school', 'work'],
+                                  ['young', 'old']):
+        if rng.uniform() < 0.3:
+            continue
+        rows.append(dict(
+            date='2020-03-11', source=src, destination=dest,
+            destination_type='local' if dest in sources else 'contextual',
+            age=age, n=rng.integers(0, 100)
+        ))
+    fp = tmp_path / 'travel.csv'
+    pd.DataFrame(rows).to_csv(fp)
+    return str(fp)
+
+
+class TestSparsePartitionEngine:
+    """
+    Check that the sparse partition engine generates the same contact
+    probabilities as the self join in pandas_partition
+    """
+
+    def test_same_as_pandas(self, random_travel_fp, updated_results):
+        proc = Partition2Contact(travel_fp=random_travel_fp,
+                                 contacts_fp=updated_results['contacts_fp'])
+        kw = dict(step_delta=np.timedelta64(24, 'h'),
+                  step_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+                  step_end=np.datetime64('2020-03-12T00:00:00.000000000'),)
+        proc.initialize(**kw)
+        proc.run_step(**kw)
+        pd.testing.assert_frame_equal(proc.sparse_partition(),
+                                      proc.pandas_partition())
+
+    def test_contact_matrix(self, random_travel_fp, updated_results):
+        proc = Partition2Contact(travel_fp=random_travel_fp,
+                                 contacts_fp=updated_results['contacts_fp'])
+        kw = dict(step_delta=np.timedelta64(24, 'h'),
+                  step_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+                  step_end=np.datetime64('2020-03-12T00:00:00.000000000'),)
+        proc.initialize(**kw)
+        proc.run_step(**kw)
+        result = proc.contact_matrix()
+
+        # element-wise lookup in contact_partitions
+        expected = xr.zeros_like(result)
+        df = proc.contact_partitions
+        for n1, n2, a1, a2 in product(*[result[dim].values for dim in result.dims]):
+            subset = df[(df['i'] == n1) & (df['j'] == n2) &
+                        (df['age_i'] == a1) & (df['age_j'] == a2)]
+            if not subset.empty:
+                expected.loc[dict(vertex_i=n1, vertex_j=n2, age_i=a1, age_j=a2)] = \
+                    subset['partitioned_per_capita_contacts'].item()
+        xr.testing.assert_identical(result, expected)
+
+
+class TestImplicitNode:
+    """
+    Check that vectorized probabilistic_partition in implicit_node generates
+    the same contact probabilities as the legacy loop
+    """
+
+    def test_same_as_legacy(self, legacy_results_toy):
+        travel = pd.read_csv(legacy_results_toy['travel_fp'])
+        expected = pd.read_csv(legacy_results_toy['tr_parts_fp'])
+        legacy = implicit_node.probabilistic_partition_legacy(travel, 10)
+        result = implicit_node.probabilistic_partition(travel, 10)
+        pd.testing.assert_frame_equal(legacy, expected)
+        pd.testing.assert_frame_equal(result, expected)
+
+    @pytest.mark.parametrize('seed', [0, 1])
+    def test_same_as_legacy_random(self, seed):
+        rng = np.random.default_rng(seed=seed)
+        ages = ['young', 'old']
+        rows = list()
+        for src in ['A', 'B', 'C', 'D']:
+            dests = [d for d in ['A', 'B', 'C', 'D'] if rng.uniform() < 0.5]
+            for dest, a1, a2 in product(dests + [src], ages, ages):
+                rows.append((src, dest, 'local', a1, a2))
+            for dest, a1, a2 in product(['school', 'work'], ages, ages):
+                rows.append((src, dest, 'contextual', a1, a2))
+        travel = pd.DataFrame(rows, columns=[
+            'source', 'destination', 'destination_type', 'age_src', 'age_dest'])
+        travel = travel.drop_duplicates().reset_index(drop=True)
+        travel['n'] = rng.integers(0, 100, size=len(travel))
+
+        legacy = implicit_node.probabilistic_partition_legacy(travel, 10)
+        result = implicit_node.probabilistic_partition(travel, 10)
+        pd.testing.assert_frame_equal(result, legacy)
+
+
+class TestColumnarInputs:
+    """
+    Check that partitioning columnar travel and contacts tables generates
+    the same contacts as the CSV files they were converted from
+    """
+
+    def test_same_as_csv(self, updated_results, tmp_path):
+        kw = dict(step_delta=np.timedelta64(24, 'h'),
+                  step_start=np.datetime64('2020-03-11T00:00:00.000000000'),
+                  step_end=np.datetime64('2020-03-12T00:00:00.000000000'),)
+        inputs = {k: updated_results[k] for k in ('contacts_fp', 'travel_fp')}
+        proc = Partition2Contact(**inputs)
+        proc.initialize(**kw)
+        proc.run_step(**kw)
+
+        cols_inputs = dict()
+        for k, fp in inputs.items():
+            cols_inputs[k] = str(tmp_path / k)
+            convert(fp, cols_inputs[k])
+        cols_proc = Partition2Contact(**cols_inputs)
+        cols_proc.initialize(**kw)
+        cols_proc.run_step(**kw)
+        xr.testing.assert_identical(cols_proc.contact_xr, proc.contact_xr)
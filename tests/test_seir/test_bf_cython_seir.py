@@ -1,7 +1,11 @@
+import os
+import sys
 import pytest
 import logging
+import subprocess
 import xarray as xr
-from episimlab.seir.bf_cython import BruteForceCythonSEIR
+import numpy as np
+from episimlab.seir.bf_cython import BruteForceCythonSEIR, BatchedCythonSEIR
 from episimlab.seir.brute_force import BruteForceSEIR
 
 
@@ -59,3 +63,166 @@ class TestBruteForceCythonSEIR:
 
         # assert are the same
         xr.testing.assert_allclose(py_result, cy_result)
+
+    def test_transition_probs_cached(self, foi, seed_entropy, counts_basic,
+                                     step_delta, epis):
+        inputs = {
+            'counts': counts_basic,
+            'foi': foi,
+            'seed_state': seed_entropy,
+            'stochastic': False,
+        }
+        inputs.update(epis)
+        proc = BruteForceCythonSEIR(**inputs)
+        proc.run_step(step_delta)
+        probs = proc.get_transition_probs(proc.get_int_per_day(step_delta))
+        proc.run_step(step_delta)
+        assert proc.get_transition_probs(
+            proc.get_int_per_day(step_delta)) is probs
+
+        # recomputed when a parameter changes, as with SetupDynamic* processes
+        proc.sigma = proc.sigma / 2
+        proc.run_step(step_delta)
+        new_probs = proc.get_transition_probs(proc.get_int_per_day(step_delta))
+        assert new_probs is not probs
+        assert new_probs[0] < probs[0]
+
+    def test_binomial(self, foi, seed_entropy, counts_basic, step_delta,
+                      epis):
+        """Chain-binomial transitions move whole individuals, conserve
+        population, and never make a compartment negative.
+        """
+        inputs = {
+            'counts': counts_basic,
+            'foi': foi,
+            'seed_state': seed_entropy,
+            'stochastic': True,
+            'binomial': True,
+        }
+        inputs.update(epis)
+        proc = BruteForceCythonSEIR(**inputs)
+        proc.run_step(step_delta)
+        proc.finalize_step()
+        delta = proc.counts_delta_seir.fillna(0.)
+
+        compt = ['S', 'E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih', 'R', 'D']
+        delta = delta.loc[dict(compartment=compt)]
+        assert (delta == np.round(delta)).all()
+        assert (np.floor(counts_basic.loc[dict(compartment=compt)])
+                + delta >= 0).all()
+        np.testing.assert_allclose(delta.sum('compartment'), 0.)
+        assert (delta != 0).any()
+
+    @pytest.mark.parametrize('binomial', [False, True])
+    def test_inert_cells(self, foi, seed_entropy, counts_basic, step_delta,
+                         epis, binomial):
+        """Cells with no one infected and no force of infection do not change,
+        even with stochastic transitions.
+        """
+        counts = counts_basic.copy()
+        first = dict(vertex=counts.coords['vertex'][0])
+        counts.loc[dict(first, compartment=['E', 'Pa', 'Py', 'Ia', 'Iy', 'Ih'])] = 0.
+        foi = foi.copy()
+        foi.loc[first] = 0.
+        inputs = {
+            'counts': counts,
+            'foi': foi,
+            'seed_state': seed_entropy,
+            'stochastic': True,
+            'binomial': binomial,
+        }
+        inputs.update(epis)
+        proc = BruteForceCythonSEIR(**inputs)
+        proc.run_step(step_delta)
+        proc.finalize_step()
+        delta = proc.counts_delta_seir.fillna(0.)
+        assert (delta.loc[first] == 0).all()
+        assert (delta != 0).any()
+
+    def test_same_across_thread_counts(self):
+        """Stochastic results are identical regardless of OMP_NUM_THREADS.
+        """
+        results = list()
+        for n_threads in (1, 4):
+            env = dict(os.environ, OMP_NUM_THREADS=str(n_threads))
+            out = subprocess.check_output(
+                [sys.executable, '-c', SAME_ACROSS_THREADS], env=env)
+            results.append(out.strip())
+        assert results[0] == results[1]
+
+
+class TestBatchedCythonSEIR:
+
+    def test_same_as_unbatched(self, foi, seed_entropy, stochastic,
+                               counts_basic, step_delta, epis):
+        """Each replicate gets the same result as BruteForceCythonSEIR with
+        the replicate's seed.
+        """
+        replicate = np.arange(3)
+        inputs = {
+            'replicate': replicate,
+            'counts': counts_basic.expand_dims(replicate=replicate).copy(),
+            'foi': foi.expand_dims(replicate=replicate).copy(),
+            'seed_state': seed_entropy,
+            'stochastic': stochastic,
+        }
+        inputs.update(epis)
+        proc = BatchedCythonSEIR(**inputs)
+        proc.run_step(step_delta)
+        proc.finalize_step()
+        result = proc.counts_delta_seir
+        assert result.dims == BatchedCythonSEIR.COUNTS_DIMS
+
+        for k, seed in zip(replicate, proc.get_seeds()):
+            bf_proc = BruteForceCythonSEIR(**{
+                **{key: val for key, val in inputs.items() if key != 'replicate'},
+                'counts': counts_basic,
+                'foi': foi,
+                'seed_state': seed,
+            })
+            bf_proc.run_step(step_delta)
+            bf_proc.finalize_step()
+            xr.testing.assert_identical(result.isel(replicate=k, drop=True),
+                                        bf_proc.counts_delta_seir)
+
+    def test_reuses_rngs(self, foi, seed_entropy, counts_basic, step_delta,
+                         epis):
+        """RNG streams are allocated once if stochastic, and not at all if
+        deterministic.
+        """
+        replicate = np.arange(2)
+        inputs = dict(
+            replicate=replicate,
+            counts=counts_basic.expand_dims(replicate=replicate).copy(),
+            foi=foi.expand_dims(replicate=replicate).copy(),
+            seed_state=seed_entropy,
+            stochastic=0,
+            **epis
+        )
+        proc = BatchedCythonSEIR(**inputs)
+        proc.run_step(step_delta)
+        assert getattr(proc, 'rngs', None) is None
+
+        proc.stochastic = 1
+        proc.run_step(step_delta)
+        rngs = proc.rngs
+        assert rngs.n == 2 * counts_basic.sizes['vertex']
+        proc.run_step(step_delta)
+        assert proc.rngs is rngs
+
+
+# Runs a stochastic SEIR step on random inputs, and prints a hash of the result
+SAME_ACROSS_THREADS = """
+import hashlib
+import numpy as np
+from episimlab.seir.bf_cython_engine import brute_force_SEIR
+
+rng = np.random.default_rng(seed=42)
+result = brute_force_SEIR(
+    counts=rng.uniform(0., 1000., size=(20, 5, 2, 16)),
+    foi=rng.uniform(0., 100., size=(20, 5, 2)),
+    rho=np.full(16, 0.4), gamma=np.full(16, 0.2), pi=np.full((2, 5), 0.1),
+    nu=np.full(5, 0.1), mu=0.1, sigma=0.3, eta=0.1, tau=0.6, int_per_day=2.,
+    stochastic=1, int_seed=12345)
+print(hashlib.sha256(result.tobytes()).hexdigest())
+"""
@@ -1,5 +1,6 @@
 import pytest
 import logging
+import numpy as np
 import xarray as xr
 from episimlab.seir.brute_force import BruteForceSEIR
 
@@ -30,3 +31,20 @@ class TestBruteForceSEIR:
 
         # logging.debug(f"result: {result}")
         assert isinstance(result, xr.DataArray)
+
+    # xsimlab passes inputs from a dataset as numpy scalars or 0-d arrays
+    @pytest.mark.parametrize('binomial', [True, np.bool_(True), np.array(True)])
+    def test_rejects_binomial(self, seed_entropy, foi, counts_basic, epis,
+                              binomial):
+        inputs = {
+            'counts': counts_basic,
+            'foi': foi,
+            'seed_state': seed_entropy,
+            'stochastic': True,
+            'binomial': binomial,
+        }
+        inputs.update(epis)
+
+        proc = BruteForceSEIR(**inputs)
+        with pytest.raises(ValueError, match='chain-binomial'):
+            proc.initialize()
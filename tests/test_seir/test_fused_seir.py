@@ -0,0 +1,98 @@
+import pytest
+import logging
+import numpy as np
+import xarray as xr
+import xsimlab as xs
+from episimlab.models import basic
+from episimlab.foi.bf_cython import BruteForceCythonFOI
+from episimlab.seir.bf_cython import BruteForceCythonSEIR
+from episimlab.seir.fused import FusedFOISEIR
+from episimlab.setup import adj
+from episimlab.network import cython_explicit_travel
+
+
+@pytest.fixture
+def inputs(beta, omega, counts_basic, phi_t, seed_entropy, stochastic, epis):
+    inputs = {
+        'age_group': counts_basic.coords['age_group'],
+        'risk_group': counts_basic.coords['risk_group'],
+        'vertex': counts_basic.coords['vertex'],
+        'beta': beta,
+        'omega': omega,
+        'counts': counts_basic,
+        'phi_t': phi_t,
+        'seed_state': seed_entropy,
+        'stochastic': stochastic,
+    }
+    inputs.update(epis)
+    return inputs
+
+
+class TestFusedFOISEIR:
+
+    def test_same_as_separate(self, inputs, step_delta):
+        """Same FOI and counts delta as BruteForceCythonFOI followed by
+        BruteForceCythonSEIR, including stochastic runs with the same seed.
+        """
+        foi_proc = BruteForceCythonFOI(**{
+            k: inputs[k] for k in ('age_group', 'risk_group', 'vertex', 'beta',
+                                   'omega', 'counts', 'phi_t')})
+        foi_proc.run_step()
+        seir_proc = BruteForceCythonSEIR(foi=foi_proc.foi, **{
+            k: v for k, v in inputs.items() if k not in
+            ('age_group', 'risk_group', 'vertex', 'beta', 'omega', 'phi_t')})
+        seir_proc.run_step(step_delta)
+        seir_proc.finalize_step()
+
+        proc = FusedFOISEIR(**inputs)
+        proc.initialize()
+        proc.run_step(step_delta)
+
+        xr.testing.assert_allclose(proc.foi, foi_proc.foi)
+        xr.testing.assert_allclose(proc.counts_delta_seir,
+                                   seir_proc.counts_delta_seir.fillna(0.))
+
+    def test_no_reallocation(self, inputs, step_delta):
+        proc = FusedFOISEIR(**inputs)
+        proc.initialize()
+        foi, delta = proc.foi.values, proc.counts_delta_seir.values
+        for _ in range(2):
+            proc.run_step(step_delta)
+            assert proc.foi.values is foi
+            assert proc.counts_delta_seir.values is delta
+        assert foi.sum() >= 1e-8
+
+        # nonzero pressure is indexed into the preallocated `sources`
+        sources = np.flatnonzero(proc.pressure)
+        np.testing.assert_array_equal(proc.sources[:len(sources)], sources)
+
+    @pytest.mark.parametrize('travel', [False, True])
+    def test_same_as_separate_model(self, step_clock, config_fp, config_dict,
+                                    travel):
+        cfg = config_fp(config_dict)
+        model1 = basic.cy_seir_cy_foi()
+        model2 = basic.cy_fused_foi_seir()
+        if travel is True:
+            travel_procs = dict(
+                setup_adj_grp=adj.InitAdjGrpMapping,
+                setup_adj=adj.InitToyAdj,
+                travel=cython_explicit_travel.CythonExplicitTravel,
+            )
+            model1 = model1.update_processes(travel_procs)
+            model2 = model2.update_processes(travel_procs)
+
+        out_var_key = 'apply_counts_delta__counts'
+        in_ds = xs.create_setup(
+            model=model1,
+            clocks=step_clock,
+            input_vars=dict(
+                read_config__config_fp=cfg,
+                setup_coords__config_fp=cfg
+            ),
+            output_vars={out_var_key: 'step'}
+        )
+        result1 = in_ds.xsimlab.run(
+            model=model1, decoding=dict(mask_and_scale=False))[out_var_key]
+        result2 = in_ds.xsimlab.run(
+            model=model2, decoding=dict(mask_and_scale=False))[out_var_key]
+        xr.testing.assert_allclose(result1, result2)
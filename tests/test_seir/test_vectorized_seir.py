@@ -0,0 +1,80 @@
+import pytest
+import logging
+import numpy as np
+import xarray as xr
+from episimlab.seir.bf_cython import BruteForceCythonSEIR
+from episimlab.seir.brute_force import BruteForceSEIR
+from episimlab.seir.vectorized import VectorizedSEIR
+
+
+@pytest.fixture
+def inputs(foi, seed_entropy, stochastic, counts_basic, epis):
+    inputs = {
+        'counts': counts_basic,
+        'foi': foi,
+        'seed_state': seed_entropy,
+        'stochastic': stochastic,
+    }
+    inputs.update(epis)
+    return inputs
+
+
+class TestVectorizedSEIR:
+
+    def test_binomial(self, inputs, step_delta):
+        inputs.update(stochastic=True, binomial=True)
+        proc = VectorizedSEIR(**inputs)
+        proc.run_step(step_delta)
+        delta = proc.counts_delta_seir.loc[dict(
+            compartment=list(VectorizedSEIR.COMPARTMENTS))]
+        counts = inputs['counts'].loc[delta.coords]
+
+        assert (delta == np.round(delta)).all()
+        assert (counts + delta >= 0).all()
+        np.testing.assert_allclose(delta.sum('compartment'), 0., atol=1e-8)
+        assert (delta != 0).any()
+
+    def test_can_run_step(self, inputs, step_delta):
+        proc = VectorizedSEIR(**inputs)
+        proc.run_step(step_delta)
+        result = proc.counts_delta_seir
+        assert isinstance(result, xr.DataArray)
+
+        # population is conserved, and no compartment becomes negative
+        assert abs(float(result.sum())) <= 1e-6
+        new_counts = inputs['counts'] + result.fillna(0.)
+        assert (new_counts.loc[dict(compartment=list(proc.COMPARTMENTS))]
+                >= -1e-8).all()
+
+    # NOTE: engines use different RNGs, so are only compared when
+    # deterministic. The Cython engine casts sigma, eta and mu to single
+    # precision, so it is only expected to match to a looser tolerance.
+    @pytest.mark.parametrize('stochastic', [False])
+    @pytest.mark.parametrize('seir_cls, tol', [
+        (BruteForceSEIR, dict(rtol=1e-10, atol=1e-10)),
+        (BruteForceCythonSEIR, dict(rtol=1e-6, atol=1e-4)),
+    ])
+    @pytest.mark.parametrize('randomize', [False, True])
+    def test_same_as_brute_force(self, inputs, step_delta, seir_cls, tol,
+                                 randomize):
+        if randomize is True:
+            # large FOI and outflows, so that compartments are clamped
+            rng = np.random.default_rng(seed=12345)
+            for k in ('counts', 'foi'):
+                da = inputs[k].copy()
+                da.values = rng.uniform(0., 100., size=da.shape)
+                inputs[k] = da
+            inputs['sigma'] = 0.9
+            inputs['foi'] = inputs['foi'] * 10
+
+        proc = VectorizedSEIR(**inputs)
+        proc.run_step(step_delta)
+        result = proc.counts_delta_seir
+
+        bf_proc = seir_cls(**inputs)
+        bf_proc.run_step(step_delta)
+        if hasattr(bf_proc, 'finalize_step'):
+            bf_proc.finalize_step()
+        expected = bf_proc.counts_delta_seir
+
+        xr.testing.assert_allclose(result, expected, **tol)
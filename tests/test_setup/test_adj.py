@@ -2,8 +2,12 @@ import pytest
 import logging
 import xarray as xr
 import numpy as np
-from episimlab.setup.adj import InitToyAdj, InitAdjGrpMapping
+import pandas as pd
+from episimlab.setup.adj import InitToyAdj, InitAdjGrpMapping, InitSparseAdj
 from episimlab.pytest_utils import profiler
+from episimlab.network.cython_explicit_travel import BaseTravel
+
+MOBILE = BaseTravel.MOBILE_COMPARTMENTS
 
 
 class TestInitAdj:
@@ -15,11 +19,16 @@ class TestInitAdj:
             ('age_group', 'risk_group', 'vertex', 'compartment')
         }
         # inputs['day_of_week'] = np.arange(7)
-        proc = InitToyAdj(**inputs)
+        proc = InitToyAdj(mobile_compartments=MOBILE, **inputs)
         proc.initialize()
-        proc.run_step(step=0)
+        proc.run_step(step=0, step_start=0)
         result = proc.adj
         assert isinstance(result, xr.DataArray)
+        assert list(result['compartment'].values) == list(MOBILE)
+        # every day of week has the same rates, so shares one profile
+        assert result.sizes['day_profile'] == 1
+        np.testing.assert_array_equal(proc.adj_day_profile, [0] * 7)
+        assert np.shares_memory(proc.adj_t.values, result.values)
 
 
 class TestInitAdjGrpMapping:
@@ -34,3 +43,83 @@ class TestInitAdjGrpMapping:
         result = proc.adj_grp_mapping
         assert isinstance(result, xr.DataArray)
         # logging.debug(f"result: {result}")
+
+
+@pytest.fixture
+def edge_list_fp(tmpdir):
+    """Edge list with a weekday-only commute between vertices 0 and 1, and
+    a weekend trip between vertices 2 and 0 for one age group.
+    """
+    fp = str(tmpdir.join('edges.csv'))
+    weekday = pd.DataFrame(dict(day_of_week=range(5), vertex1=0, vertex2=1,
+                                rate=0.1))
+    weekend = pd.DataFrame(dict(day_of_week=[5, 6], vertex1=2, vertex2=0,
+                                age_group='18-49', rate=0.2))
+    pd.concat([weekday, weekend]).to_csv(fp, index=False)
+    return fp
+
+
+class TestInitSparseAdj:
+
+    def get_proc(self, counts_coords, adj_fp):
+        inputs = {
+            k: counts_coords[k] for k in
+            ('age_group', 'risk_group', 'vertex', 'compartment')
+        }
+        proc = InitSparseAdj(adj_fp=adj_fp, mobile_compartments=MOBILE,
+                             **inputs)
+        proc.initialize()
+        return proc
+
+    def test_edges(self, counts_coords, edge_list_fp):
+        proc = self.get_proc(counts_coords, edge_list_fp)
+        # weekdays share one edge, and weekend days another
+        assert proc.adj.sizes['edge'] == 2
+        np.testing.assert_array_equal(proc.adj['day_profile'], [0, 1])
+        np.testing.assert_array_equal(proc.adj_day_profile, [0] * 5 + [1] * 2)
+        # vertex pair (2, 0) is stored as (0, 2)
+        np.testing.assert_array_equal(proc.adj_indices, [1, 2])
+        assert (proc.adj[:1] == 0.1).all()
+        weekend = proc.adj[1:]
+        assert (weekend.loc[dict(age_group='18-49')] == 0.2).all()
+        assert weekend.sum() == 0.2 * len(counts_coords['risk_group']) * \
+            len(MOBILE)
+
+    def test_run_step(self, counts_coords, edge_list_fp):
+        proc = self.get_proc(counts_coords, edge_list_fp)
+        n_vertex = len(counts_coords['vertex'])
+        for step in range(14):
+            proc.run_step(step=step, step_start=step)
+            indptr = proc.adj_indptr_t
+            assert indptr.shape == (n_vertex + 1,)
+            assert np.shares_memory(indptr, proc.adj_indptr)
+            # vertex 0 has the only edge each day
+            assert indptr[1] - indptr[0] == 1
+            assert indptr[0] == int(step % 7 >= 5)
+
+    def test_calendar(self, counts_coords, edge_list_fp):
+        """Day of week is that of `step_start` on a datetime clock."""
+        proc = self.get_proc(counts_coords, edge_list_fp)
+        # a Saturday, then a Monday
+        for step_start, weekend in (('2020-03-14', 1), ('2020-03-16T12', 0)):
+            proc.run_step(step=0, step_start=np.datetime64(step_start))
+            assert proc.adj_indptr_t[0] == weekend
+
+    def test_mobile_compartments(self, counts_coords, tmpdir):
+        """Rows for compartments that do not travel are dropped."""
+        fp = str(tmpdir.join('edges.csv'))
+        pd.DataFrame(dict(vertex1=[0, 0], vertex2=[1, 2], rate=[0.1, 0.2],
+                          compartment=['S', 'Ih'])).to_csv(fp, index=False)
+        proc = self.get_proc(counts_coords, fp)
+        assert list(proc.adj['compartment'].values) == list(MOBILE)
+        np.testing.assert_array_equal(proc.adj_indices, [1])
+        by_compt = proc.adj.sum(['edge', 'age_group', 'risk_group'])
+        np.testing.assert_allclose(by_compt.sel(compartment='S'), 0.1 * 10)
+        assert (by_compt.drop_sel(compartment='S') == 0).all()
+
+    def test_missing_labels(self, counts_coords, tmpdir):
+        fp = str(tmpdir.join('edges.csv'))
+        pd.DataFrame(dict(vertex1=[0], vertex2=[99], rate=[0.1])).to_csv(
+            fp, index=False)
+        with pytest.raises(KeyError):
+            self.get_proc(counts_coords, fp)
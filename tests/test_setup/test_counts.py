@@ -2,11 +2,16 @@ import pytest
 import xarray as xr
 import pandas as pd
 from episimlab.setup.counts import InitCountsFromCensusCSV
+from episimlab.utils.columnar import convert
 
 
-@pytest.fixture
-def census_counts_csv():
-    return 'tests/data/2019_zcta_pop_5_age_groups.csv'
+@pytest.fixture(params=['csv', 'columnar'])
+def census_counts_csv(request, tmp_path):
+    fp = 'tests/data/2019_zcta_pop_5_age_groups.csv'
+    if request.param == 'columnar':
+        convert(fp, str(tmp_path / 'census'))
+        return str(tmp_path / 'census')
+    return fp
 
 
 class TestInitCountsFromCensusCSV:
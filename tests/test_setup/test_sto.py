@@ -27,3 +27,18 @@ class TestInitStochasticFromToggle:
 
         assert isinstance(result, bool)
         assert result == expected
+
+    @pytest.mark.parametrize('sto_mode, expected', [
+        ('poisson', False),
+        ('binomial', True),
+    ])
+    def test_sto_mode(self, sto_mode, expected):
+        proc = InitStochasticFromToggle(sto_toggle=0, sto_mode=sto_mode)
+        proc.initialize()
+        assert proc.binomial is expected
+        assert proc.stochastic is True
+
+    def test_invalid_sto_mode(self):
+        proc = InitStochasticFromToggle(sto_toggle=0, sto_mode='gaussian')
+        with pytest.raises(ValueError):
+            proc.initialize()
@@ -1,11 +1,16 @@
 import pytest
 import numpy as np
+import pandas as pd
 import xsimlab as xs
 import xarray as xr
 from math import isclose
 
 from episimlab.cy_utils.cy_utils import discrete_time_approx_wrapper as cy_dta
-from episimlab.utils import discrete_time_approx as py_dta, dt64_to_day_of_week
+from episimlab.cy_utils.cy_utils import poisson_streams, RNGStreams
+from episimlab.utils.columnar import write_columnar, read_columnar, read_table
+from episimlab.utils import (
+    discrete_time_approx as py_dta, dt64_to_day_of_week, scatter_to_array
+)
 
 
 class TestDiscreteTimeApprox:
@@ -30,6 +35,38 @@ class TestDiscreteTimeApprox:
         assert isclose(cy_result, expected, rel_tol=rel_tol)
 
 
+class TestRNGStreams:
+
+    def test_omp_same_as_serial(self):
+        serial = poisson_streams(10., 12345, 64, 100, 0)
+        omp = poisson_streams(10., 12345, 64, 100, 1)
+        np.testing.assert_array_equal(serial, omp)
+
+    def test_streams_differ(self):
+        result = poisson_streams(10., 12345, 64, 100, 1)
+        assert len({tuple(row) for row in result}) == 64
+        other = poisson_streams(10., 54321, 64, 100, 1)
+        assert not (result == other).all()
+
+    def test_stream_independent_of_n(self):
+        """Stream `i` does not depend on how many streams are allocated."""
+        few = poisson_streams(10., 12345, 4, 100, 1)
+        many = poisson_streams(10., 12345, 64, 100, 1)
+        np.testing.assert_array_equal(few, many[:4])
+
+    @pytest.mark.parametrize('mu', [0.5, 10., 1e4])
+    def test_poisson_moments(self, mu):
+        """Draws from the counter-based streams are Poisson distributed."""
+        result = poisson_streams(mu, 12345, 1000, 100, 1)
+        assert np.isclose(result.mean(), mu, rtol=0.01)
+        assert np.isclose(result.var(), mu, rtol=0.03)
+
+    def test_allocation_failure(self):
+        """Failing to allocate streams raises instead of crashing."""
+        with pytest.raises(MemoryError):
+            RNGStreams(2 ** 50)
+
+
 class TestDatetimeUtils:
 
     @pytest.mark.parametrize('arg, expected', (
@@ -39,3 +76,45 @@ class TestDatetimeUtils:
     def test_dt64_to_day_of_week(self, arg, expected):
         result = dt64_to_day_of_week(arg)
         assert result == expected
+
+
+class TestMidxUtils:
+
+    def test_scatter_to_array(self):
+        df = pd.DataFrame(dict(
+            i=['A', 'B', 'C', 'A'],
+            age=['old', 'young', 'young', 'young'],
+            value=[1., 2., 3., 4.]
+        ))
+        result = scatter_to_array(df, columns=['i', 'age'], value_col='value',
+                                  coords=[['A', 'B'], ['young', 'old']])
+        np.testing.assert_array_equal(result, [[4., 1.], [2., 0.]])
+
+    def test_scatter_to_array_duplicates(self):
+        df = pd.DataFrame(dict(i=['A', 'A'], value=[1., 2.]))
+        with pytest.raises(ValueError):
+            scatter_to_array(df, columns=['i'], coords=[['A']],
+                             value_col='value')
+
+
+class TestColumnar:
+
+    def test_round_trip(self, tmp_path):
+        df = pd.DataFrame(dict(
+            date=['2020-03-12', '2020-03-11', '2020-03-12'],
+            source=['A', 'B', 'A'],
+            GEOID=[78701, 78702, 78703],
+            n=[1.5, 2., 0.],
+        ))
+        fp = str(tmp_path / 'table')
+        write_columnar(df, fp, sort_by='date')
+
+        result = read_table(fp)
+        expected = df.sort_values('date', kind='stable').reset_index(drop=True)
+        expected['date'] = pd.to_datetime(expected['date'])
+        pd.testing.assert_frame_equal(result, expected)
+
+        # subset of rows and columns
+        result = read_columnar(fp, columns=['n', 'source'], rows=slice(1, None))
+        pd.testing.assert_frame_equal(
+            result, expected.loc[1:, ['n', 'source']].reset_index(drop=True))